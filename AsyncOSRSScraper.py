@@ -0,0 +1,205 @@
+# AsyncOSRSScraper.py
+
+import asyncio
+import random
+import time
+from threading import Thread
+import aiohttp
+from OSRSScraper import OSRSScraper
+from mapping_cache import MappingCache
+from market_snapshot import MarketSnapshot
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncOSRSScraper(OSRSScraper):
+    # Same interface as OSRSScraper, backed by one aiohttp session living on a private event loop
+    def __init__(self, config):
+        self.config = config
+        self.api_url_latest = f"{config.API_BASE_URL}/latest"
+        self.api_url_5m = f"{config.API_BASE_URL}/5m"
+        self.api_url_timeseries = f"{config.API_BASE_URL}/timeseries"
+        self.api_url_mapping = f"{config.API_BASE_URL}/mapping"
+        self.mapping_cache = MappingCache.shared(config)
+        self.item_names = {}
+        self.buy_limits = {}
+        self.session = None
+        self.semaphore = None
+        self.rate_limiter = None
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = Thread(target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        if self.session is not None:
+            self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+
+    async def ensure_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.config.MAX_CONCURRENT_REQUESTS)
+            timeout = aiohttp.ClientTimeout(total=self.config.REQUEST_TIMEOUT)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self.semaphore = asyncio.Semaphore(self.config.MAX_CONCURRENT_REQUESTS)
+            self.rate_limiter = TokenBucket(self.config.RATE_LIMIT, self.config.RATE_LIMIT_BURST)
+        return self.session
+
+    async def request(self, api_url, params=None, headers=None):
+        session = await self.ensure_session()
+        for attempt in range(self.config.MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            try:
+                async with self.semaphore:
+                    async with session.get(api_url, params=params, headers=headers) as response:
+                        response.raise_for_status()
+                        if response.status == 304:
+                            return response.status, response.headers, None
+                        return response.status, response.headers, await response.json()
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES or attempt == self.config.MAX_RETRIES:
+                    print(f"Error fetching data from {api_url}: {e}")
+                    return None, None, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.config.MAX_RETRIES:
+                    print(f"Error fetching data from {api_url}: {e}")
+                    return None, None, None
+            # Full jitter keeps retries from many clients from lining up
+            backoff = min(self.config.RETRY_BACKOFF_MAX, self.config.RETRY_BACKOFF * 2 ** attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    async def get_json(self, api_url, params=None):
+        _, _, payload = await self.request(api_url, params)
+        return payload
+
+    async def fetch_payload_async(self, api_url, params=None):
+        return await self.get_json(api_url, params)
+
+    async def fetch_data_async(self, api_url, params=None):
+        payload = await self.get_json(api_url, params)
+        return payload['data'] if payload else None
+
+    async def fetch_mapping_async(self):
+        cache = self.mapping_cache
+        if cache.is_fresh():
+            cache.hits += 1
+        else:
+            headers = cache.conditional_headers()
+            if headers:
+                cache.revalidations += 1
+            status, response_headers, mapping_data = await self.request(self.api_url_mapping, headers=headers)
+            if status == 304:
+                cache.mark_not_modified()
+            elif mapping_data is not None:
+                cache.store(mapping_data, response_headers)
+        if cache.item_names is None:
+            return False
+        self.item_names, self.buy_limits = cache.item_names, cache.buy_limits
+        return True
+
+    async def fetch_historical_data_async(self, item_id, timestamp):
+        data = await self.fetch_data_async(self.api_url_timeseries, params={"timestep": "5m", "id": item_id})
+        for entry in data or []:
+            if entry["timestamp"] == timestamp:
+                return entry
+        return None
+
+    async def fetch_historical_series_async(self, item_ids, timestamp, progress=None):
+        # Completions are counted here rather than in the requests, so a progress callback that raises
+        # (a cancelled job) cancels the requests still in flight
+        async def fetch_entry(item_id):
+            return item_id, await self.fetch_historical_data_async(item_id, timestamp)
+
+        step = max(1, len(item_ids) // 20)
+        tasks = [asyncio.ensure_future(fetch_entry(item_id)) for item_id in item_ids]
+        entries = {}
+        try:
+            for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                item_id, entry = await task
+                entries[item_id] = entry
+                if progress is not None and (done % step == 0 or done == len(item_ids)):
+                    progress(f"Fetched history for {done}/{len(item_ids)} items")
+        finally:
+            for task in tasks:
+                task.cancel()
+        return {item_id: entries[item_id] for item_id in item_ids if entries.get(item_id)}
+
+    async def fetch_5m_with_history_async(self):
+        payload_5m = await self.fetch_payload_async(self.api_url_5m)
+        if not payload_5m:
+            return None, None, None
+        timestamp_5m_ago = self.previous_timestamp(payload_5m)
+        data_historical = await self.fetch_data_async(self.api_url_5m, params={"timestamp": timestamp_5m_ago})
+        return payload_5m, data_historical, timestamp_5m_ago
+
+    async def scrape_snapshot_async(self, progress=None):
+        # progress(message) is called between stages; the first three requests run concurrently
+        report = progress or (lambda message: None)
+        report("Fetching latest prices and 5-minute averages")
+        results = await asyncio.gather(
+            self.fetch_data_async(self.api_url_latest),
+            self.fetch_5m_with_history_async(),
+            self.fetch_mapping_async(),
+        )
+        data_latest, (payload_5m, data_historical, timestamp_5m_ago) = results[0], results[1]
+        if not (data_latest and payload_5m):
+            return MarketSnapshot.empty(self.item_names)
+        data_5m = payload_5m['data']
+
+        if data_historical is None:
+            item_ids = [item_id for item_id in data_latest if item_id in data_5m]
+            data_historical = await self.fetch_historical_series_async(item_ids, timestamp_5m_ago, progress)
+        return self.build_snapshot(data_latest, data_5m, data_historical, payload_5m.get('timestamp'))
+
+    def fetch_payload(self, api_url, params=None):
+        return self.run(self.fetch_payload_async(api_url, params))
+
+    def fetch_data(self, api_url, params=None):
+        return self.run(self.fetch_data_async(api_url, params))
+
+    def fetch_mapping(self):
+        self.run(self.fetch_mapping_async())
+        return self.item_names, self.buy_limits
+
+    def fetch_item_names(self):
+        if not self.item_names:
+            self.run(self.fetch_mapping_async())
+        return self.item_names
+
+    def fetch_buy_limits(self):
+        if not self.buy_limits:
+            self.run(self.fetch_mapping_async())
+        return self.buy_limits
+
+    def fetch_historical_data(self, item_id, timestamp):
+        return self.run(self.fetch_historical_data_async(item_id, timestamp))
+
+    def fetch_historical_series(self, item_ids, timestamp, progress=None):
+        return self.run(self.fetch_historical_series_async(item_ids, timestamp, progress))
+
+    def scrape_snapshot(self, progress=None):
+        return self.run(self.scrape_snapshot_async(progress))
@@ -1,174 +1,265 @@
-# OSRSGrandExchangeApp.py
-
-from kivy.properties import StringProperty, BooleanProperty
-from kivy.core.clipboard import Clipboard
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.label import Label
-from kivy.uix.textinput import TextInput
-from kivy.uix.button import Button
-from kivy.uix.switch import Switch
-from kivy.uix.scrollview import ScrollView
-from kivy.app import App
-from kivy.utils import get_color_from_hex
-from kivy.core.window import Window
-from threading import Thread
-import os
-import pickle
-from sklearn.ensemble import RandomForestRegressor
-from OSRSScraper import OSRSScraper
-from utils import generate_item_suggestions, prepare_training_data, format_suggestions, train_model
-from config import Config
-from osrs_rl.agent import OSRSAgent
-from osrs_rl.environment import OSRSEnvironment
-from osrs_rl.trainer import OSRSTrainer
-
-class OSRSGrandExchangeApp(App):
-    suggestions_text = StringProperty("")
-    use_rl = BooleanProperty(False)
-
-    def build(self):
-        self.title = "OSRS Grand Exchange Helper"
-        layout = BoxLayout(orientation="vertical", spacing=10, padding=20)
-        layout.bind(size=self._update_layout)
-
-        header = self.create_header()
-        layout.add_widget(header)
-
-        input_layout = self.create_input_layout()
-        layout.add_widget(input_layout)
-
-        rl_layout = self.create_rl_layout()
-        layout.add_widget(rl_layout)
-
-        button_layout = self.create_button_layout()
-        layout.add_widget(button_layout)
-
-        scroll_view = self.create_scroll_view()
-        layout.add_widget(scroll_view)
-
-        self.root = layout
-        return layout
-
-    def create_header(self):
-        header = Label(text="OSRS Grand Exchange Helper", size_hint=(1, None), height=50, font_size=24, bold=True, color=get_color_from_hex("#FFFFFF"))
-        header.bind(size=self._update_widget_size)
-        return header
-
-    def create_input_layout(self):
-        input_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=40)
-        self.starting_gold_input = TextInput(text="10000", multiline=False, size_hint=(0.7, None), height=40, background_color=get_color_from_hex("#FFFFFF"), foreground_color=get_color_from_hex("#000000"))
-        input_layout.add_widget(Label(text="Starting Gold:", size_hint=(0.3, None), height=40, color=get_color_from_hex("#FFFFFF")))
-        input_layout.add_widget(self.starting_gold_input)
-        return input_layout
-
-    def create_rl_layout(self):
-        rl_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=40)
-        self.use_rl_switch = Switch(active=self.use_rl, size_hint=(0.3, None), height=40)
-        self.use_rl_switch.bind(active=self.on_use_rl_switch)
-        rl_layout.add_widget(Label(text="Use RL:", size_hint=(0.3, None), height=40, color=get_color_from_hex("#FFFFFF")))
-        rl_layout.add_widget(self.use_rl_switch)
-        return rl_layout
-
-    def create_button_layout(self):
-        button_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=50)
-        self.fetch_button = Button(text="Fetch Prices and Generate Suggestions", size_hint=(0.7, None), height=50, background_color=get_color_from_hex("#4CAF50"), color=get_color_from_hex("#FFFFFF"), bold=True)
-        self.fetch_button.bind(on_press=self.fetch_prices_and_generate_suggestions)
-        self.train_button = Button(text="Train Model", size_hint=(0.3, None), height=50, background_color=get_color_from_hex("#2196F3"), color=get_color_from_hex("#FFFFFF"), bold=True)
-        self.train_button.bind(on_press=self.train_model)
-        self.copy_button = Button(text="Copy to Clipboard", size_hint=(0.3, None), height=50, background_color=get_color_from_hex("#FFC107"), color=get_color_from_hex("#FFFFFF"), bold=True)
-        self.copy_button.bind(on_press=self.copy_to_clipboard)
-        button_layout.add_widget(self.fetch_button)
-        button_layout.add_widget(self.train_button)
-        button_layout.add_widget(self.copy_button)
-        return button_layout
-
-    def create_scroll_view(self):
-        scroll_view = ScrollView(size_hint=(1, 1))
-        scroll_layout = BoxLayout(orientation="vertical", spacing=10, size_hint_y=None)
-        scroll_layout.bind(minimum_height=scroll_layout.setter("height"))
-
-        self.suggestions_label = Label(text="Item Suggestions:", size_hint_y=None, height=400, color=get_color_from_hex("#FFFFFF"), text_size=(Window.width - 40, None), halign="left", valign="top")
-        scroll_layout.add_widget(self.suggestions_label)
-
-        scroll_view.add_widget(scroll_layout)
-        return scroll_view
-
-    def on_use_rl_switch(self, instance, value):
-        self.use_rl = value
-
-    def fetch_prices_and_generate_suggestions(self, instance):
-        self.fetch_button.disabled = True
-        starting_gold = self.validate_starting_gold()
-        if starting_gold is not None:
-            thread = Thread(target=self.fetch_prices_and_generate_suggestions_thread, args=(starting_gold,))
-            thread.start()
-        else:
-            self.suggestions_text = "Invalid starting gold value. Please enter a valid integer."
-            self.fetch_button.disabled = False
-
-    def fetch_prices_and_generate_suggestions_thread(self, starting_gold):
-        scraper = OSRSScraper(Config)
-        items_data = scraper.scrape_data()
-        if items_data:
-            model_file = "model.pkl"
-            if os.path.exists(model_file):
-                with open(model_file, "rb") as file:
-                    model = pickle.load(file)
-            else:
-                model = RandomForestRegressor(n_estimators=100, random_state=42)
-
-            if self.use_rl:
-                rl_agent = OSRSAgent(Config)
-                rl_environment = OSRSEnvironment(Config)
-                suggestions = generate_item_suggestions(items_data, starting_gold, model, rl_agent, rl_environment)
-            else:
-                suggestions = generate_item_suggestions(items_data, starting_gold, model, None, None)
-
-            if suggestions:
-                self.suggestions_text = f"Item Suggestions:\n{format_suggestions(suggestions)}"
-            else:
-                self.suggestions_text = "No item suggestions found."
-        else:
-            self.suggestions_text = "Error fetching item prices or item mapping."
-        self.fetch_button.disabled = False
-
-    def train_model(self, instance):
-        self.train_button.disabled = True
-        thread = Thread(target=self.train_model_thread)
-        thread.start()
-
-    def train_model_thread(self):
-        scraper = OSRSScraper(Config)
-        items_data = scraper.scrape_data()
-        if items_data:
-            model = train_model(items_data)
-            self.suggestions_text = "Model training completed."
-        else:
-            self.suggestions_text = "Error fetching item prices or item mapping."
-        self.train_button.disabled = False
-
-    def copy_to_clipboard(self, instance):
-        text_to_copy = f"Item Suggestions:\n{self.suggestions_text}"
-        Clipboard.copy(text_to_copy)
-
-    def validate_starting_gold(self):
-        try:
-            starting_gold = int(self.starting_gold_input.text)
-            if starting_gold > 0:
-                return starting_gold
-            else:
-                return None
-        except ValueError:
-            return None
-
-    def _update_layout(self, instance, size):
-        instance.padding = (20, 20, 20, 20)
-
-    def _update_widget_size(self, instance, size):
-        instance.size_hint_y = None
-        instance.height = size[1]
-
-    def on_suggestions_text(self, instance, value):
-        self.suggestions_label.text = value
-        self.suggestions_label.texture_update()
+# OSRSGrandExchangeApp.py
+
+from kivy.properties import StringProperty, BooleanProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.textinput import TextInput
+from kivy.uix.button import Button
+from kivy.uix.switch import Switch
+from kivy.uix.scrollview import ScrollView
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.utils import get_color_from_hex
+from kivy.core.window import Window
+import time
+from config import Config
+from job_scheduler import JobCancelled, JobScheduler
+
+# Only kivy and the config are imported before the window appears; requests, numpy, sklearn and
+# osrs_rl come in with the suggestion service, which on_start begins loading in the background.
+
+class OSRSGrandExchangeApp(App):
+    suggestions_text = StringProperty("")
+    use_rl = BooleanProperty(False)
+    auto_refresh = BooleanProperty(Config.AUTO_REFRESH)
+    service = None
+    scheduler = None
+    auto_refresh_event = None
+    last_suggestions = ""
+
+    def build(self):
+        self.title = "OSRS Grand Exchange Helper"
+        layout = BoxLayout(orientation="vertical", spacing=10, padding=20)
+        layout.bind(size=self._update_layout)
+
+        header = self.create_header()
+        layout.add_widget(header)
+
+        input_layout = self.create_input_layout()
+        layout.add_widget(input_layout)
+
+        rl_layout = self.create_rl_layout()
+        layout.add_widget(rl_layout)
+
+        auto_refresh_layout = self.create_auto_refresh_layout()
+        layout.add_widget(auto_refresh_layout)
+
+        button_layout = self.create_button_layout()
+        layout.add_widget(button_layout)
+
+        scroll_view = self.create_scroll_view()
+        layout.add_widget(scroll_view)
+
+        self.root = layout
+        return layout
+
+    def create_header(self):
+        header = Label(text="OSRS Grand Exchange Helper", size_hint=(1, None), height=50, font_size=24, bold=True, color=get_color_from_hex("#FFFFFF"))
+        header.bind(size=self._update_widget_size)
+        return header
+
+    def create_input_layout(self):
+        input_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=40)
+        self.starting_gold_input = TextInput(text="10000", multiline=False, size_hint=(0.7, None), height=40, background_color=get_color_from_hex("#FFFFFF"), foreground_color=get_color_from_hex("#000000"))
+        input_layout.add_widget(Label(text="Starting Gold:", size_hint=(0.3, None), height=40, color=get_color_from_hex("#FFFFFF")))
+        input_layout.add_widget(self.starting_gold_input)
+        return input_layout
+
+    def create_rl_layout(self):
+        rl_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=40)
+        self.use_rl_switch = Switch(active=self.use_rl, size_hint=(0.3, None), height=40)
+        self.use_rl_switch.bind(active=self.on_use_rl_switch)
+        rl_layout.add_widget(Label(text="Use RL:", size_hint=(0.3, None), height=40, color=get_color_from_hex("#FFFFFF")))
+        rl_layout.add_widget(self.use_rl_switch)
+        return rl_layout
+
+    def create_auto_refresh_layout(self):
+        auto_refresh_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=40)
+        self.auto_refresh_switch = Switch(active=self.auto_refresh, size_hint=(0.3, None), height=40)
+        self.auto_refresh_switch.bind(active=self.on_auto_refresh_switch)
+        auto_refresh_layout.add_widget(Label(text="Auto Refresh (5 min):", size_hint=(0.3, None), height=40, color=get_color_from_hex("#FFFFFF")))
+        auto_refresh_layout.add_widget(self.auto_refresh_switch)
+        return auto_refresh_layout
+
+    def create_button_layout(self):
+        button_layout = BoxLayout(orientation="horizontal", spacing=10, size_hint=(1, None), height=50)
+        self.fetch_button = Button(text="Fetch Prices and Generate Suggestions", size_hint=(0.7, None), height=50, background_color=get_color_from_hex("#4CAF50"), color=get_color_from_hex("#FFFFFF"), bold=True)
+        self.fetch_button.bind(on_press=self.fetch_prices_and_generate_suggestions)
+        self.train_button = Button(text="Train Model", size_hint=(0.3, None), height=50, background_color=get_color_from_hex("#2196F3"), color=get_color_from_hex("#FFFFFF"), bold=True)
+        self.train_button.bind(on_press=self.train_model)
+        self.copy_button = Button(text="Copy to Clipboard", size_hint=(0.3, None), height=50, background_color=get_color_from_hex("#FFC107"), color=get_color_from_hex("#FFFFFF"), bold=True)
+        self.copy_button.bind(on_press=self.copy_to_clipboard)
+        self.cancel_button = Button(text="Cancel", size_hint=(0.3, None), height=50, disabled=True, background_color=get_color_from_hex("#F44336"), color=get_color_from_hex("#FFFFFF"), bold=True)
+        self.cancel_button.bind(on_press=self.cancel_jobs)
+        button_layout.add_widget(self.fetch_button)
+        button_layout.add_widget(self.train_button)
+        button_layout.add_widget(self.copy_button)
+        button_layout.add_widget(self.cancel_button)
+        return button_layout
+
+    def create_scroll_view(self):
+        scroll_view = ScrollView(size_hint=(1, 1))
+        scroll_layout = BoxLayout(orientation="vertical", spacing=10, size_hint_y=None)
+        scroll_layout.bind(minimum_height=scroll_layout.setter("height"))
+
+        self.suggestions_label = Label(text="Item Suggestions:", size_hint_y=None, height=400, color=get_color_from_hex("#FFFFFF"), text_size=(Window.width - 40, None), halign="left", valign="top")
+        scroll_layout.add_widget(self.suggestions_label)
+
+        scroll_view.add_widget(scroll_layout)
+        return scroll_view
+
+    def on_start(self):
+        # All pipeline work runs as jobs on one background worker; their callbacks come back on this thread
+        self.scheduler = JobScheduler(self.on_main_thread)
+        self.scheduler.submit("load", self.load_job)
+        if self.auto_refresh:
+            self.submit_refresh()
+
+    def on_stop(self):
+        self.scheduler.shutdown(timeout=5)
+
+    def on_main_thread(self, callback, *args):
+        Clock.schedule_once(lambda dt: callback(*args))
+
+    def get_service(self):
+        # Only called from jobs, which never run concurrently
+        if self.service is None:
+            from service import SuggestionService
+            service = SuggestionService(Config)
+            service.load()
+            self.service = service
+        return self.service
+
+    def load_job(self, job):
+        self.get_service()
+
+    def on_use_rl_switch(self, instance, value):
+        self.use_rl = value
+
+    def on_auto_refresh_switch(self, instance, value):
+        self.auto_refresh = value
+        if value:
+            self.submit_refresh()
+        elif self.auto_refresh_event is not None:
+            self.auto_refresh_event.cancel()
+            self.auto_refresh_event = None
+
+    def fetch_prices_and_generate_suggestions(self, instance):
+        if self.validate_starting_gold() is None:
+            self.suggestions_text = "Invalid starting gold value. Please enter a valid integer."
+            return
+        self.fetch_button.disabled = True
+        self.cancel_button.disabled = False
+        self.submit_refresh(on_progress=self.show_progress)
+
+    def submit_refresh(self, on_progress=None):
+        # Auto-refresh ticks report no progress, so the list on screen only changes when the suggestions do.
+        # A click while a tick is in flight joins that tick.
+        self.scheduler.submit("refresh", self.refresh_job, self.use_rl, on_done=self.show_suggestions,
+                              on_progress=on_progress, on_error=lambda error: self.show_error(error, self.fetch_button))
+
+    def schedule_auto_refresh(self):
+        # Next tick just after the API publishes the next 5m bucket
+        if self.auto_refresh_event is not None:
+            self.auto_refresh_event.cancel()
+            self.auto_refresh_event = None
+        if self.auto_refresh and self.service is not None:
+            delay = max(0, self.service.next_refresh_time() - time.time())
+            self.auto_refresh_event = Clock.schedule_once(lambda dt: self.submit_refresh(), delay)
+
+    def refresh_job(self, job, use_rl):
+        service = self.get_service()
+        if service.predictor() is None:
+            return None
+        service.use_rl = use_rl
+        service.load()
+        return service.refresh(job.progress)
+
+    def show_suggestions(self, refreshed):
+        from utils import format_suggestions
+        self.job_finished(self.fetch_button)
+        self.schedule_auto_refresh()
+        starting_gold = self.validate_starting_gold()
+        if refreshed is None:
+            self.suggestions_text = "No trained model found. Press \"Train Model\" first."
+        elif not refreshed:
+            self.suggestions_text = "Error fetching item prices or item mapping."
+        elif starting_gold is None:
+            self.suggestions_text = "Invalid starting gold value. Please enter a valid integer."
+        else:
+            # Sizing the cached candidates for one budget takes about a millisecond, so it stays on this thread
+            suggestions = self.service.suggestions(starting_gold)
+            if suggestions:
+                self.last_suggestions = f"Item Suggestions:\n{format_suggestions(suggestions)}"
+                # Kivy only dispatches (and re-lays out the label) when the text actually differs
+                self.suggestions_text = self.last_suggestions
+            else:
+                self.suggestions_text = "No item suggestions found."
+
+    def show_progress(self, message):
+        # Previous suggestions stay readable below the status line until the new ones arrive
+        self.suggestions_text = f"{message}...\n\n{self.last_suggestions}" if self.last_suggestions else f"{message}..."
+
+    def show_error(self, error, button):
+        self.job_finished(button)
+        if button is self.fetch_button:
+            self.schedule_auto_refresh()
+        if isinstance(error, JobCancelled):
+            self.suggestions_text = f"Cancelled.\n\n{self.last_suggestions}" if self.last_suggestions else "Cancelled."
+        else:
+            self.suggestions_text = f"Error: {error}"
+
+    def job_finished(self, button):
+        button.disabled = False
+        self.cancel_button.disabled = not self.scheduler.busy()
+
+    def cancel_jobs(self, instance):
+        self.scheduler.cancel()
+
+    def train_model(self, instance):
+        self.train_button.disabled = True
+        self.cancel_button.disabled = False
+        self.scheduler.submit("train", self.train_job, on_done=self.show_training,
+                              on_progress=self.show_progress, on_error=lambda error: self.show_error(error, self.train_button))
+
+    def train_job(self, job):
+        from feature_engine import enrich_snapshot
+        from utils import train_model
+        service = self.get_service()
+        snapshot = enrich_snapshot(service.scraper.scrape_snapshot(job.progress), Config)
+        if not len(snapshot):
+            return False
+        job.progress(f"Training on {len(snapshot)} items")
+        train_model(snapshot)
+        return True
+
+    def show_training(self, trained):
+        self.job_finished(self.train_button)
+        self.suggestions_text = "Model training completed." if trained else "Error fetching item prices or item mapping."
+
+    def copy_to_clipboard(self, instance):
+        from kivy.core.clipboard import Clipboard
+        text_to_copy = f"Item Suggestions:\n{self.suggestions_text}"
+        Clipboard.copy(text_to_copy)
+
+    def validate_starting_gold(self):
+        try:
+            starting_gold = int(self.starting_gold_input.text)
+            if starting_gold > 0:
+                return starting_gold
+            else:
+                return None
+        except ValueError:
+            return None
+
+    def _update_layout(self, instance, size):
+        instance.padding = (20, 20, 20, 20)
+
+    def _update_widget_size(self, instance, size):
+        instance.size_hint_y = None
+        instance.height = size[1]
+
+    def on_suggestions_text(self, instance, value):
+        self.suggestions_label.text = value
+        self.suggestions_label.texture_update()
         self.suggestions_label.height = self.suggestions_label.texture_size[1]
\ No newline at end of file
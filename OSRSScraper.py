@@ -1,119 +1,102 @@
-# OSRSScraper.py
-
-import requests
-from datetime import datetime, timedelta
-
-class OSRSScraper:
-    def __init__(self, config):
-        self.item_names = self.fetch_item_names()
-        self.buy_limits = self.fetch_buy_limits()
-        self.config = config
-        self.api_url_latest = "https://prices.runescape.wiki/api/v1/osrs/latest"
-        self.api_url_5m = "https://prices.runescape.wiki/api/v1/osrs/5m"
-        self.api_url_timeseries = "https://prices.runescape.wiki/api/v1/osrs/timeseries"
-
-    def fetch_data(self, api_url):
-        try:
-            response = requests.get(api_url)
-            response.raise_for_status()
-            return response.json()['data']
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data from {api_url}: {e}")
-            return None
-
-    def fetch_item_names(self):
-        mapping_url = "https://prices.runescape.wiki/api/v1/osrs/mapping"
-        try:
-            response = requests.get(mapping_url)
-            response.raise_for_status()
-            mapping_data = response.json()
-            return {str(item['id']): item['name'] for item in mapping_data}
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching item names: {e}")
-            return {}
-
-    def fetch_buy_limits(self):
-        buy_limits_url = "https://prices.runescape.wiki/api/v1/osrs/mapping"
-        try:
-            response = requests.get(buy_limits_url)
-            response.raise_for_status()
-            buy_limits_data = response.json()
-            return {str(item['id']): item.get('limit', 0) for item in buy_limits_data}
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching buy limits: {e}")
-            return {}
-
-    def fetch_historical_data(self, item_id, timestamp):
-        try:
-            url = f"{self.api_url_timeseries}?timestep=5m&id={item_id}"
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()["data"]
-            for entry in data:
-                if entry["timestamp"] == timestamp:
-                    return entry
-            return None
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching historical data for item {item_id}: {e}")
-            return None
-
-    def scrape_data(self):
-        data_latest = self.fetch_data(self.api_url_latest)
-        data_5m = self.fetch_data(self.api_url_5m)
-        items_data = []
-
-        if data_latest and data_5m:
-            timestamp_5m_ago = (datetime.now() - timedelta(minutes=5)).strftime("%Y-%m-%dT%H:%M:%SZ")
-            for item_id, item_data_latest in data_latest.items():
-                if item_id in data_5m:
-                    item_data_5m = data_5m[item_id]
-                    item_data_historical = self.fetch_historical_data(item_id, timestamp_5m_ago)
-                    if item_data_historical:
-                        high_price = item_data_latest.get('high', 0)
-                        low_price = item_data_latest.get('low', 0)
-                        average_price_5m = item_data_5m.get('avgHighPrice', 0)
-                        average_high_price = item_data_5m.get('avgHighPrice', 0)
-                        average_low_price = item_data_5m.get('avgLowPrice', 0)
-                        high_price_volume = item_data_5m.get('highPriceVolume', 0)
-                        low_price_volume = item_data_5m.get('lowPriceVolume', 0)
-                        buy_volume = low_price_volume
-                        sell_volume = high_price_volume
-
-                        high_price = average_high_price - average_high_price * 0.01 if average_high_price else 0
-                        low_price = int(average_low_price * 0.99) if average_low_price else 0
-                        average_price_5m = int(average_price_5m) if average_price_5m else 0
-
-                        if high_price > 0 and low_price > 0:
-                            potential_profit = high_price - low_price
-                            profit_margin = (potential_profit / low_price) * 100
-
-                            if average_price_5m > 0:
-                                fluctuation = abs(high_price - average_price_5m) / average_price_5m
-                                roi = potential_profit / average_price_5m
-
-                                if (
-                                    profit_margin >= self.config.MIN_PROFIT
-                                    and fluctuation >= self.config.MIN_FLUCTUATION
-                                    and roi >= self.config.MIN_ROI
-                                    and sell_volume >= self.config.MIN_SELL_VOLUME
-                                    and buy_volume >= self.config.MIN_BUY_VOLUME
-                                ):
-                                    item_name = self.item_names.get(item_id, "Unknown Item")
-                                    buy_limit = self.buy_limits.get(item_id, 0)
-                                    item_data = {
-                                        "Item ID": item_id,
-                                        "Item Name": item_name,
-                                        "High (Sell)": high_price,
-                                        "High Volume": high_price_volume,
-                                        "Low (Buy)": low_price,
-                                        "Low Volume": low_price_volume,
-                                        "5-Minute Average High Price": average_price_5m,
-                                        "ROI": roi,
-                                        "Potential Profit": potential_profit,
-                                        "Price Fluctuation": fluctuation * 100,
-                                        "Buy Limit": buy_limit,
-                                        "Historical Price": item_data_historical["price"],
-                                        "Historical Volume": item_data_historical["volume"]
-                                    }
-                                    items_data.append(item_data)
-        return items_data
\ No newline at end of file
+# OSRSScraper.py
+
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from mapping_cache import MappingCache
+from market_snapshot import MarketSnapshot, build_snapshot
+
+class OSRSScraper:
+    def __init__(self, config):
+        self.config = config
+        self.api_url_latest = f"{config.API_BASE_URL}/latest"
+        self.api_url_5m = f"{config.API_BASE_URL}/5m"
+        self.api_url_timeseries = f"{config.API_BASE_URL}/timeseries"
+        self.api_url_mapping = f"{config.API_BASE_URL}/mapping"
+        self.session = requests.Session()
+        self.mapping_cache = MappingCache.shared(config)
+        self.item_names, self.buy_limits = self.fetch_mapping()
+
+    def fetch_payload(self, api_url, params=None):
+        try:
+            response = self.session.get(api_url, params=params, timeout=self.config.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching data from {api_url}: {e}")
+            return None
+
+    def fetch_data(self, api_url, params=None):
+        payload = self.fetch_payload(api_url, params)
+        return payload['data'] if payload else None
+
+    def fetch_mapping(self):
+        return self.mapping_cache.get(self.session, self.api_url_mapping, self.config.REQUEST_TIMEOUT)
+
+    def fetch_item_names(self):
+        return self.fetch_mapping()[0]
+
+    def fetch_buy_limits(self):
+        return self.fetch_mapping()[1]
+
+    def fetch_historical_data(self, item_id, timestamp):
+        try:
+            url = f"{self.api_url_timeseries}?timestep=5m&id={item_id}"
+            response = self.session.get(url, timeout=self.config.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()["data"]
+            for entry in data:
+                if entry["timestamp"] == timestamp:
+                    return entry
+            return None
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching historical data for item {item_id}: {e}")
+            return None
+
+    def fetch_historical_snapshot(self, timestamp):
+        # One request for every item's 5m bucket starting at `timestamp`
+        return self.fetch_data(self.api_url_5m, params={"timestamp": timestamp})
+
+    def fetch_historical_series(self, item_ids, timestamp, progress=None):
+        # Per-item timeseries fallback, fanned out over a bounded pool
+        step = max(1, len(item_ids) // 20)
+        series = {}
+        with ThreadPoolExecutor(max_workers=self.config.MAX_CONCURRENT_REQUESTS) as executor:
+            entries = executor.map(lambda item_id: self.fetch_historical_data(item_id, timestamp), item_ids)
+            for done, (item_id, entry) in enumerate(zip(item_ids, entries), 1):
+                if entry:
+                    series[item_id] = entry
+                if progress is not None and (done % step == 0 or done == len(item_ids)):
+                    progress(f"Fetched history for {done}/{len(item_ids)} items")
+        return series
+
+    def previous_timestamp(self, payload_5m):
+        timestamp = payload_5m.get('timestamp') if payload_5m else None
+        if timestamp is None:
+            timestamp = int(time.time()) // 300 * 300 - 300
+        return timestamp - 300
+
+    def scrape_data(self):
+        return self.scrape_snapshot().to_records()
+
+    def scrape_snapshot(self, progress=None):
+        # progress(message) is called between requests
+        report = progress or (lambda message: None)
+        report("Fetching latest prices")
+        data_latest = self.fetch_data(self.api_url_latest)
+        report("Fetching 5-minute averages")
+        payload_5m = self.fetch_payload(self.api_url_5m)
+        data_5m = payload_5m['data'] if payload_5m else None
+        if not (data_latest and data_5m):
+            return MarketSnapshot.empty(self.item_names)
+
+        timestamp_5m_ago = self.previous_timestamp(payload_5m)
+        report("Fetching previous 5-minute averages")
+        data_historical = self.fetch_historical_snapshot(timestamp_5m_ago)
+        if data_historical is None:
+            item_ids = [item_id for item_id in data_latest if item_id in data_5m]
+            data_historical = self.fetch_historical_series(item_ids, timestamp_5m_ago, progress)
+        return self.build_snapshot(data_latest, data_5m, data_historical, payload_5m.get('timestamp'))
+
+    def build_snapshot(self, data_latest, data_5m, data_historical, timestamp=None):
+        return build_snapshot(data_latest, data_5m, data_historical, self.item_names, self.buy_limits, self.config, timestamp)
\ No newline at end of file
@@ -0,0 +1,251 @@
+# backtest.py
+
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from config import Config
+from feature_engine import ROLLING_FEATURES, rolling_features
+from mapping_cache import MappingCache
+from market_snapshot import FEATURE_COLUMNS, MarketSnapshot, derive_metrics, ge_tax, screen_mask, snapshot_columns
+from model_store import load_bundle
+from portfolio import allocate
+from ranking import scores, top_k, volume_caps
+from snapshot_archive import BUCKET_SECONDS, COLUMNS, DAY_SECONDS, SnapshotArchive
+from tree_engine import compile_pipeline
+from utils import expand_grid
+
+def default_params(config=Config):
+    return {
+        "gold": config.BACKTEST_GOLD,
+        "top_n": config.BACKTEST_TOP_N,
+        "interval": config.BACKTEST_INTERVAL,
+        "hold": config.BACKTEST_HOLD,
+        "volume_share": config.BACKTEST_VOLUME_SHARE,
+        "key": config.RANKING_KEY,
+    }
+
+class Backtester:
+    # Replays (items x buckets) history through the suggestion pipeline: screening and features as
+    # build_snapshot computes them, model predictions, joint gold allocation over the candidates, then
+    # simulated GE fills. Everything but the per-decision allocation is vectorized over items and time.
+    def __init__(self, item_ids, timestamps, grids, buy_limits, model, features=None, config=Config):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.grids = {column: np.asarray(grids[column], dtype=np.int64) for column in COLUMNS}
+        self.buy_limit = np.fromiter((buy_limits.get(str(item_id), 0) for item_id in self.item_ids.tolist()), dtype=np.int64, count=len(self.item_ids))
+        self.model = model
+        self.features = list(features or FEATURE_COLUMNS)
+        self.config = config
+        self.rolling = None
+        self.predictions = {}
+
+    @classmethod
+    def from_archive(cls, archive, start, end, buy_limits, model, features=None, config=Config):
+        item_ids, timestamps, grids = archive.load_range(start, end)
+        return cls(item_ids, timestamps, grids, buy_limits, model, features, config)
+
+    def frame(self, buckets):
+        # Snapshot columns for every item at each bucket, and which rows build_snapshot would keep
+        current = {column: self.grids[column][:, buckets] for column in COLUMNS}
+        previous = {column: self.grids[column][:, buckets - 1] for column in COLUMNS}
+        present = np.any([values != 0 for values in current.values()], axis=0)
+        previous_present = np.any([values != 0 for values in previous.values()], axis=0)
+        raw = {
+            "avg_high": current["high_price"].astype(np.float64),
+            "avg_low": current["low_price"].astype(np.float64),
+            "high_volume": current["high_volume"],
+            "low_volume": current["low_volume"],
+            "historical_price": previous["high_price"],
+            "historical_volume": previous["high_volume"] + previous["low_volume"],
+        }
+        metrics = derive_metrics(raw)
+        mask = screen_mask(raw, metrics, self.config) & present & previous_present
+        return snapshot_columns(raw, metrics, np.broadcast_to(self.buy_limit[:, None], mask.shape)), mask
+
+    def rolling_columns(self, buckets):
+        if self.rolling is None:
+            self.rolling = rolling_features(self.timestamps, self.grids, self.config.ROLLING_WINDOW)
+        return {name: self.rolling[name][:, buckets] for name in ROLLING_FEATURES}
+
+    def feature_matrix(self, columns, mask, buckets):
+        extra = [name for name in self.features if name not in FEATURE_COLUMNS]
+        values = dict(columns, **(self.rolling_columns(buckets) if extra else {}))
+        return np.column_stack([values[name][mask] for name in self.features]).astype(np.float64, copy=False)
+
+    def snapshot(self, bucket):
+        buckets = np.array([bucket])
+        columns, mask = self.frame(buckets)
+        selected = np.flatnonzero(mask[:, 0])
+        snapshot = MarketSnapshot(self.item_ids[selected], {name: values[selected, 0] for name, values in columns.items()}, {}, int(self.timestamps[bucket]))
+        extra = [name for name in self.features if name not in FEATURE_COLUMNS]
+        if extra:
+            rolling = self.rolling_columns(buckets)
+            snapshot = snapshot.with_features({name: rolling[name][selected, 0] for name in extra})
+        return snapshot
+
+    def predict(self, buckets):
+        # Predicted log profit per (item, bucket), -inf where the item would not have been screened in.
+        # Predictions are cached per bucket, so sweeps over intervals that share buckets pay for them once.
+        columns, mask = self.frame(buckets)
+        missing = np.array([index for index, bucket in enumerate(buckets.tolist()) if bucket not in self.predictions], dtype=np.intp)
+        if len(missing):
+            predictions = np.full((len(self.item_ids), len(missing)), -np.inf)
+            missing_mask = mask[:, missing]
+            if missing_mask.any():
+                missing_columns = {name: values[:, missing] for name, values in columns.items()}
+                predictions[missing_mask] = self.model.predict(self.feature_matrix(missing_columns, missing_mask, buckets[missing]))
+            for index, bucket in enumerate(buckets[missing].tolist()):
+                self.predictions[bucket] = predictions[:, index]
+        predictions = np.column_stack([self.predictions[bucket] for bucket in buckets.tolist()])
+        return columns, predictions
+
+    def run(self, params=None):
+        params = dict(default_params(self.config), **(params or {}))
+        interval, hold = params["interval"], params["hold"]
+        decisions = np.arange(1, len(self.timestamps) - hold, interval)
+        num_decisions = len(decisions)
+        top_n = min(params["top_n"], len(self.item_ids))
+        if num_decisions == 0 or top_n == 0:
+            return self.report(params, np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64), decisions)
+        columns, predictions = self.predict(decisions)
+        chosen, quantity = self.allocate(decisions, columns, predictions, params)
+        decision_index = np.broadcast_to(np.arange(num_decisions), chosen.shape)
+        bid = columns["low"][chosen, decision_index].astype(np.float64)
+        ask = np.floor(columns["high"][chosen, decision_index])
+
+        # Order book over the hold window after each decision: (slot x decision x bucket)
+        window = decisions[None, :, None] + np.arange(1, hold + 1)
+        items = chosen[:, :, None]
+        low_price = self.grids["low_price"][items, window]
+        high_price = self.grids["high_price"][items, window]
+        buy_fills = (low_price > 0) & (low_price <= bid[..., None])
+        first_buy = np.where(buy_fills.any(axis=-1), buy_fills.argmax(axis=-1), hold)
+        sell_fills = (high_price >= ask[..., None]) & (np.arange(hold) >= first_buy[..., None])
+        sell_capacity = np.floor(params["volume_share"] * (self.grids["high_volume"][items, window] * sell_fills).sum(axis=-1))
+        last_low = np.where(low_price > 0, np.arange(hold), -1).max(axis=-1)
+        exit_price = np.where(last_low >= 0, np.take_along_axis(low_price, np.maximum(last_low, 0)[..., None], axis=-1)[..., 0], bid)
+
+        sold = np.minimum(quantity, sell_capacity)
+        unsold = quantity - sold
+        proceeds = sold * (ask - ge_tax(ask, self.config)) + unsold * (exit_price - ge_tax(exit_price, self.config))
+        pnl = proceeds - quantity * bid
+        return self.report(params, pnl, quantity, decisions)
+
+    def allocate(self, decisions, columns, predictions, params):
+        # Each decision sizes every screened candidate jointly, as generate_item_suggestions does, with
+        # the gold still tied up in open positions held back and buy limits reduced by what was bought in
+        # the last window; fills are then capped by the volume that actually traded at or below the bid.
+        # Returns (slot x decision) item rows and quantities.
+        top_n, hold, gold = params["top_n"], params["hold"], params["gold"]
+        limit_buckets = self.config.BUY_LIMIT_WINDOW // BUCKET_SECONDS
+        chosen = np.zeros((top_n, len(decisions)), dtype=np.intp)
+        quantity = np.zeros((top_n, len(decisions)))
+        caps = volume_caps(columns["high_volume"], columns["low_volume"], self.config)
+        used = np.zeros(len(self.item_ids))
+        purchases = deque()
+        # Positions are closed at the end of their hold window, which frees their cost again
+        invested = 0.0
+        positions = deque()
+        for decision, bucket in enumerate(decisions.tolist()):
+            while purchases and purchases[0][0] <= bucket:
+                _, items, amounts = purchases.popleft()
+                used[items] -= amounts
+            while positions and positions[0][0] <= bucket:
+                invested -= positions.popleft()[1]
+            candidates = np.flatnonzero(predictions[:, decision] > 0)
+            available = int(gold - invested)
+            if not len(candidates) or available <= 0:
+                continue
+            view = {
+                "low": columns["low"][candidates, decision],
+                "buy_limit": self.buy_limit[candidates] - used[candidates],
+                "high_volume": columns["high_volume"][candidates, decision],
+                "low_volume": columns["low_volume"][candidates, decision],
+            }
+            priority = scores(view, predictions[candidates, decision], params["key"], self.config)
+            planned = allocate(np.expm1(predictions[candidates, decision]), view["low"], view["buy_limit"],
+                               caps[candidates, decision], available, top_n, priority)
+            picked = np.flatnonzero(planned > 0)
+            picked = picked[top_k(priority[picked])]
+            items = candidates[picked]
+
+            window = bucket + np.arange(1, hold + 1)
+            low_price = self.grids["low_price"][items][:, window]
+            fills = (low_price > 0) & (low_price <= columns["low"][items, decision][:, None])
+            capacity = np.floor(params["volume_share"] * (self.grids["low_volume"][items][:, window] * fills).sum(axis=1))
+            amounts = np.minimum(planned[picked], capacity)
+
+            chosen[:len(items), decision] = items
+            quantity[:len(items), decision] = amounts
+            used[items] += amounts
+            purchases.append((bucket + limit_buckets, items, amounts))
+            cost = float(amounts @ columns["low"][items, decision])
+            invested += cost
+            positions.append((bucket + hold, cost))
+        return chosen, quantity
+
+    def report(self, params, pnl, quantity, decisions):
+        traded = quantity > 0
+        decision_pnl = pnl.sum(axis=0) if pnl.size else np.zeros(len(decisions))
+        equity = np.cumsum(decision_pnl)
+        peak = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+        trades = int(traded.sum())
+        return {
+            "params": params,
+            "decisions": len(decisions),
+            "trades": trades,
+            "pnl": float(decision_pnl.sum()),
+            "hit_rate": float((pnl[traded] > 0).mean()) if trades else 0.0,
+            "max_drawdown": float((peak - equity).max()) if len(equity) else 0.0,
+            "roi": float(decision_pnl.sum() / (params["gold"] * len(decisions))) if len(decisions) else 0.0,
+            "equity": equity,
+        }
+
+_worker = {}
+
+def init_worker(archive_directory, start, end, buy_limits, model, features):
+    # Each worker process loads the history once, then runs many parameter sets
+    archive = SnapshotArchive(archive_directory)
+    _worker["backtester"] = Backtester.from_archive(archive, start, end, buy_limits, model, features)
+
+def run_params(params):
+    return _worker["backtester"].run(params)
+
+def sweep(param_sets, archive_directory, start, end, buy_limits, model_file, config=Config, max_workers=None):
+    # The model is loaded here rather than in the workers, so a missing or stale model.pkl fails with
+    # a clear error instead of a broken pool
+    bundle = load_bundle(model_file) if os.path.exists(model_file) else None
+    if bundle is None:
+        raise ValueError(f"No usable model in {model_file}; train one first.")
+    model = compile_pipeline(bundle["pipeline"]) if config.COMPILED_INFERENCE else bundle["pipeline"]
+    initargs = (archive_directory, start, end, buy_limits, model, bundle["features"])
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=init_worker, initargs=initargs) as executor:
+        results = list(executor.map(run_params, param_sets))
+    return sorted(results, key=lambda result: result["pnl"], reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archive", default=Config.ARCHIVE_DIR, help="Snapshot archive directory")
+    parser.add_argument("--days", type=int, default=30, help="Replay this many of the most recent archived days")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    archive = SnapshotArchive(args.archive)
+    days = archive.days()
+    if not days:
+        print(f"No archived history in {args.archive}.")
+        return
+    mapping_cache = MappingCache.shared(Config)
+    mapping_cache.load()
+    end = days[-1] + DAY_SECONDS
+    start = end - args.days * DAY_SECONDS
+    param_sets = expand_grid({"top_n": [3, 5, 10], "interval": [6, 12, 48], "hold": [6, 12, 24]})
+    results = sweep(param_sets, args.archive, start, end, mapping_cache.buy_limits or {}, Config.MODEL_FILE, Config, args.workers)
+    for result in results[:10]:
+        print(f"{result['params']}: pnl {result['pnl']:,.0f}, {result['trades']} trades, hit rate {result['hit_rate']:.1%}, "
+              f"max drawdown {result['max_drawdown']:,.0f}, roi {result['roi']:.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# benchmarks/__init__.py
+
+import atexit
+import shutil
+import tempfile
+
+def scratch_directory():
+    # Temporary directory for one benchmark run, removed when the process exits, even after a failure
+    directory = tempfile.mkdtemp(prefix="osrs_bench_")
+    atexit.register(shutil.rmtree, directory, True)
+    return directory
@@ -0,0 +1,75 @@
+# benchmarks/bench_agent.py
+
+import argparse
+import os
+import time
+import numpy as np
+from benchmarks import scratch_directory
+from benchmarks.bench_environment import make_market
+from config import Config
+from osrs_rl.agent import OSRSAgent
+
+def agent_config():
+    # Keep the benchmark away from any Q-table saved in the working directory
+    return type("BenchConfig", (Config,), {"Q_TABLE_FILE": os.path.join(scratch_directory(), "q_table.bin")})
+
+def evaluate(agent, market, steps):
+    states = market.reset()
+    profit = 0.0
+    for _ in range(steps):
+        states, rewards, _, _ = market.step(agent.predict(states))
+        profit += rewards.sum()
+    return profit / (steps * market.num_envs)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--envs", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+    config = agent_config()
+
+    market = make_market(500, 7, args.envs)
+    states = market.reset()
+    transitions = []
+    agent = OSRSAgent(config, seed=0)
+    for _ in range(20):
+        actions = agent.choose_action(states)
+        next_states, rewards, dones, _ = market.step(actions)
+        transitions.append((states, actions, rewards, next_states, dones))
+        states = next_states
+
+    looped = OSRSAgent(config, seed=0)
+    start = time.perf_counter()
+    for batch in transitions:
+        for state, action, reward, next_state, done in zip(*(values.tolist() for values in batch)):
+            looped.update_q_table(state, action, reward, next_state, done)
+    loop_rate = len(transitions) * args.envs / (time.perf_counter() - start)
+    batched = OSRSAgent(config, seed=0)
+    start = time.perf_counter()
+    for batch in transitions:
+        batched.update_q_table(*batch)
+    batch_rate = len(transitions) * args.envs / (time.perf_counter() - start)
+    print(f"TD updates: {loop_rate:12,.0f} transitions/s one at a time, {batch_rate:12,.0f} batched ({batch_rate / loop_rate:.0f}x)")
+
+    agent = OSRSAgent(config, seed=0)
+    states = market.reset()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        actions = agent.choose_action(states)
+        next_states, rewards, dones, _ = market.step(actions)
+        agent.update_q_table(states, actions, rewards / Config.STARTING_GOLD, next_states, dones)
+        states = next_states
+    train_time = time.perf_counter() - start
+    print(f"trained on {args.steps * args.envs:,} transitions in {train_time:.1f}s")
+
+    random_agent = OSRSAgent(type("RandomConfig", (config,), {"EPSILON": 1.0}), seed=1)
+    random_agent.predict = random_agent.choose_action
+    print(f"mean reward per step: greedy {evaluate(agent, market, 500):,.0f} gp, random {evaluate(random_agent, market, 500):,.0f} gp")
+
+    agent.save(config.Q_TABLE_FILE)
+    restored = OSRSAgent(config)
+    assert np.array_equal(restored.q_table, agent.q_table)
+    print(f"Q-table file: {os.path.getsize(config.Q_TABLE_FILE)} bytes for {agent.q_table.shape[0]}x{agent.q_table.shape[1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_archive.py
+
+import argparse
+import os
+import time
+import numpy as np
+from config import Config
+from osrs_rl.agent import DataManager
+from snapshot_archive import BUCKET_SECONDS, BUCKETS_PER_DAY, COLUMNS, DAY_SECONDS, SnapshotArchive
+from benchmarks import scratch_directory
+
+def random_walk_history(num_items, num_buckets, seed=42):
+    # Prices that mostly sit still and move by about a percent when they do, like real 5m data
+    rng = np.random.default_rng(seed)
+    base = rng.integers(10, 200000, num_items).astype(np.float64)
+    moves = np.where(rng.random((num_items, num_buckets)) < 0.3, rng.normal(0, 0.01, (num_items, num_buckets)), 0)
+    high = np.round(base[:, None] * np.exp(np.cumsum(moves, axis=1))).astype(np.int64)
+    low = np.round(high * 0.97).astype(np.int64)
+    traded = rng.random((num_items, num_buckets)) < 0.7
+    high_volume = np.where(traded, rng.poisson(200, (num_items, num_buckets)), 0)
+    low_volume = np.where(traded, rng.poisson(200, (num_items, num_buckets)), 0)
+    return {"high_price": high * traded, "low_price": low * traded, "high_volume": high_volume, "low_volume": low_volume}
+
+def check_gap(directory, start, item_ids, history):
+    # Days 0 and 2 stored, day 1 missing: day 2 must keep its own timestamps and day 1 read as no data
+    archive = SnapshotArchive(os.path.join(directory, "gap"))
+    for day in (0, 2):
+        archive.write_day(start + day * DAY_SECONDS, item_ids, {column: history[column][:, day * BUCKETS_PER_DAY:(day + 1) * BUCKETS_PER_DAY] for column in COLUMNS})
+    loaded_ids, timestamps, grids = archive.load_range(start, start + 3 * DAY_SECONDS)
+    assert np.array_equal(loaded_ids, item_ids)
+    assert np.array_equal(timestamps, start + BUCKET_SECONDS * np.arange(3 * BUCKETS_PER_DAY))
+    for column in COLUMNS:
+        assert not grids[column][:, BUCKETS_PER_DAY:2 * BUCKETS_PER_DAY].any()
+        for day in (0, 2):
+            buckets = slice(day * BUCKETS_PER_DAY, (day + 1) * BUCKETS_PER_DAY)
+            assert np.array_equal(grids[column][:, buckets], history[column][:, buckets])
+    _, timestamps, grids = archive.load_range(start + 2 * DAY_SECONDS + 3600, start + 3 * DAY_SECONDS)
+    assert timestamps[0] == start + 2 * DAY_SECONDS + 3600
+    assert np.array_equal(grids["high_price"], history["high_price"][:, 2 * BUCKETS_PER_DAY + 12:3 * BUCKETS_PER_DAY])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--cached-days", type=int, default=Config.ARCHIVE_CACHED_DAYS, help="Decoded days kept under .decoded/")
+    args = parser.parse_args()
+
+    directory = scratch_directory()
+    start = 1_700_006_400 // DAY_SECONDS * DAY_SECONDS
+    end = start + args.days * DAY_SECONDS
+    num_buckets = args.days * BUCKETS_PER_DAY
+    item_ids = np.arange(2, args.items + 2)
+    history = random_walk_history(args.items, num_buckets)
+
+    db_file = os.path.join(directory, "history.db")
+    data_manager = DataManager(db_file)
+    data_manager.create_tables()
+    for bucket in range(num_buckets):
+        traded = history["high_volume"][:, bucket] + history["low_volume"][:, bucket] > 0
+        data_manager.insert_prices(zip(item_ids[traded].tolist(), [start + bucket * BUCKET_SECONDS] * int(traded.sum()),
+                                       *(history[column][traded, bucket].tolist() for column in COLUMNS)))
+    data_manager.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    archive = SnapshotArchive(os.path.join(directory, "archive"), cached_days=args.cached_days)
+    export_start = time.perf_counter()
+    archive.export_from_db(data_manager, start, end)
+    export_time = time.perf_counter() - export_start
+
+    db_size = os.path.getsize(db_file)
+    archive_size = sum(os.path.getsize(os.path.join(archive.directory, name)) for name in os.listdir(archive.directory) if name.endswith(".osra"))
+    rows = int((history["high_volume"] + history["low_volume"] > 0).sum())
+    print(f"{rows:,} rows, {args.items} items x {args.days} days (export took {export_time:.1f}s)")
+    print(f"  SQLite: {db_size / 2 ** 20:8.1f} MiB")
+    print(f"  archive: {archive_size / 2 ** 20:7.1f} MiB ({db_size / archive_size:.1f}x smaller, {archive_size * 8 / rows:.1f} bits/row)")
+
+    scan_start = time.perf_counter()
+    prices = data_manager.get_price_range(start, end)
+    sql_time = time.perf_counter() - scan_start
+    scan_start = time.perf_counter()
+    archive.load_range(start, end)
+    cold_time = time.perf_counter() - scan_start
+    scan_start = time.perf_counter()
+    loaded_ids, timestamps, grids = archive.load_range(start, end)
+    warm_time = time.perf_counter() - scan_start
+    decoded_size = archive.decoded_size()
+    assert len(archive.decoded_days()) == min(args.days, args.cached_days)
+
+    assert np.array_equal(loaded_ids, item_ids)
+    for column in COLUMNS:
+        assert np.array_equal(grids[column], history[column])
+    print(f"scan all items over {args.days} days:")
+    print(f"  SQLite get_price_range:  {sql_time * 1000:8.1f} ms ({len(prices['item_id']):,} rows)")
+    print(f"  archive (decode):         {cold_time * 1000:7.1f} ms")
+    print(f"  archive (second read):    {warm_time * 1000:7.1f} ms, {min(args.days, args.cached_days)} days "
+          f"in the decoded cache ({decoded_size / 2 ** 20:.1f} MiB, {(archive_size + decoded_size) / 2 ** 20:.1f} MiB on disk in total)")
+    if args.days >= 3:
+        check_gap(directory, start, item_ids, history)
+
+    reimport = DataManager(os.path.join(directory, "reimport.db"))
+    reimport.create_tables()
+    assert archive.import_into_db(reimport) == rows
+    data_manager.disconnect()
+    reimport.disconnect()
+
+if __name__ == "__main__":
+    main()
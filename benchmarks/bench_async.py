@@ -0,0 +1,38 @@
+# benchmarks/bench_async.py
+
+import argparse
+import time
+from OSRSScraper import OSRSScraper
+from AsyncOSRSScraper import AsyncOSRSScraper
+from benchmarks.bench_scrape import mock_config
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+def time_refreshes(scraper_class, config, refreshes):
+    timings = []
+    scraper = None
+    for refresh in range(refreshes):
+        start = time.perf_counter()
+        if scraper is None:
+            scraper = scraper_class(config)
+        items_data = scraper.scrape_data()
+        timings.append(time.perf_counter() - start)
+    if hasattr(scraper, "close"):
+        scraper.close()
+    return timings, len(items_data)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated server latency per request (seconds)")
+    parser.add_argument("--refreshes", type=int, default=5)
+    args = parser.parse_args()
+
+    with MockAPIServer(MarketFixture(num_items=args.items), latency=args.latency) as server:
+        for name, scraper_class in (("sync", OSRSScraper), ("async", AsyncOSRSScraper)):
+            config = mock_config(server.base_url)
+            server.reset_counts()
+            timings, num_items = time_refreshes(scraper_class, config, args.refreshes)
+            print(f"{name:>5}: first refresh {timings[0]:.3f}s, warm refresh {min(timings[1:] or timings):.3f}s, {num_items} items, {server.total_requests()} requests")
+
+if __name__ == "__main__":
+    main()
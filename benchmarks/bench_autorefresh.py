@@ -0,0 +1,78 @@
+# benchmarks/bench_autorefresh.py
+
+import argparse
+import copy
+import os
+import random
+import time
+import numpy as np
+from config import Config
+from feature_engine import enrich_snapshot
+from service import SuggestionService
+from utils import train_model
+from benchmarks import scratch_directory
+from benchmarks.bench_snapshot import make_payloads, offline_scraper
+from benchmarks.mock_api import MarketFixture
+
+class ReplayScraper:
+    # Hands the service prepared payloads instead of polling the API
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.payload = None
+
+    def scrape_snapshot(self, progress=None):
+        return self.scraper.build_snapshot(*self.payload)
+
+def with_trades(payload, fraction, seed):
+    # Same bucket polled again after late trades revised some items' 5m averages and volumes
+    data_latest, data_5m, data_historical, timestamp = payload
+    data_5m = copy.deepcopy(data_5m)
+    rng = random.Random(seed)
+    for item_id in rng.sample(sorted(data_5m), int(len(data_5m) * fraction)):
+        entry = data_5m[item_id]
+        if entry["avgHighPrice"]:
+            entry["avgHighPrice"] = int(entry["avgHighPrice"] * rng.uniform(0.99, 1.02)) + 1
+        entry["highPriceVolume"] += rng.randint(1, 50)
+    return data_latest, data_5m, data_historical, timestamp
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--estimators", type=int, default=100)
+    args = parser.parse_args()
+
+    directory = scratch_directory()
+    config = type("AutoRefreshConfig", (Config,), {
+        "MODEL_FILE": os.path.join(directory, "model.pkl"),
+        "HISTORY_DB": os.path.join(directory, "history.db"),
+        "N_ESTIMATORS": args.estimators,
+    })
+    fixture = MarketFixture(num_items=args.items)
+    scraper = ReplayScraper(offline_scraper(fixture))
+    previous, current, following = make_payloads(fixture, 3)
+    train_model(enrich_snapshot(scraper.scraper.build_snapshot(*previous), config), config)
+
+    ticks = [("first refresh", current), ("same bucket, nothing revised", current)]
+    ticks += [(f"same bucket, {fraction:.0%} revised", with_trades(current, fraction, seed))
+              for seed, fraction in enumerate((0.01, 0.05, 0.2))]
+    ticks += [("next 5m bucket", following)]
+
+    service = SuggestionService(config, scraper=scraper)
+    full = SuggestionService(config, scraper=scraper)
+    print(f"{args.items} items, {args.estimators} trees:")
+    for label, payload in ticks:
+        scraper.payload = payload
+        start = time.perf_counter()
+        assert service.refresh()
+        incremental_time = time.perf_counter() - start
+        full.scored = None
+        start = time.perf_counter()
+        assert full.refresh()
+        full_time = time.perf_counter() - start
+        assert np.array_equal(service.scored[4], full.scored[4]), "incremental predictions diverged"
+        assert service.suggestions(10000000) == full.suggestions(10000000)
+        print(f"  {label:32s} {service.stats['last_predicted_items']:5d} of {len(service.scored[4])} items predicted, "
+              f"refresh {incremental_time * 1000:6.1f} ms (full {full_time * 1000:6.1f} ms)")
+
+if __name__ == "__main__":
+    main()
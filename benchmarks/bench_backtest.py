@@ -0,0 +1,108 @@
+# benchmarks/bench_backtest.py
+
+import argparse
+import os
+import time
+import numpy as np
+from backtest import Backtester, default_params, sweep
+from benchmarks import scratch_directory
+from benchmarks.bench_archive import random_walk_history
+from config import Config
+from feature_engine import ROLLING_FEATURES
+from market_snapshot import FEATURE_COLUMNS, build_snapshot
+from model_store import build_pipeline, make_bundle, save_bundle
+from snapshot_archive import BUCKET_SECONDS, BUCKETS_PER_DAY, COLUMNS, DAY_SECONDS, SnapshotArchive
+from tree_engine import compile_pipeline
+from utils import expand_grid, prepare_training_data
+
+def payloads(item_ids, grids, bucket):
+    # The /5m payloads the recorder would have stored for this bucket and the one before
+    def bucket_payload(index):
+        present = np.any([grids[column][:, index] != 0 for column in COLUMNS], axis=0)
+        return {
+            str(item_id): {
+                "avgHighPrice": int(grids["high_price"][row, index]) or None,
+                "avgLowPrice": int(grids["low_price"][row, index]) or None,
+                "highPriceVolume": int(grids["high_volume"][row, index]),
+                "lowPriceVolume": int(grids["low_volume"][row, index]),
+            }
+            for row, item_id in zip(np.flatnonzero(present).tolist(), item_ids[present].tolist())
+        }
+    data_5m = bucket_payload(bucket)
+    return dict.fromkeys(data_5m, {}), data_5m, bucket_payload(bucket - 1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--train-days", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    directory = scratch_directory()
+    start = 1_700_006_400 // DAY_SECONDS * DAY_SECONDS
+    num_buckets = args.days * BUCKETS_PER_DAY
+    item_ids = np.arange(2, args.items + 2)
+    history = random_walk_history(args.items, num_buckets)
+    rng = np.random.default_rng(7)
+    buy_limits = {str(item_id): int(limit) for item_id, limit in zip(item_ids.tolist(), rng.choice([100, 1000, 10000, 25000], args.items))}
+
+    archive = SnapshotArchive(os.path.join(directory, "archive"))
+    for day in range(args.days):
+        columns = slice(day * BUCKETS_PER_DAY, (day + 1) * BUCKETS_PER_DAY)
+        archive.write_day(start + day * DAY_SECONDS, item_ids, {column: history[column][:, columns] for column in COLUMNS})
+    timestamps = start + BUCKET_SECONDS * np.arange(num_buckets)
+    # The archive is the history source here, so the rolling columns are always available
+    features = FEATURE_COLUMNS + ROLLING_FEATURES
+
+    # Snapshots rebuilt from history must match what build_snapshot makes of the same payloads
+    replay = Backtester(item_ids, timestamps, history, buy_limits, None, features)
+    for bucket in (1, 500, num_buckets - 1):
+        expected = build_snapshot(*payloads(item_ids, history, bucket), {}, buy_limits, Config)
+        actual = replay.snapshot(bucket)
+        assert np.array_equal(expected.item_ids, actual.item_ids)
+        assert np.array_equal(expected.features(), actual.features()[:, :len(expected.feature_names())])
+
+    train_buckets = range(1, args.train_days * BUCKETS_PER_DAY, 12)
+    batches = [prepare_training_data(replay.snapshot(bucket)) for bucket in train_buckets]
+    pipeline = build_pipeline(Config, n_estimators=50)
+    pipeline.fit(np.concatenate([X for X, _ in batches]), np.concatenate([y for _, y in batches]))
+    model_file = os.path.join(directory, "model.pkl")
+    save_bundle(make_bundle(pipeline, features=features), model_file)
+
+    test_start = start + args.train_days * DAY_SECONDS
+    end = start + args.days * DAY_SECONDS
+    load_start = time.perf_counter()
+    backtester = Backtester.from_archive(archive, test_start, end, buy_limits, compile_pipeline(pipeline), features)
+    load_time = time.perf_counter() - load_start
+    run_start = time.perf_counter()
+    result = backtester.run()
+    run_time = time.perf_counter() - run_start
+    rerun_start = time.perf_counter()
+    backtester.run({"top_n": 10})
+    rerun_time = time.perf_counter() - rerun_start
+    print(f"{args.items} items x {args.days - args.train_days} days ({len(backtester.timestamps):,} buckets), "
+          f"{result['decisions']} decisions, {result['trades']} trades")
+    print(f"  load archive: {load_time:.2f}s, first run: {run_time:.2f}s, rerun with cached predictions: {rerun_time * 1000:.0f} ms")
+    print(f"  pnl {result['pnl']:,.0f}, hit rate {result['hit_rate']:.1%}, max drawdown {result['max_drawdown']:,.0f}, roi {result['roi']:.3%}")
+
+    # Overlapping holds must share the budget: gold in open positions never exceeds it at any decision
+    params = dict(default_params(Config), interval=6, hold=24)
+    decisions = np.arange(1, len(backtester.timestamps) - params["hold"], params["interval"])
+    columns, predictions = backtester.predict(decisions)
+    chosen, quantity = backtester.allocate(decisions, columns, predictions, params)
+    cost = (quantity * columns["low"][chosen, np.arange(len(decisions))]).sum(axis=0)
+    invested = np.convolve(cost, np.ones(params["hold"] // params["interval"]))[:len(cost)]
+    assert invested.max() <= params["gold"]
+    print(f"  interval 6, hold 24: at most {invested.max():,.0f} of {params['gold']:,} gold in open positions")
+
+    param_sets = expand_grid({"top_n": [3, 5, 10], "interval": [6, 12, 48], "hold": [6, 12]})
+    sweep_start = time.perf_counter()
+    results = sweep(param_sets, archive.directory, test_start, end, buy_limits, model_file, Config, args.workers)
+    sweep_time = time.perf_counter() - sweep_start
+    best = results[0]
+    print(f"sweep of {len(param_sets)} parameter sets on {args.workers} processes: {sweep_time:.1f}s")
+    print(f"  best {best['params']}: pnl {best['pnl']:,.0f}, hit rate {best['hit_rate']:.1%}, max drawdown {best['max_drawdown']:,.0f}")
+
+if __name__ == "__main__":
+    main()
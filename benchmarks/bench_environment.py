@@ -0,0 +1,57 @@
+# benchmarks/bench_environment.py
+
+import argparse
+import time
+import numpy as np
+from benchmarks.bench_archive import random_walk_history
+from config import Config
+from osrs_rl.environment import MarketEnvironment, OSRSEnvironment
+from snapshot_archive import BUCKET_SECONDS, BUCKETS_PER_DAY
+
+def make_market(num_items, days, num_envs, seed=0):
+    num_buckets = days * BUCKETS_PER_DAY
+    item_ids = np.arange(2, num_items + 2)
+    rng = np.random.default_rng(seed)
+    buy_limits = {str(item_id): int(limit) for item_id, limit in zip(item_ids.tolist(), rng.choice([100, 1000, 10000], num_items))}
+    timestamps = 1_700_006_400 + BUCKET_SECONDS * np.arange(num_buckets)
+    return MarketEnvironment(item_ids, timestamps, random_walk_history(num_items, num_buckets), buy_limits, Config, num_envs, seed)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--envs", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+
+    environment = OSRSEnvironment(Config, make_market(args.items, args.days, 1))
+    environment.reset()
+    steps = episodes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        _, _, done, _ = environment.step(int(rng.integers(0, Config.NUM_ACTIONS)))
+        steps += 1
+        if done:
+            episodes += 1
+            environment.reset()
+    single_rate = steps / (time.perf_counter() - start)
+
+    market = make_market(args.items, args.days, args.envs)
+    market.reset()
+    steps = episodes = 0
+    profit = 0.0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        _, rewards, dones, _ = market.step(rng.integers(0, Config.NUM_ACTIONS, args.envs))
+        steps += 1
+        episodes += int(dones.sum())
+        profit += rewards.sum()
+    batched_rate = steps * args.envs / (time.perf_counter() - start)
+
+    print(f"single env:        {single_rate:12,.0f} env-steps/s")
+    print(f"{args.envs} batched envs: {batched_rate:12,.0f} env-steps/s ({batched_rate / single_rate:.0f}x)")
+    print(f"  random policy: {episodes} episodes, mean PnL {profit / max(episodes, 1):,.0f} gp per episode")
+
+if __name__ == "__main__":
+    main()
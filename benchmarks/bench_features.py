@@ -0,0 +1,103 @@
+# benchmarks/bench_features.py
+
+import argparse
+import os
+import time
+import tracemalloc
+import numpy as np
+from config import Config
+from benchmarks import scratch_directory
+from benchmarks.bench_archive import random_walk_history
+from feature_engine import ROLLING_FEATURES, RollingFeatureEngine, rolling_features
+from osrs_rl.agent import DataManager
+from snapshot_archive import BUCKET_SECONDS, BUCKETS_PER_DAY, COLUMNS, DAY_SECONDS, SnapshotArchive
+
+def cold_start(item_ids, timestamps, history, window):
+    # First sync of an empty engine: the archive plus the capped database tail against the whole lookback from SQLite
+    directory = scratch_directory()
+    data_manager = DataManager(os.path.join(directory, "history.db"))
+    data_manager.create_tables()
+    for bucket, timestamp in enumerate(timestamps.tolist()):
+        traded = history["high_volume"][:, bucket] + history["low_volume"][:, bucket] > 0
+        data_manager.insert_prices(zip(item_ids[traded].tolist(), [timestamp] * int(traded.sum()),
+                                       *(history[column][traded, bucket].tolist() for column in COLUMNS)))
+    archive = SnapshotArchive(os.path.join(directory, "archive"))
+    archive.export_from_db(data_manager, int(timestamps[0]), int(timestamps[-1]) + BUCKET_SECONDS)
+    lookback = len(timestamps) * BUCKET_SECONDS
+
+    def fetch_all(engine):
+        # What a cold sync did before: the whole lookback in one fetchall
+        return engine.replay_rows(data_manager.get_price_range(int(timestamps[0])))
+
+    engines = {}
+    for label, sync in (("archive + capped database", lambda engine: engine.sync(data_manager, lookback, archive, Config.FEATURE_DB_LOOKBACK)),
+                        ("database only, streamed", lambda engine: engine.sync(data_manager, lookback, None, lookback)),
+                        ("database only, fetchall", fetch_all)):
+        engine = RollingFeatureEngine(window)
+        tracemalloc.start()
+        sync_start = time.perf_counter()
+        updated = sync(engine)
+        sync_time = time.perf_counter() - sync_start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        engines[label] = engine
+        print(f"  {label:28s} {sync_time * 1000:8.1f} ms, peak {peak / 2 ** 20:7.1f} MiB ({updated} buckets)")
+    features = [engine.features() for engine in engines.values()]
+    for name in ROLLING_FEATURES:
+        for other in features[1:]:
+            assert np.allclose(features[0][name], other[name], rtol=1e-7, atol=1e-7), name
+    data_manager.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--window", type=int, default=12)
+    parser.add_argument("--cold-start-days", type=int, default=1, help="History for the cold-start sync comparison, 0 to skip")
+    args = parser.parse_args()
+
+    num_buckets = args.days * BUCKETS_PER_DAY
+    start = 1_700_006_400 // DAY_SECONDS * DAY_SECONDS
+    timestamps = start + BUCKET_SECONDS * np.arange(num_buckets)
+    item_ids = np.arange(2, args.items + 2)
+    history = random_walk_history(args.items, num_buckets)
+
+    batch_start = time.perf_counter()
+    batch = rolling_features(timestamps, history, args.window)
+    batch_time = time.perf_counter() - batch_start
+    print(f"batch: {len(ROLLING_FEATURES)} features for {args.items} items x {num_buckets} buckets in {batch_time * 1000:.1f} ms")
+
+    engine = RollingFeatureEngine(args.window, item_ids)
+    tick_times = []
+    for bucket, timestamp in enumerate(timestamps.tolist()):
+        tick_start = time.perf_counter()
+        engine.update(timestamp, item_ids, *(history[column][:, bucket] for column in COLUMNS))
+        tick_times.append(time.perf_counter() - tick_start)
+        if bucket % 97 == 0 or bucket == num_buckets - 1:
+            features = engine.features()
+            for name in ROLLING_FEATURES:
+                assert np.allclose(features[name], batch[name][:, bucket], rtol=1e-7, atol=1e-7), (name, bucket)
+    incremental = np.median(tick_times)
+
+    # What a new snapshot would cost without running state: recompute the trailing day from scratch
+    recompute_times = []
+    for bucket in range(num_buckets - 10, num_buckets):
+        window = slice(bucket + 1 - BUCKETS_PER_DAY, bucket + 1)
+        recompute_start = time.perf_counter()
+        rolling_features(timestamps[window], {column: history[column][:, window] for column in COLUMNS}, args.window)
+        recompute_times.append(time.perf_counter() - recompute_start)
+    recompute = np.median(recompute_times)
+
+    print(f"per new snapshot ({args.items} items):")
+    print(f"  incremental update: {incremental * 1000:8.3f} ms ({incremental / args.items * 1e9:.0f} ns/item)")
+    print(f"  recompute last day: {recompute * 1000:8.3f} ms ({recompute / incremental:.0f}x slower)")
+    print("incremental features match the batch pass")
+
+    if args.cold_start_days:
+        buckets = slice(num_buckets - args.cold_start_days * BUCKETS_PER_DAY, num_buckets)
+        print(f"cold-start sync of {args.cold_start_days} day(s) of history ({args.items} items):")
+        cold_start(item_ids, timestamps[buckets], {column: history[column][:, buckets] for column in COLUMNS}, args.window)
+        print("all cold starts give the same features")
+
+if __name__ == "__main__":
+    main()
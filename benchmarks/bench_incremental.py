@@ -0,0 +1,52 @@
+# benchmarks/bench_incremental.py
+
+import argparse
+import os
+import time
+import numpy as np
+from config import Config
+from model_store import model_cache
+from utils import prepare_training_data, train_model
+from benchmarks import scratch_directory
+from benchmarks.bench_snapshot import make_payloads, offline_scraper
+from benchmarks.mock_api import MarketFixture
+
+def holdout_error(model, snapshot):
+    X, y = prepare_training_data(snapshot)
+    return float(np.mean(np.abs(model.predict(X) - y)))
+
+def replay(snapshots, config):
+    timings = []
+    errors = []
+    for index, snapshot in enumerate(snapshots[:-1]):
+        start = time.perf_counter()
+        model = train_model(snapshot, config)
+        timings.append(time.perf_counter() - start)
+        errors.append(holdout_error(model, snapshots[index + 1]))
+    return timings, errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--snapshots", type=int, default=30)
+    args = parser.parse_args()
+
+    fixture = MarketFixture(num_items=args.items)
+    scraper = offline_scraper(fixture)
+    snapshots = [scraper.build_snapshot(*payload) for payload in make_payloads(fixture, args.snapshots)]
+    model_dir = scratch_directory()
+
+    for name, incremental in (("full refit", False), ("incremental", True)):
+        config = type("BenchConfig", (Config,), {
+            "MODEL_FILE": os.path.join(model_dir, f"{name.replace(' ', '_')}.pkl"),
+            "INCREMENTAL_TRAINING": incremental,
+        })
+        model_cache.invalidate()
+        timings, errors = replay(snapshots, config)
+        print(f"{name}:")
+        for update, (elapsed, error) in enumerate(zip(timings, errors), start=1):
+            print(f"  update {update:3d}: {elapsed * 1000:8.1f} ms, next-snapshot MAE (log profit) {error:.4f}")
+        print(f"  mean update {np.mean(timings[1:]) * 1000:.1f} ms, mean holdout MAE {np.mean(errors):.4f}")
+
+if __name__ == "__main__":
+    main()
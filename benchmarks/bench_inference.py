@@ -0,0 +1,46 @@
+# benchmarks/bench_inference.py
+
+import argparse
+import time
+import numpy as np
+from config import Config
+from model_store import build_pipeline
+from tree_engine import CompiledPipeline
+from utils import generate_item_suggestions, prepare_training_data
+from benchmarks.bench_model_io import best_of
+from benchmarks.bench_snapshot import make_payloads, offline_scraper
+from benchmarks.mock_api import MarketFixture
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--snapshots", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    fixture = MarketFixture(num_items=args.items)
+    scraper = offline_scraper(fixture)
+    snapshots = [scraper.build_snapshot(*payload) for payload in make_payloads(fixture, args.snapshots + 1)]
+    batches = [prepare_training_data(snapshot) for snapshot in snapshots[:-1]]
+    pipeline = build_pipeline(Config)
+    pipeline.fit(np.concatenate([X for X, _ in batches]), np.concatenate([y for _, y in batches]))
+
+    start = time.perf_counter()
+    compiled = CompiledPipeline(pipeline)
+    compile_time = time.perf_counter() - start
+
+    snapshot = snapshots[-1]
+    X, _ = prepare_training_data(snapshot)
+    expected = pipeline.predict(X)
+    assert np.array_equal(compiled.predict(X), expected), "compiled forest diverged from sklearn"
+
+    print(f"{len(pipeline[-1].estimators_)} trees, {len(compiled.forest.value)} nodes, compiled in {compile_time * 1000:.1f} ms")
+    print(f"predict on {len(X)} rows (outputs identical):")
+    print(f"  sklearn:  {best_of(lambda: pipeline.predict(X), args.repeats) * 1000:8.2f} ms")
+    print(f"  compiled: {best_of(lambda: compiled.predict(X), args.repeats) * 1000:8.2f} ms")
+    print("generate_item_suggestions:")
+    print(f"  sklearn:  {best_of(lambda: generate_item_suggestions(snapshot, 10000000, pipeline, None, None), args.repeats) * 1000:8.2f} ms")
+    print(f"  compiled: {best_of(lambda: generate_item_suggestions(snapshot, 10000000, compiled, None, None), args.repeats) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
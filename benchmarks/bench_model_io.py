@@ -0,0 +1,59 @@
+# benchmarks/bench_model_io.py
+
+import argparse
+import os
+import pickle
+import time
+import numpy as np
+from config import Config
+from model_store import build_pipeline, history_file, load_bundle, make_bundle, save_bundle, save_history
+from benchmarks import scratch_directory
+from benchmarks.bench_training import synthetic_snapshots
+
+def best_of(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--snapshots", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshots = synthetic_snapshots(args.items, args.snapshots)
+    X = np.concatenate([snapshot.features() for snapshot in snapshots])
+    y = np.log1p(np.concatenate([snapshot.targets() for snapshot in snapshots]))
+    pipeline = build_pipeline(Config)
+    pipeline.fit(X, y)
+    bundle = make_bundle(pipeline)
+    directory = scratch_directory()
+
+    pickle_file = os.path.join(directory, "model_pickle.pkl")
+    with open(pickle_file, "wb") as file:
+        pickle.dump(bundle, file)
+
+    def load_pickle():
+        with open(pickle_file, "rb") as file:
+            pickle.load(file)
+
+    rows = [("pickle", pickle_file, load_pickle)]
+    for compress in (0, 3):
+        model_file = os.path.join(directory, f"model_{compress}.pkl")
+        save_bundle(bundle, model_file, compress)
+        rows.append((f"bundle compress={compress}", model_file, lambda model_file=model_file: load_bundle(model_file)))
+    # The training windows are stored apart from the bundle and never read on the prediction path
+    save_history([(snapshot.features(), snapshot.targets()) for snapshot in snapshots], model_file)
+
+    print(f"{Config.N_ESTIMATORS}-tree forest fitted on {len(X)} rows")
+    for name, model_file, load in rows:
+        size = os.path.getsize(model_file) / 2 ** 20
+        print(f"  {name:18s}: {size:7.1f} MiB, load {best_of(load, args.repeats) * 1000:8.1f} ms")
+    print(f"  {'history':18s}: {os.path.getsize(history_file(model_file)) / 2 ** 20:7.1f} MiB, not loaded for predictions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_portfolio.py
+
+import argparse
+import time
+import numpy as np
+from portfolio import allocate
+
+def candidates(rng, count):
+    price = np.exp(rng.uniform(np.log(5), np.log(5_000_000), count)).round()
+    unit_profit = np.maximum(price * rng.lognormal(-4.5, 1.0, count), 1).round()
+    buy_limit = rng.choice([70, 100, 500, 2_000, 10_000, 25_000], count)
+    volume_cap = rng.integers(0, 200_000, count)
+    return unit_profit, price, buy_limit, volume_cap
+
+def independent(unit_profit, price, buy_limit, gold, top):
+    # Old sizing: best items by profit per item, each sized as if it had the whole budget to itself
+    order = np.argsort(-unit_profit, kind="stable")[:top]
+    quantities = np.zeros(len(price), dtype=np.int64)
+    quantities[order] = np.minimum(buy_limit[order], gold // price[order])
+    return order, quantities
+
+def funded(order, quantities, price, gold):
+    # What those orders buy when placed in listed order from the one budget
+    filled = np.zeros_like(quantities)
+    for index in order.tolist():
+        filled[index] = min(quantities[index], gold // price[index])
+        gold -= filled[index] * price[index]
+    return filled
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--gold", type=int, default=10_000_000)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    unit_profit, price, buy_limit, volume_cap = candidates(rng, args.items)
+
+    for max_items in (args.top, None):
+        quantities = allocate(unit_profit, price, buy_limit, volume_cap, args.gold, max_items)
+        assert (quantities * price).sum() <= args.gold
+        assert (quantities <= np.minimum(buy_limit, volume_cap)).all() and (quantities >= 0).all()
+        assert max_items is None or np.count_nonzero(quantities) <= max_items
+
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            allocate(unit_profit, price, buy_limit, volume_cap, args.gold, max_items)
+        elapsed = (time.perf_counter() - start) / args.repeats
+        label = f"top {max_items}" if max_items else "uncapped"
+        print(f"{args.items:,} candidates, {label}: {elapsed * 1e3:.2f} ms, {np.count_nonzero(quantities)} items, "
+              f"{(quantities * price).sum():,.0f} gp spent, expected profit {(quantities * unit_profit).sum():,.0f}")
+
+    order, old = independent(unit_profit, price, buy_limit, args.gold, args.top)
+    filled = funded(order, old, price, args.gold)
+    print(f"independent sizing, top {args.top}: {(old * price).sum():,.0f} gp of orders, {(filled * price).sum():,.0f} gp fundable, "
+          f"expected profit {(filled * unit_profit).sum():,.0f}")
+
+if __name__ == "__main__":
+    main()
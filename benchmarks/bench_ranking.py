@@ -0,0 +1,74 @@
+# benchmarks/bench_ranking.py
+
+import argparse
+import numpy as np
+from config import Config
+from market_snapshot import MarketSnapshot
+from ranking import RANKING_KEYS, apply_filters, positive_profit, scores, top_k, volume_caps
+from utils import size_suggestions
+from benchmarks.bench_model_io import best_of
+
+def synthetic_snapshot(rng, count):
+    low = np.exp(rng.uniform(np.log(5), np.log(5_000_000), count)).astype(np.int64)
+    high = low * rng.uniform(1.0, 1.1, count)
+    columns = {
+        "high": high,
+        "low": low,
+        "high_volume": rng.integers(0, 5000, count),
+        "low_volume": rng.integers(0, 5000, count),
+        "avg_high_5m": high.astype(np.int64),
+        "roi": (high - low) / high,
+        "potential_profit": high - low,
+        "fluctuation": rng.random(count),
+        "buy_limit": rng.choice([70, 100, 500, 2_000, 10_000, 25_000], count),
+        "historical_price": low,
+        "historical_volume": rng.integers(0, 10000, count),
+    }
+    item_ids = np.arange(2, count + 2)
+    snapshot = MarketSnapshot(item_ids, columns, {str(item_id): f"Item {item_id}" for item_id in item_ids.tolist()})
+    predictions = np.log1p(np.maximum(columns["potential_profit"] * rng.lognormal(0, 0.5, count), 0)) * (rng.random(count) < 0.6)
+    return snapshot, predictions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    # Same winners, in the same order, as a full stable sort, ties included
+    for values in (rng.random(10_000), rng.integers(0, 20, 10_000).astype(np.float64)):
+        for k in (1, args.k, 1000, None):
+            assert np.array_equal(top_k(values, k), np.argsort(-values, kind="stable")[:k])
+
+    print(f"top {args.k}: argpartition vs full sort")
+    for count in (1_000, 10_000, 100_000, 1_000_000):
+        values = rng.random(count)
+        partitioned = best_of(lambda: top_k(values, args.k), args.repeats)
+        sorted_time = best_of(lambda: np.argsort(-values, kind="stable")[:args.k], args.repeats)
+        print(f"  {count:>9,} values: {partitioned * 1e3:7.2f} ms vs {sorted_time * 1e3:7.2f} ms")
+
+    gold = 10_000_000
+    print(f"rank top {args.k} / size_suggestions for 10M gp:")
+    for count in (1_000, 10_000, 100_000):
+        snapshot, predictions = synthetic_snapshot(rng, count)
+        before = {name: values.copy() for name, values in snapshot.columns.items()}, predictions.copy()
+        rows = apply_filters(snapshot, predictions, (positive_profit,))
+        candidates, candidate_predictions = snapshot.take(rows), predictions[rows]
+        capacity = np.minimum(candidates["buy_limit"], volume_caps(candidates["high_volume"], candidates["low_volume"], Config))
+        fundable = (candidates["low"] <= gold) & (capacity > 0)
+        timings = []
+        for key in RANKING_KEYS:
+            # The key picks what gets funded: the best fundable candidate by it always comes first
+            values = scores(candidates, candidate_predictions, key)
+            suggested = [int(suggestion["Item ID"]) for suggestion in size_suggestions(candidates, candidate_predictions, gold, Config, key)]
+            assert suggested[0] == candidates.item_ids[np.flatnonzero(fundable)[top_k(values[fundable], 1)][0]]
+            listed = values[np.searchsorted(candidates.item_ids, suggested)]
+            assert (np.diff(listed) <= 0).all()
+            timings.append((best_of(lambda: top_k(scores(candidates, candidate_predictions, key), args.k), args.repeats),
+                            best_of(lambda: size_suggestions(candidates, candidate_predictions, gold, Config, key), args.repeats)))
+        assert all(np.array_equal(before[0][name], snapshot.columns[name]) for name in before[0]) and np.array_equal(before[1], predictions)
+        print(f"  {count:>9,} items ({len(candidates):,} candidates): " + ", ".join(f"{key} {ranked * 1e3:.2f} / {sized * 1e3:.2f} ms" for key, (ranked, sized) in zip(RANKING_KEYS, timings)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_recorder.py
+
+import argparse
+import os
+from OSRSScraper import OSRSScraper
+from osrs_rl.agent import DataManager
+from recorder import SnapshotRecorder
+from benchmarks import scratch_directory
+from benchmarks.bench_scrape import mock_config
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--ticks", type=int, default=12)
+    parser.add_argument("--outage-minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    clock = FakeClock(1_700_000_000)
+    fixture = MarketFixture(num_items=args.items, clock=clock)
+    data_manager = DataManager(os.path.join(scratch_directory(), "history.db"))
+    data_manager.create_tables()
+
+    with MockAPIServer(fixture) as server:
+        config = mock_config(server.base_url)
+        recorder = SnapshotRecorder(OSRSScraper(config), data_manager, config, clock=clock, sleep=clock.sleep)
+        recorder.run(args.ticks)
+
+        print(f"-- simulated {args.outage_minutes} minute outage --")
+        clock.sleep(args.outage_minutes * 60)
+        server.reset_counts()
+        recorder.run(1)
+        print(f"recovery tick made {server.total_requests()} requests {dict(server.request_counts)}")
+
+        print("-- repeated poll of the same bucket --")
+        recorder.tick()
+        recorder.report()
+
+    timestamps = data_manager.get_price_range()["timestamp"]
+    print(f"{len(timestamps)} rows over {len(set(timestamps.tolist()))} distinct buckets in the store")
+    data_manager.disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_replay.py
+
+import argparse
+import time
+import numpy as np
+from osrs_rl.replay_buffer import ReplayBuffer
+from benchmarks import scratch_directory
+
+def transitions(rng, count):
+    states = rng.integers(0, 12, count)
+    return states, rng.integers(0, 2, count), rng.normal(0, 1000, count), rng.integers(0, 12, count), rng.random(count) < 0.01
+
+def timed(buffer, rng, insert_batch, sample_batch, repeats=200):
+    batch = transitions(rng, insert_batch)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        buffer.add(*batch)
+    insert_time = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        indices, _, _ = buffer.sample(sample_batch)
+        buffer.update_priorities(indices, rng.normal(0, 1, sample_batch))
+    return insert_time, (time.perf_counter() - start) / repeats
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=1 << 22)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    # Sampling frequency should follow priority ** alpha
+    small = ReplayBuffer(8, alpha=1.0, seed=1)
+    small.add(*transitions(rng, 8))
+    priorities = np.arange(1, 9, dtype=np.float64)
+    small.update_priorities(np.arange(8), priorities - small.epsilon)
+    counts = np.bincount(np.concatenate([small.sample(64)[0] for _ in range(2000)]), minlength=8)
+    assert np.allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.01)
+
+    for label, buffer in (("in memory", ReplayBuffer(args.capacity, seed=0)),
+                          ("memory-mapped", ReplayBuffer(args.capacity, path=scratch_directory(), memory_limit=0, seed=0))):
+        print(f"{label} ({args.capacity:,} capacity), per batch of {args.batch}:")
+        filled = 0
+        for target in (10_000, 100_000, 1_000_000, args.capacity):
+            target = min(target, args.capacity)
+            while filled < target:
+                count = min(1 << 16, target - filled)
+                buffer.add(*transitions(rng, count))
+                filled += count
+            insert_time, sample_time = timed(buffer, rng, args.batch, args.batch)
+            print(f"  {len(buffer):>10,} stored: insert {insert_time * 1e6:7.1f} us, sample + reprioritize {sample_time * 1e6:7.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_scheduler.py
+
+import argparse
+import os
+import queue
+import threading
+import time
+from feature_engine import enrich_snapshot
+from job_scheduler import JobCancelled, JobScheduler
+from service import SuggestionService
+from utils import train_model
+from benchmarks import scratch_directory
+from benchmarks.bench_scrape import mock_config
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+class MainLoop:
+    # Stands in for the Kivy clock: callbacks queue up and run on the thread that drains them
+    def __init__(self):
+        self.callbacks = queue.Queue()
+        self.thread = threading.current_thread()
+        self.slowest = 0.0
+
+    def dispatch(self, callback, *args):
+        self.callbacks.put((callback, args))
+
+    def drain(self, until, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while not until() and time.perf_counter() < deadline:
+            try:
+                callback, args = self.callbacks.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            assert threading.current_thread() is self.thread
+            start = time.perf_counter()
+            callback(*args)
+            self.slowest = max(self.slowest, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock API latency per request, seconds")
+    args = parser.parse_args()
+
+    with MockAPIServer(MarketFixture(num_items=args.items), latency=args.latency) as api:
+        directory = scratch_directory()
+        config = type("SchedulerConfig", (mock_config(api.base_url, directory),), {
+            "MODEL_FILE": os.path.join(directory, "model.pkl"),
+            "HISTORY_DB": os.path.join(directory, "history.db"),
+            "N_ESTIMATORS": 20,
+        })
+        service = SuggestionService(config)
+        service.load()
+        train_model(enrich_snapshot(service.scraper.scrape_snapshot(), config), config)
+
+        loop = MainLoop()
+        scheduler = JobScheduler(loop.dispatch)
+        events = []
+        refresh = lambda job: service.refresh(job.progress)
+        callbacks = {
+            "on_done": lambda refreshed: events.append(("done", time.perf_counter(), service.suggestions(10000000))),
+            "on_progress": lambda message: events.append(("progress", time.perf_counter(), message)),
+            "on_error": lambda error: events.append(("error", time.perf_counter(), error)),
+        }
+
+        # Repeated clicks while a refresh is in flight all land on the one job
+        start = time.perf_counter()
+        jobs = {id(scheduler.submit("refresh", refresh, **callbacks)) for _ in range(100)}
+        loop.drain(lambda: any(kind == "done" for kind, _, _ in events))
+        assert len(jobs) == 1 and service.stats["refreshes"] == 1
+        progress = [(when - start, message) for kind, when, message in events if kind == "progress"]
+        done = next(when for kind, when, _ in events if kind == "done") - start
+        print(f"100 submits while in flight -> 1 refresh, {len(progress)} progress updates, done after {done:.2f}s")
+        for when, message in progress:
+            print(f"  {when:5.2f}s {message}")
+
+        # Cancellation takes effect at the next progress call, i.e. after the request in flight
+        events.clear()
+        scheduler.submit("refresh", refresh, **callbacks)
+        time.sleep(args.latency / 2)
+        cancelled_at = time.perf_counter()
+        scheduler.cancel("refresh")
+        loop.drain(lambda: any(kind in ("done", "error") for kind, _, _ in events))
+        kind, when, error = events[-1]
+        assert kind == "error" and isinstance(error, JobCancelled)
+        print(f"cancel -> JobCancelled reported after {(when - cancelled_at) * 1000:.0f} ms, refreshes still {service.stats['refreshes']}")
+        print(f"slowest callback on the main loop: {loop.slowest * 1000:.2f} ms")
+        scheduler.shutdown(timeout=5)
+
+if __name__ == "__main__":
+    main()
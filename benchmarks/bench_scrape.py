@@ -0,0 +1,35 @@
+# benchmarks/bench_scrape.py
+
+import argparse
+import os
+import time
+from config import Config
+from OSRSScraper import OSRSScraper
+from benchmarks import scratch_directory
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+def mock_config(base_url, cache_dir=None):
+    cache_dir = cache_dir or scratch_directory()
+    return type("MockConfig", (Config,), {
+        "API_BASE_URL": base_url,
+        "MAPPING_CACHE_FILE": os.path.join(cache_dir, "mapping_cache.json.gz"),
+    })
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--refreshes", type=int, default=3)
+    args = parser.parse_args()
+
+    with MockAPIServer(MarketFixture(num_items=args.items)) as server:
+        config = mock_config(server.base_url)
+        for refresh in range(args.refreshes):
+            server.reset_counts()
+            start = time.perf_counter()
+            scraper = OSRSScraper(config)
+            items_data = scraper.scrape_data()
+            elapsed = time.perf_counter() - start
+            print(f"Refresh {refresh + 1}: {len(items_data)} items, {server.total_requests()} requests {dict(server.request_counts)}, {elapsed:.3f}s, mapping cache {scraper.mapping_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_screening.py
+
+import argparse
+import json
+import os
+import time
+import requests
+from config import Config
+from market_snapshot import build_snapshot
+from benchmarks import legacy
+from benchmarks.mock_api import MarketFixture
+
+FIXTURE_FILES = ("mapping", "latest", "5m", "5m_previous")
+
+def record_fixture(fixture_dir, base_url):
+    os.makedirs(fixture_dir, exist_ok=True)
+    payloads = {
+        "mapping": requests.get(f"{base_url}/mapping", timeout=Config.REQUEST_TIMEOUT).json(),
+        "latest": requests.get(f"{base_url}/latest", timeout=Config.REQUEST_TIMEOUT).json(),
+        "5m": requests.get(f"{base_url}/5m", timeout=Config.REQUEST_TIMEOUT).json(),
+    }
+    timestamp = payloads["5m"]["timestamp"] - 300
+    payloads["5m_previous"] = requests.get(f"{base_url}/5m", params={"timestamp": timestamp}, timeout=Config.REQUEST_TIMEOUT).json()
+    for name, payload in payloads.items():
+        with open(os.path.join(fixture_dir, f"{name}.json"), "w") as file:
+            json.dump(payload, file)
+
+def load_fixture(fixture_dir):
+    payloads = {}
+    for name in FIXTURE_FILES:
+        with open(os.path.join(fixture_dir, f"{name}.json")) as file:
+            payloads[name] = json.load(file)
+    return payloads
+
+def synthetic_fixture(num_items):
+    fixture = MarketFixture(num_items=num_items)
+    timestamp = fixture.current_bucket()
+    data_5m = fixture.bucket(timestamp)
+    return {
+        "mapping": fixture.mapping(),
+        "latest": {"data": fixture.latest()},
+        "5m": {"data": data_5m, "timestamp": timestamp},
+        "5m_previous": {"data": fixture.bucket(timestamp - 300), "timestamp": timestamp - 300},
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="Directory with recorded mapping/latest/5m/5m_previous JSON responses")
+    parser.add_argument("--record", help="Record a fixture from Config.API_BASE_URL into this directory and exit")
+    parser.add_argument("--items", type=int, default=4000, help="Synthetic item count when no fixture is given")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.record, Config.API_BASE_URL)
+        return
+
+    payloads = load_fixture(args.fixture) if args.fixture else synthetic_fixture(args.items)
+    item_names = {str(item["id"]): item["name"] for item in payloads["mapping"]}
+    buy_limits = {str(item["id"]): item.get("limit", 0) for item in payloads["mapping"]}
+    data_latest, data_5m, data_historical = payloads["latest"]["data"], payloads["5m"]["data"], payloads["5m_previous"]["data"]
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        items_data = legacy.build_items_data(Config, data_latest, data_5m, data_historical, item_names, buy_limits)
+    loop_time = (time.perf_counter() - start) / args.repeats
+
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        snapshot = build_snapshot(data_latest, data_5m, data_historical, item_names, buy_limits, Config)
+    vectorized_time = (time.perf_counter() - start) / args.repeats
+
+    assert snapshot.to_records() == items_data, "vectorized screening diverged from the per-item loop"
+    print(f"{len(data_latest)} items, {len(items_data)} pass screening (identical in both paths)")
+    print(f"per-item loop: {loop_time * 1000:.2f} ms/screen")
+    print(f"vectorized:    {vectorized_time * 1000:.2f} ms/screen")
+
+if __name__ == "__main__":
+    main()
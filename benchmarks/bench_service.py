@@ -0,0 +1,90 @@
+# benchmarks/bench_service.py
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+from feature_engine import enrich_snapshot
+from service import SuggestionService
+from utils import train_model
+from benchmarks import scratch_directory
+from benchmarks.bench_scrape import mock_config
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+def latencies(port, golds, output_format="json"):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    timings = []
+    for gold in golds:
+        start = time.perf_counter()
+        connection.request("GET", f"/suggestions?gold={gold}&format={output_format}")
+        response = connection.getresponse()
+        body = response.read()
+        timings.append(time.perf_counter() - start)
+        assert response.status == 200, body
+    connection.close()
+    return np.array(timings)
+
+def summary(timings):
+    return f"p50 {np.percentile(timings, 50) * 1e3:.2f} ms, p99 {np.percentile(timings, 99) * 1e3:.2f} ms"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+
+    with MockAPIServer(MarketFixture(num_items=args.items)) as api:
+        directory = scratch_directory()
+        config = type("ServiceConfig", (mock_config(api.base_url, directory),), {
+            "MODEL_FILE": os.path.join(directory, "model.pkl"),
+            "HISTORY_DB": os.path.join(directory, "history.db"),
+            "N_ESTIMATORS": 20,
+        })
+        service = SuggestionService(config)
+        start = time.perf_counter()
+        service.warm()
+        assert service.ranked is None
+        train_model(enrich_snapshot(service.scraper.scrape_snapshot(), config), config)
+        assert service.refresh()
+        print(f"warm-up with {len(service.ranked[1])} candidates: {time.perf_counter() - start:.2f}s, "
+              f"refresh {service.stats['last_refresh_seconds'] * 1e3:.0f} ms")
+        assert "kivy" not in sys.modules
+
+        server, _ = service.serve("127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        try:
+            rng = np.random.default_rng(0)
+            distinct = rng.integers(10_000, 100_000_000, args.requests)
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            connection.request("GET", "/suggestions?gold=10000000")
+            payload = json.loads(connection.getresponse().read())
+            connection.close()
+            assert payload["suggestions"] and sum(row["Low (Buy)"] * row["Max Quantity"] for row in payload["suggestions"]) <= 10_000_000
+            print(f"{args.requests} requests, one client, keep-alive:")
+            print(f"  distinct budgets (sized per request): {summary(latencies(port, distinct))}")
+            print(f"  repeated budgets (cached response):   {summary(latencies(port, distinct))}")
+            print(f"  distinct budgets as CSV:              {summary(latencies(port, distinct + 1, 'csv'))}")
+
+            results = [None] * args.clients
+            def client(index):
+                results[index] = latencies(port, rng.integers(10_000, 100_000_000, args.requests) if index % 2 else distinct)
+            threads = [threading.Thread(target=client, args=(index,)) for index in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            print(f"{args.clients} concurrent clients: {args.clients * args.requests / elapsed:,.0f} requests/s, {summary(np.concatenate(results))}")
+            print(f"service stats: {service.stats}")
+        finally:
+            service.stop(server)
+
+if __name__ == "__main__":
+    main()
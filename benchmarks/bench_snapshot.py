@@ -0,0 +1,78 @@
+# benchmarks/bench_snapshot.py
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from config import Config
+from OSRSScraper import OSRSScraper
+from benchmarks import legacy
+from benchmarks.mock_api import MarketFixture
+
+def make_payloads(fixture, num_snapshots):
+    start = fixture.current_bucket() - 300 * num_snapshots
+    payloads = []
+    for index in range(num_snapshots):
+        timestamp = start + 300 * index
+        data_5m = fixture.bucket(timestamp)
+        data_latest = {item_id: {"high": entry["avgHighPrice"], "low": entry["avgLowPrice"]} for item_id, entry in data_5m.items()}
+        payloads.append((data_latest, data_5m, fixture.bucket(timestamp - 300), timestamp))
+    return payloads
+
+def offline_scraper(fixture):
+    # Scraper wired to in-memory fixtures, bypassing the network in __init__
+    scraper = OSRSScraper.__new__(OSRSScraper)
+    scraper.config = Config
+    mapping = fixture.mapping()
+    scraper.item_names = {str(item["id"]): item["name"] for item in mapping}
+    scraper.buy_limits = {str(item["id"]): item["limit"] for item in mapping}
+    return scraper
+
+def run_dict_path(scraper, payloads):
+    results = []
+    for data_latest, data_5m, data_historical, _ in payloads:
+        items_data = legacy.build_items_data(Config, data_latest, data_5m, data_historical, scraper.item_names, scraper.buy_limits)
+        results.append((items_data, np.asarray(legacy.feature_rows(items_data), dtype=np.float64)))
+    return results
+
+def run_snapshot_path(scraper, payloads):
+    results = []
+    for data_latest, data_5m, data_historical, timestamp in payloads:
+        snapshot = scraper.build_snapshot(data_latest, data_5m, data_historical, timestamp)
+        results.append((snapshot, snapshot.features()))
+    return results
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--snapshots", type=int, default=50)
+    args = parser.parse_args()
+
+    fixture = MarketFixture(num_items=args.items)
+    payloads = make_payloads(fixture, args.snapshots)
+    scraper = offline_scraper(fixture)
+
+    dict_results, dict_time, dict_peak = measure(run_dict_path, scraper, payloads)
+    snapshot_results, snapshot_time, snapshot_peak = measure(run_snapshot_path, scraper, payloads)
+
+    for (items_data, _), (snapshot, _) in zip(dict_results, snapshot_results):
+        assert [item["Item ID"] for item in items_data] == [str(item_id) for item_id in snapshot.item_ids]
+        assert np.array_equal(np.asarray(legacy.feature_rows(items_data), dtype=np.float64), snapshot.features())
+        assert items_data == snapshot.to_records()
+
+    rows = sum(len(snapshot) for snapshot, _ in snapshot_results)
+    print(f"{args.snapshots} snapshots x {args.items} items ({rows} screened rows)")
+    print(f"dict path:     {dict_time:.3f}s, peak {dict_peak / 2 ** 20:.1f} MiB")
+    print(f"snapshot path: {snapshot_time:.3f}s, peak {snapshot_peak / 2 ** 20:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_startup.py
+
+import argparse
+import ast
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from feature_engine import enrich_snapshot
+from utils import train_model
+from benchmarks import scratch_directory
+from benchmarks.bench_scrape import mock_config
+from benchmarks.mock_api import MarketFixture, MockAPIServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Nothing on the way to the first window may pull these in; they belong to the suggestion pipeline
+HEAVY_MODULES = ("numpy", "sklearn", "scipy", "joblib", "requests", "osrs_rl")
+
+FIRST_SUGGESTION = """
+import json, sys, time
+start = time.perf_counter()
+from config import Config
+from service import SuggestionService
+imported = time.perf_counter()
+config = type("StartupConfig", (Config,), json.loads(sys.argv[1]))
+service = SuggestionService(config)
+assert service.load()
+loaded = time.perf_counter()
+assert service.refresh()
+refreshed = time.perf_counter()
+suggestions = service.suggestions(10000000)
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "load": loaded - imported, "refresh": refreshed - loaded,
+                  "size": done - refreshed, "total": done - start, "suggestions": len(suggestions)}))
+"""
+
+def run_profiled(arguments):
+    # Returns stdout and {module: cumulative microseconds} for the top-level imports of the run
+    result = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name[1:].rstrip()] = int(cumulative)
+    return result.stdout, imports
+
+def top_level_total(imports):
+    return sum(cumulative for name, cumulative in imports.items() if not name.startswith(" ")) / 1000
+
+def heavy_imports(imports):
+    return sorted({name.strip().split(".")[0] for name in imports} & set(HEAVY_MODULES))
+
+def module_level_imports(path, seen=None):
+    # Statically follow the imports that run when a repo module is imported, into other repo modules
+    seen = set() if seen is None else seen
+    with open(path) as file:
+        tree = ast.parse(file.read())
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    for name in sorted(names - seen):
+        seen.add(name)
+        local = os.path.join(ROOT, *name.split(".")) + ".py"
+        if os.path.exists(local):
+            module_level_imports(local, seen)
+    return seen
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--window-budget-ms", type=float, default=1500, help="Import time allowed before the window opens")
+    parser.add_argument("--suggestion-budget-ms", type=float, default=5000, help="Time allowed from a cold start to the first suggestion")
+    args = parser.parse_args()
+    failures = []
+
+    reachable = set()
+    for path in ("main.py", "OSRSGrandExchangeApp.py"):
+        reachable |= module_level_imports(os.path.join(ROOT, path))
+    eager = sorted({name.split(".")[0] for name in reachable} & set(HEAVY_MODULES))
+    print(f"module-level imports of main.py and the app: {len(reachable)} modules, heavy: {eager or 'none'}")
+    if eager:
+        failures.append(f"the GUI imports {', '.join(eager)} before its window opens")
+
+    if importlib.util.find_spec("kivy") is None:
+        print("time to first window: kivy is not installed, skipped")
+    else:
+        _, imports = run_profiled(["-c", "import OSRSGrandExchangeApp"])
+        window_ms = top_level_total(imports)
+        print(f"time to first window: {window_ms:.0f} ms of imports (budget {args.window_budget_ms:.0f} ms), heavy: {heavy_imports(imports) or 'none'}")
+        if window_ms > args.window_budget_ms:
+            failures.append(f"first-window imports took {window_ms:.0f} ms")
+        if heavy_imports(imports):
+            failures.append(f"the GUI imports {', '.join(heavy_imports(imports))} before its window opens")
+
+    with MockAPIServer(MarketFixture(num_items=args.items)) as api:
+        directory = scratch_directory()
+        overrides = {
+            "API_BASE_URL": api.base_url,
+            "MAPPING_CACHE_FILE": os.path.join(directory, "mapping_cache.json.gz"),
+            "MODEL_FILE": os.path.join(directory, "model.pkl"),
+            "HISTORY_DB": os.path.join(directory, "history.db"),
+            "N_ESTIMATORS": 20,
+        }
+        config = type("StartupConfig", (mock_config(api.base_url, directory),), overrides)
+        from OSRSScraper import OSRSScraper
+        train_model(enrich_snapshot(OSRSScraper(config).scrape_snapshot(), config), config)
+        os.remove(overrides["MAPPING_CACHE_FILE"])
+
+        stdout, imports = run_profiled(["-c", FIRST_SUGGESTION, json.dumps(overrides)])
+        timings = json.loads(stdout.strip().splitlines()[-1])
+        # Two-space indent: modules imported directly by the entry point
+        slowest = sorted(((cumulative, name.strip()) for name, cumulative in imports.items() if name.startswith("  ") and name[2] != " "), reverse=True)[:5]
+        print(f"time to first suggestion: {timings['total'] * 1000:.0f} ms (budget {args.suggestion_budget_ms:.0f} ms), "
+              f"{timings['suggestions']} suggestions")
+        for phase in ("import", "load", "refresh", "size"):
+            print(f"  {phase:8s} {timings[phase] * 1000:8.1f} ms")
+        print("  slowest imports: " + ", ".join(f"{name} {cumulative / 1000:.0f} ms" for cumulative, name in slowest))
+        if timings["total"] * 1000 > args.suggestion_budget_ms:
+            failures.append(f"first suggestion took {timings['total'] * 1000:.0f} ms")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_storage.py
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+import numpy as np
+from osrs_rl.agent import DataManager
+from benchmarks import scratch_directory
+
+def snapshot_rows(item_ids, timestamp, rng):
+    prices = rng.integers(10, 200000, len(item_ids))
+    volumes = rng.integers(0, 3000, (len(item_ids), 2))
+    return list(zip(item_ids, [timestamp] * len(item_ids), prices.tolist(), (prices * 0.95).astype(np.int64).tolist(), volumes[:, 0].tolist(), volumes[:, 1].tolist()))
+
+def legacy_insert(db_name, rows):
+    # The original pattern: new connection and a commit for every row
+    conn = sqlite3.connect(db_name)
+    conn.execute("CREATE TABLE IF NOT EXISTS prices (id INTEGER PRIMARY KEY, item_id INTEGER, timestamp TEXT, price REAL, volume INTEGER)")
+    conn.commit()
+    conn.close()
+    for item_id, timestamp, price, _, volume, _ in rows:
+        conn = sqlite3.connect(db_name)
+        conn.execute("INSERT INTO prices (item_id, timestamp, price, volume) VALUES (?, ?, ?, ?)", (item_id, str(timestamp), price, volume))
+        conn.commit()
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--legacy-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    directory = scratch_directory()
+    rng = np.random.default_rng(42)
+    item_ids = list(range(2, args.items + 2))
+    num_snapshots = max(1, args.rows // args.items)
+    start_timestamp = 1_700_000_000
+
+    legacy_rows = snapshot_rows(item_ids, start_timestamp, rng)[:args.legacy_rows]
+    start = time.perf_counter()
+    legacy_insert(os.path.join(directory, "legacy.db"), legacy_rows)
+    legacy_rate = len(legacy_rows) / (time.perf_counter() - start)
+
+    data_manager = DataManager(os.path.join(directory, "prices.db"))
+    data_manager.create_tables()
+    start = time.perf_counter()
+    for snapshot in range(num_snapshots):
+        data_manager.insert_prices(snapshot_rows(item_ids, start_timestamp + 300 * snapshot, rng))
+    insert_time = time.perf_counter() - start
+    total_rows = num_snapshots * len(item_ids)
+
+    query_times = []
+    end_timestamp = start_timestamp + 300 * num_snapshots
+    for _ in range(args.queries):
+        item_id = random.choice(item_ids)
+        window_start = random.randrange(start_timestamp, end_timestamp)
+        start = time.perf_counter()
+        prices = data_manager.get_prices(item_id, window_start, window_start + 7 * 24 * 3600)
+        query_times.append(time.perf_counter() - start)
+    data_manager.disconnect()
+
+    print(f"legacy per-row insert:  {legacy_rate:12,.0f} rows/s ({len(legacy_rows)} rows)")
+    print(f"batched insert:         {total_rows / insert_time:12,.0f} rows/s ({total_rows:,} rows in {insert_time:.1f}s)")
+    print(f"get_prices (7 day window, {len(prices['timestamp'])} rows last query): "
+          f"median {np.median(query_times) * 1000:.2f} ms, p99 {np.percentile(query_times, 99) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
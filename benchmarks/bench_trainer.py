@@ -0,0 +1,61 @@
+# benchmarks/bench_trainer.py
+
+import argparse
+import os
+import time
+import numpy as np
+from benchmarks import scratch_directory
+from benchmarks.bench_agent import agent_config
+from benchmarks.bench_environment import make_market
+from osrs_rl.agent import OSRSAgent
+from osrs_rl.environment import OSRSEnvironment
+from osrs_rl.trainer import OSRSTrainer
+
+def replay_config(ratio):
+    return type("ReplayConfig", (agent_config(),), {"REPLAY_CAPACITY": 1 << 20, "REPLAY_RATIO": ratio}) if ratio else agent_config()
+
+def sequential_run(market, episodes, config):
+    trainer = OSRSTrainer(OSRSAgent(config, seed=0), OSRSEnvironment(config, market))
+    start = time.perf_counter()
+    trainer.train(episodes)
+    return episodes / (time.perf_counter() - start)
+
+def parallel_run(market, episodes, workers, seed, config=None):
+    # A fresh config per run: train_parallel saves to Q_TABLE_FILE, which the next agent would load
+    config = config or agent_config()
+    agent = OSRSAgent(config, seed=0)
+    trainer = OSRSTrainer(agent, market)
+    start = time.perf_counter()
+    metrics = trainer.train_parallel(episodes, num_workers=workers, seed=seed, checkpoint_dir=scratch_directory())
+    elapsed = time.perf_counter() - start
+    return metrics[-1]["completed_episodes"] / elapsed, agent.q_table
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=4096)
+    parser.add_argument("--sequential-episodes", type=int, default=20)
+    parser.add_argument("--replay-ratios", type=float, nargs="*", default=[1.0, 0.25], help="Replay ratios to time against no replay")
+    args = parser.parse_args()
+    market = make_market(500, 7, 1)
+
+    print(f"sequential train():  {sequential_run(market, args.sequential_episodes, agent_config()):10,.1f} episodes/s")
+    for ratio in args.replay_ratios:
+        config = replay_config(ratio)
+        print(f"  with replay, ratio {ratio:4.2f}: {sequential_run(market, args.sequential_episodes, config):10,.1f} episodes/s sequential, "
+              f"{parallel_run(market, args.episodes, 1, 7, config)[0]:10,.1f} with 1 worker")
+
+    cores = os.cpu_count()
+    worker_counts = sorted({1, 2, cores // 2, cores} - {0})
+    baseline = None
+    for workers in worker_counts:
+        rate, q_table = parallel_run(market, args.episodes, workers, seed=7)
+        baseline = baseline or rate
+        print(f"train_parallel({workers:2d} workers): {rate:10,.1f} episodes/s ({rate / baseline:.1f}x of 1 worker, {cores} cores)")
+
+    _, first = parallel_run(market, 1024, 2, seed=11)
+    _, second = parallel_run(market, 1024, 2, seed=11)
+    assert np.array_equal(first, second)
+    print("same seed, same Q-table")
+
+if __name__ == "__main__":
+    main()
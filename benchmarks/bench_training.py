@@ -0,0 +1,63 @@
+# benchmarks/bench_training.py
+
+import argparse
+import os
+import time
+import numpy as np
+from config import Config
+from model_store import build_pipeline
+from model_tuning import tune_model
+from market_snapshot import COLUMNS, MarketSnapshot
+
+def synthetic_snapshots(num_items, num_snapshots, seed=42):
+    rng = np.random.default_rng(seed)
+    snapshots = []
+    for _ in range(num_snapshots):
+        low = rng.integers(10, 200000, num_items)
+        high = low * rng.uniform(1.0, 1.2, num_items)
+        columns = {name: rng.uniform(0, 1000, num_items) for name in COLUMNS}
+        columns.update(low=low, high=high, potential_profit=high - low, avg_high_5m=high.astype(np.int64))
+        snapshots.append(MarketSnapshot(np.arange(num_items), columns, {}))
+    return snapshots
+
+def core_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=4000)
+    parser.add_argument("--snapshots", type=int, default=12)
+    parser.add_argument("--tune", action="store_true", help="Also run a small hyperparameter sweep")
+    parser.add_argument("--budget", type=float, default=120)
+    args = parser.parse_args()
+
+    snapshots = synthetic_snapshots(args.items, args.snapshots)
+    X = np.concatenate([snapshot.features() for snapshot in snapshots])
+    y = np.log1p(np.concatenate([snapshot.targets() for snapshot in snapshots]))
+    print(f"Fitting {Config.N_ESTIMATORS} trees on {len(X)} rows")
+
+    baseline = None
+    for n_jobs in core_counts():
+        pipeline = build_pipeline(Config, n_jobs=n_jobs)
+        start = time.perf_counter()
+        pipeline.fit(X, y)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  n_jobs={n_jobs:3d}: {elapsed:7.2f}s (speedup {baseline / elapsed:.2f}x)")
+
+    if args.tune:
+        grid = {"n_estimators": [50, 100], "max_depth": [None, 12], "max_features": [1.0, 0.5]}
+        start = time.perf_counter()
+        best, results = tune_model(snapshots, param_grid=grid, time_budget=args.budget)
+        print(f"Sweep of {len(results)} candidates in {time.perf_counter() - start:.1f}s")
+        for result in results:
+            print(f"  {result['params']}: MAE {result['mae']:.4f} ({result['seconds']:.1f}s)")
+
+if __name__ == "__main__":
+    main()
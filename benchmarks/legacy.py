@@ -0,0 +1,82 @@
+# benchmarks/legacy.py
+
+# Reference copies of the original dict-per-item scrape and feature code, kept for
+# equivalence checks and before/after benchmarks.
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+def build_items_data(config, data_latest, data_5m, data_historical, item_names, buy_limits):
+    items_data = []
+    for item_id, item_data_latest in data_latest.items():
+        if item_id in data_5m:
+            item_data_5m = data_5m[item_id]
+            item_data_historical = data_historical.get(item_id)
+            if item_data_historical:
+                average_price_5m = item_data_5m.get('avgHighPrice', 0)
+                average_high_price = item_data_5m.get('avgHighPrice', 0)
+                average_low_price = item_data_5m.get('avgLowPrice', 0)
+                high_price_volume = item_data_5m.get('highPriceVolume', 0)
+                low_price_volume = item_data_5m.get('lowPriceVolume', 0)
+                buy_volume = low_price_volume
+                sell_volume = high_price_volume
+
+                high_price = average_high_price - average_high_price * 0.01 if average_high_price else 0
+                low_price = int(average_low_price * 0.99) if average_low_price else 0
+                average_price_5m = int(average_price_5m) if average_price_5m else 0
+
+                if high_price > 0 and low_price > 0:
+                    potential_profit = high_price - low_price
+                    profit_margin = (potential_profit / low_price) * 100
+
+                    if average_price_5m > 0:
+                        fluctuation = abs(high_price - average_price_5m) / average_price_5m
+                        roi = potential_profit / average_price_5m
+
+                        if (
+                            profit_margin >= config.MIN_PROFIT
+                            and fluctuation >= config.MIN_FLUCTUATION
+                            and roi >= config.MIN_ROI
+                            and sell_volume >= config.MIN_SELL_VOLUME
+                            and buy_volume >= config.MIN_BUY_VOLUME
+                        ):
+                            items_data.append({
+                                "Item ID": item_id,
+                                "Item Name": item_names.get(item_id, "Unknown Item"),
+                                "High (Sell)": high_price,
+                                "High Volume": high_price_volume,
+                                "Low (Buy)": low_price,
+                                "Low Volume": low_price_volume,
+                                "5-Minute Average High Price": average_price_5m,
+                                "ROI": roi,
+                                "Potential Profit": potential_profit,
+                                "Price Fluctuation": fluctuation * 100,
+                                "Buy Limit": buy_limits.get(item_id, 0),
+                                "Historical Price": item_data_historical.get("avgHighPrice") or 0,
+                                "Historical Volume": (item_data_historical.get("highPriceVolume") or 0) + (item_data_historical.get("lowPriceVolume") or 0),
+                            })
+    return items_data
+
+def feature_rows(items_data):
+    X = []
+    for item in items_data:
+        X.append([
+            item["High (Sell)"],
+            item["Low (Buy)"],
+            item["High Volume"],
+            item["Low Volume"],
+            item["5-Minute Average High Price"],
+            item["Price Fluctuation"],
+            item["Buy Limit"],
+            item["ROI"],
+            item["Historical Price"],
+            item["Historical Volume"]
+        ])
+    return X
+
+def prepare_training_data(items_data):
+    X = feature_rows(items_data)
+    y = [item["Potential Profit"] for item in items_data]
+    X_normalized = StandardScaler().fit_transform(X)
+    y_log_transformed = np.log1p(y)
+    return X_normalized, y_log_transformed
@@ -0,0 +1,152 @@
+# benchmarks/mock_api.py
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class MarketFixture:
+    def __init__(self, num_items=4000, seed=42, clock=time.time):
+        self.num_items = num_items
+        self.seed = seed
+        self.clock = clock
+        self.item_ids = list(range(2, num_items + 2))
+        self._buckets = {}
+
+    def current_bucket(self):
+        return int(self.clock()) // 300 * 300 - 300
+
+    def mapping(self):
+        rng = random.Random(self.seed)
+        return [{"id": item_id, "name": f"Item {item_id}", "limit": rng.choice([0, 50, 100, 1000, 10000, 25000])} for item_id in self.item_ids]
+
+    def bucket(self, timestamp):
+        if timestamp not in self._buckets:
+            data = {}
+            for item_id in self.item_ids:
+                rng = random.Random(self.seed * 1000003 + item_id)
+                base_price = rng.randint(5, 200000)
+                rng = random.Random((self.seed * 1000003 + item_id) * 2654435761 + timestamp)
+                if rng.random() < 0.2:
+                    continue
+                avg_high = int(base_price * rng.uniform(0.95, 1.15))
+                avg_low = int(avg_high * rng.uniform(0.85, 1.0))
+                data[str(item_id)] = {
+                    "avgHighPrice": avg_high if rng.random() > 0.05 else None,
+                    "highPriceVolume": rng.randint(0, 3000),
+                    "avgLowPrice": avg_low if rng.random() > 0.05 else None,
+                    "lowPriceVolume": rng.randint(0, 3000),
+                }
+            self._buckets[timestamp] = data
+        return self._buckets[timestamp]
+
+    def latest(self):
+        timestamp = self.current_bucket()
+        data = {}
+        for item_id, entry in self.bucket(timestamp).items():
+            data[item_id] = {
+                "high": entry["avgHighPrice"] or entry["avgLowPrice"],
+                "highTime": timestamp,
+                "low": entry["avgLowPrice"] or entry["avgHighPrice"],
+                "lowTime": timestamp,
+            }
+        return data
+
+    def timeseries(self, item_id, count=365):
+        end = self.current_bucket()
+        series = []
+        for timestamp in range(end - 300 * (count - 1), end + 1, 300):
+            entry = self.bucket(timestamp).get(str(item_id))
+            if entry:
+                series.append(dict(entry, timestamp=timestamp))
+        return series
+
+class MockAPIServer:
+    MAPPING_ETAG = '"mapping-v1"'
+
+    def __init__(self, fixture=None, latency=0.0, host="127.0.0.1", port=0):
+        self.fixture = fixture or MarketFixture()
+        self.latency = latency
+        self.request_counts = Counter()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def total_requests(self):
+        return sum(self.request_counts.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _route(self, path, query):
+        fixture = self.fixture
+        if path.endswith("/mapping"):
+            return fixture.mapping()
+        if path.endswith("/latest"):
+            return {"data": fixture.latest()}
+        if path.endswith("/5m"):
+            timestamp = int(query["timestamp"][0]) if "timestamp" in query else fixture.current_bucket()
+            return {"data": fixture.bucket(timestamp), "timestamp": timestamp}
+        if path.endswith("/timeseries"):
+            return {"data": fixture.timeseries(query["id"][0])}
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                with server._lock:
+                    server.request_counts[url.path.rsplit("/", 1)[-1]] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if url.path.endswith("/mapping") and self.headers.get("If-None-Match") == server.MAPPING_ETAG:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = server._route(url.path, parse_qs(url.query))
+                if payload is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                if url.path.endswith("/mapping"):
+                    self.send_header("ETag", server.MAPPING_ETAG)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,15 +1,86 @@
-# config.py
-
-class Config:
-    MIN_PROFIT = 3
-    MIN_FLUCTUATION = 0
-    MIN_ROI = 0
-    MIN_SELL_VOLUME = 100
-    MIN_BUY_VOLUME = 100
-    MAX_TRANSACTIONS = 100
-    NUM_STATES = 2
-    NUM_ACTIONS = 2
-    EPSILON = 0.1
-    ALPHA = 0.1
-    GAMMA = 0.9
-    
+# config.py
+
+class Config:
+    API_BASE_URL = "https://prices.runescape.wiki/api/v1/osrs"
+    MAX_CONCURRENT_REQUESTS = 8
+    REQUEST_TIMEOUT = 30
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.5
+    RETRY_BACKOFF_MAX = 8
+    RATE_LIMIT = 20
+    RATE_LIMIT_BURST = 20
+    MAPPING_CACHE_FILE = "mapping_cache.json.gz"
+    MAPPING_CACHE_TTL = 24 * 60 * 60
+    MODEL_FILE = "model.pkl"
+    MODEL_COMPRESS = 0
+    COMPILED_INFERENCE = True
+    N_ESTIMATORS = 100
+    N_JOBS = -1
+    CV_FOLDS = 3
+    TUNING_TIME_BUDGET = 300
+    INCREMENTAL_TRAINING = True
+    TREES_PER_UPDATE = 10
+    MAX_ESTIMATORS = 200
+    TRAINING_HISTORY_SNAPSHOTS = 12
+    HISTORY_DB = "osrs_history.db"
+    RECORDER_OFFSET = 30
+    RECORDER_MAX_BACKFILL = 288
+    # Only take effect once recorder.py has started writing HISTORY_DB
+    ROLLING_FEATURES = True
+    ROLLING_WINDOW = 12
+    FEATURE_LOOKBACK = 7 * 24 * 60 * 60
+    # Most history a cold start reads from HISTORY_DB; anything older comes from ARCHIVE_DIR. A full
+    # day, so the hour-of-day seasonality has seen every hour even without an archive
+    FEATURE_DB_LOOKBACK = 24 * 60 * 60
+    ARCHIVE_DIR = "archive"
+    # Archive days also kept decoded on disk; a week-long lookback touches up to 8 calendar days
+    ARCHIVE_CACHED_DAYS = 8
+    GE_TAX_RATE = 0.01
+    GE_TAX_CAP = 5000000
+    BUY_LIMIT_WINDOW = 4 * 60 * 60
+    MAX_SUGGESTIONS = 5
+    # predicted_profit, total_profit (x tradeable quantity) or roi
+    RANKING_KEY = "predicted_profit"
+    ALLOCATION_VOLUME_SHARE = 0.1
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8050
+    SERVICE_REFRESH_INTERVAL = 300
+    SERVICE_CACHE_SIZE = 1024
+    AUTO_REFRESH = False
+    BACKTEST_GOLD = 10000000
+    BACKTEST_TOP_N = 5
+    BACKTEST_INTERVAL = 12
+    BACKTEST_HOLD = 12
+    BACKTEST_VOLUME_SHARE = 0.1
+    MIN_PROFIT = 3
+    MIN_FLUCTUATION = 0
+    MIN_ROI = 0
+    MIN_SELL_VOLUME = 100
+    MIN_BUY_VOLUME = 100
+    MAX_TRANSACTIONS = 100
+    STARTING_GOLD = 10000000
+    EPISODE_LENGTH = 288
+    ENV_VOLUME_SHARE = 0.1
+    # After-tax margin bins; a state is (holding or not) x margin bin
+    MARGIN_BIN_EDGES = [-0.02, 0.0, 0.01, 0.02, 0.05]
+    NUM_STATES = 12
+    Q_TABLE_FILE = "q_table.bin"
+    RL_WORKERS = None
+    RL_ENVS_PER_WORKER = 256
+    RL_EPISODES_PER_ROUND = 256
+    RL_CHECKPOINT_EVERY = 10
+    RL_CHECKPOINT_DIR = "checkpoints"
+    RL_SEED = 42
+    # Prioritized replay is off with 0 (e.g. 1 << 20 turns it on). Each step then pays for a buffer insert,
+    # and REPLAY_RATIO sampled transitions are replayed per transition added.
+    REPLAY_CAPACITY = 0
+    REPLAY_BATCH_SIZE = 256
+    REPLAY_RATIO = 1.0
+    REPLAY_ALPHA = 0.6
+    REPLAY_BETA = 0.4
+    REPLAY_MEMORY_LIMIT = 1 << 30
+    NUM_ACTIONS = 2
+    EPSILON = 0.1
+    ALPHA = 0.1
+    GAMMA = 0.9
+    
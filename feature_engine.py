@@ -0,0 +1,285 @@
+# feature_engine.py
+
+import os
+import threading
+import numpy as np
+from config import Config
+from market_snapshot import FEATURE_COLUMNS
+from osrs_rl.agent import DataManager
+from snapshot_archive import BUCKET_SECONDS, COLUMNS, DAY_SECONDS, SnapshotArchive
+
+HOURS_PER_DAY = 24
+ROLLING_FEATURES = ["moving_average", "volatility", "volume_zscore", "spread_momentum", "seasonality"]
+# Per-bucket series whose window sums the features are built from
+WINDOW_SERIES = ("mid", "seen", "returns", "returns_sq", "returns_valid", "volume", "volume_sq", "spread", "both")
+
+def rolling_enabled(config=Config):
+    # Without a recorded history the rolling columns would all be zero, so they are left out
+    return config.ROLLING_FEATURES and os.path.exists(config.HISTORY_DB)
+
+def feature_names(config=Config):
+    return FEATURE_COLUMNS + (ROLLING_FEATURES if rolling_enabled(config) else [])
+
+def bucket_series(high, low, high_volume, low_volume, previous_mid):
+    # Mid price where both sides traded, else whichever side did, else carried forward from the last bucket
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    both = (high > 0) & (low > 0)
+    observed = (high > 0) | (low > 0)
+    mid = np.where(both, (high + low) / 2, high + low)
+    mid = np.where(observed, mid, previous_mid)
+    spread = np.divide(high - low, mid, out=np.zeros_like(mid), where=both)
+    returns_valid = (mid > 0) & (previous_mid > 0)
+    ratio = np.divide(mid, previous_mid, out=np.ones_like(mid), where=returns_valid)
+    returns = np.log(ratio)
+    volume = np.asarray(high_volume, dtype=np.float64) + np.asarray(low_volume, dtype=np.float64)
+    return {
+        "mid": mid,
+        "seen": (mid > 0).astype(np.float64),
+        "returns": returns,
+        "returns_sq": returns * returns,
+        "returns_valid": returns_valid.astype(np.float64),
+        "volume": volume,
+        "volume_sq": volume * volume,
+        "spread": spread,
+        "both": both.astype(np.float64),
+    }
+
+def window_features(sums, current, ticks):
+    # Works on (items,) running sums or (items x buckets) window sums alike; ticks is the window fill
+    moving_average = np.divide(sums["mid"], sums["seen"], out=np.zeros_like(sums["mid"]), where=sums["seen"] > 0)
+
+    returns_count = sums["returns_valid"]
+    returns_mean = np.divide(sums["returns"], returns_count, out=np.zeros_like(returns_count), where=returns_count > 1)
+    returns_var = np.divide(sums["returns_sq"], returns_count, out=np.zeros_like(returns_count), where=returns_count > 1) - returns_mean ** 2
+    volatility = np.sqrt(np.maximum(returns_var, 0))
+
+    volume_mean = sums["volume"] / ticks
+    volume_std = np.sqrt(np.maximum(sums["volume_sq"] / ticks - volume_mean ** 2, 0))
+    volume_zscore = np.divide(current["volume"] - volume_mean, volume_std, out=np.zeros_like(volume_std), where=volume_std > 0)
+
+    spread_mean = np.divide(sums["spread"], sums["both"], out=np.zeros_like(sums["both"]), where=sums["both"] > 0)
+    spread_momentum = np.where(current["both"] > 0, current["spread"] - spread_mean, 0.0)
+
+    deviation = np.divide(current["mid"], moving_average, out=np.ones_like(moving_average), where=moving_average > 0) - 1
+    return {
+        "moving_average": moving_average,
+        "volatility": volatility,
+        "volume_zscore": volume_zscore,
+        "spread_momentum": spread_momentum,
+    }, deviation
+
+def hour_of_day(timestamps):
+    return (np.asarray(timestamps, dtype=np.int64) // 3600) % HOURS_PER_DAY
+
+def rolling_features(timestamps, grids, window=Config.ROLLING_WINDOW):
+    # Every feature for every (item, bucket) of an archive range in one pass: forward fill and window
+    # sums are cumulative along time, so no window is ever re-walked
+    high = np.asarray(grids["high_price"], dtype=np.float64)
+    low = np.asarray(grids["low_price"], dtype=np.float64)
+    num_items, num_buckets = high.shape
+
+    observed = (high > 0) | (low > 0)
+    last_observed = np.where(observed, np.arange(num_buckets), -1)
+    np.maximum.accumulate(last_observed, axis=1, out=last_observed)
+    both = (high > 0) & (low > 0)
+    mid = np.where(both, (high + low) / 2, high + low)
+    mid = np.where(last_observed >= 0, mid[np.arange(num_items)[:, None], np.maximum(last_observed, 0)], 0)
+    previous_mid = np.zeros_like(mid)
+    previous_mid[:, 1:] = mid[:, :-1]
+
+    series = bucket_series(high, low, grids["high_volume"], grids["low_volume"], previous_mid)
+    sums = {}
+    for name, values in series.items():
+        cumulative = np.cumsum(values, axis=1)
+        sums[name] = cumulative.copy()
+        sums[name][:, window:] -= cumulative[:, :-window]
+    ticks = np.minimum(np.arange(1, num_buckets + 1), window).astype(np.float64)
+    features, deviation = window_features(sums, series, ticks)
+
+    # Seasonality: running mean of the price's deviation from its moving average, per item and hour of day
+    seasonality = np.zeros_like(mid)
+    hours = hour_of_day(timestamps)
+    for hour in np.unique(hours):
+        columns = np.flatnonzero(hours == hour)
+        total = np.cumsum(deviation[:, columns] * series["seen"][:, columns], axis=1)
+        count = np.cumsum(series["seen"][:, columns], axis=1)
+        seasonality[:, columns] = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    features["seasonality"] = seasonality
+    return features
+
+class RollingFeatureEngine:
+    # Ring buffers of the last `window` buckets per item with running window sums, so each new
+    # snapshot costs O(1) per item: add the new bucket, subtract the one falling out of the window
+    _shared = {}
+
+    def __init__(self, window=Config.ROLLING_WINDOW, item_ids=(), resync_every=1000):
+        self.window = window
+        self.resync_every = resync_every
+        self.timestamp = None
+        self.ticks = 0
+        self.item_ids = np.empty(0, dtype=np.int64)
+        # (window x items): the slot written each tick is one contiguous row
+        self.rings = {name: np.zeros((window, 0)) for name in WINDOW_SERIES}
+        self.sums = {name: np.zeros(0) for name in WINDOW_SERIES}
+        self.last_mid = np.zeros(0)
+        self.season_total = np.zeros((0, HOURS_PER_DAY))
+        self.season_count = np.zeros((0, HOURS_PER_DAY))
+        self.lock = threading.Lock()
+        self.add_items(item_ids)
+
+    @classmethod
+    def shared(cls, config):
+        if config.HISTORY_DB not in cls._shared:
+            cls._shared[config.HISTORY_DB] = cls(config.ROLLING_WINDOW)
+        return cls._shared[config.HISTORY_DB]
+
+    @classmethod
+    def from_archive(cls, archive, start, end, window=Config.ROLLING_WINDOW):
+        engine = cls(window)
+        engine.replay_archive(archive, start, end)
+        return engine
+
+    def replay_archive(self, archive, start, end):
+        # A day at a time, so only one day of dense grids is decoded at once
+        updated = 0
+        for day in archive.days():
+            if day + DAY_SECONDS <= start or day >= end:
+                continue
+            item_ids, grids = archive.load_day(day)
+            for bucket in range((max(start, day) - day) // BUCKET_SECONDS, -(-(min(end, day + DAY_SECONDS) - day) // BUCKET_SECONDS)):
+                updated += self.update(day + bucket * BUCKET_SECONDS, item_ids, *(grids[column][:, bucket] for column in COLUMNS))
+        return updated
+
+    def add_items(self, item_ids):
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        if len(self.item_ids):
+            # Cheaper than setdiff1d when, as on almost every update, nothing is new
+            positions = np.minimum(np.searchsorted(self.item_ids, item_ids), len(self.item_ids) - 1)
+            item_ids = item_ids[self.item_ids[positions] != item_ids]
+        new_ids = np.unique(item_ids)
+        if not len(new_ids):
+            return
+        merged = np.union1d(self.item_ids, new_ids)
+        rows = np.searchsorted(merged, self.item_ids)
+
+        def grow(values):
+            grown = np.zeros((len(merged),) + values.shape[1:])
+            grown[rows] = values
+            return grown
+
+        self.rings = {name: grow(values.T).T.copy() for name, values in self.rings.items()}
+        self.sums = {name: grow(values) for name, values in self.sums.items()}
+        self.last_mid = grow(self.last_mid)
+        self.season_total = grow(self.season_total)
+        self.season_count = grow(self.season_count)
+        self.item_ids = merged
+
+    def update(self, timestamp, item_ids, high, low, high_volume, low_volume):
+        # Buckets at or before the last one seen are ignored; skipped buckets are replayed as empty
+        if self.timestamp is not None and timestamp <= self.timestamp:
+            return False
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.add_items(item_ids)
+        if self.timestamp is not None:
+            empty = np.zeros(len(self.item_ids))
+            for gap in range(self.timestamp + BUCKET_SECONDS, timestamp, BUCKET_SECONDS):
+                self.advance(gap, empty, empty, empty, empty)
+
+        rows = np.searchsorted(self.item_ids, item_ids)
+        columns = []
+        for values in (high, low, high_volume, low_volume):
+            column = np.zeros(len(self.item_ids))
+            column[rows] = values
+            columns.append(column)
+        self.advance(timestamp, *columns)
+        return True
+
+    def advance(self, timestamp, high, low, high_volume, low_volume):
+        series = bucket_series(high, low, high_volume, low_volume, self.last_mid)
+        slot = self.ticks % self.window
+        for name, values in series.items():
+            ring = self.rings[name]
+            self.sums[name] += values - ring[slot]
+            ring[slot] = values
+        self.ticks += 1
+        if self.ticks % self.resync_every == 0:
+            # Running sums drift by rounding error; rebuild them from the ring now and then
+            self.sums = {name: ring.sum(axis=0) for name, ring in self.rings.items()}
+        self.last_mid = series["mid"]
+        self.timestamp = timestamp
+
+        _, deviation = window_features(self.sums, series, min(self.ticks, self.window))
+        hour = int(hour_of_day(timestamp))
+        self.season_total[:, hour] += deviation * series["seen"]
+        self.season_count[:, hour] += series["seen"]
+
+    def current(self):
+        slot = (self.ticks - 1) % self.window
+        return {name: ring[slot] for name, ring in self.rings.items()}
+
+    def features(self):
+        if self.ticks == 0:
+            return {name: np.zeros(len(self.item_ids)) for name in ROLLING_FEATURES}
+        features, _ = window_features(self.sums, self.current(), min(self.ticks, self.window))
+        hour = int(hour_of_day(self.timestamp))
+        total = self.season_total[:, hour]
+        count = self.season_count[:, hour]
+        features["seasonality"] = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+        return features
+
+    def sync(self, data_manager, lookback=Config.FEATURE_LOOKBACK, archive=None, db_lookback=Config.FEATURE_DB_LOOKBACK):
+        # Catch up on buckets the recorder has written since the last sync. A cold start reads at most
+        # db_lookback from the database, where each row costs an index lookup, and takes older history
+        # from the archive if there is one. Buckets covered by neither are replayed as empty.
+        with self.lock:
+            updated = 0
+            if self.timestamp is None:
+                latest = data_manager.latest_timestamp()
+                if latest is None:
+                    return 0
+                start = latest - min(lookback, db_lookback)
+                if archive is not None:
+                    updated += self.replay_archive(archive, latest - lookback, start)
+            else:
+                start = self.timestamp + BUCKET_SECONDS
+            # Rows arrive in batches; the last bucket of a batch may continue in the next one
+            pending = None
+            for rows in data_manager.iter_price_range(start):
+                if pending is not None:
+                    rows = {name: np.concatenate([pending[name], values]) for name, values in rows.items()}
+                complete = rows["timestamp"] < rows["timestamp"][-1]
+                updated += self.replay_rows({name: values[complete] for name, values in rows.items()})
+                pending = {name: values[~complete] for name, values in rows.items()}
+            if pending is not None:
+                updated += self.replay_rows(pending)
+            return updated
+
+    def replay_rows(self, rows):
+        # get_price_range rows, ordered by timestamp
+        boundaries = np.flatnonzero(np.diff(rows["timestamp"])) + 1
+        updated = 0
+        for bucket in np.split(np.arange(len(rows["timestamp"])), boundaries):
+            if len(bucket):
+                updated += self.update(int(rows["timestamp"][bucket[0]]), rows["item_id"][bucket], rows["high_price"][bucket],
+                                       rows["low_price"][bucket], rows["high_volume"][bucket], rows["low_volume"][bucket])
+        return updated
+
+    def attach(self, snapshot):
+        # Items without stored history get zeros rather than being dropped
+        with self.lock:
+            if not len(self.item_ids):
+                return snapshot.with_features({name: np.zeros(len(snapshot)) for name in ROLLING_FEATURES})
+            features = self.features()
+            rows = np.minimum(np.searchsorted(self.item_ids, snapshot.item_ids), len(self.item_ids) - 1)
+            known = self.item_ids[rows] == snapshot.item_ids
+            return snapshot.with_features({name: np.where(known, features[name][rows], 0.0) for name in ROLLING_FEATURES})
+
+def enrich_snapshot(snapshot, config=Config):
+    if not rolling_enabled(config):
+        return snapshot
+    engine = RollingFeatureEngine.shared(config)
+    archive = SnapshotArchive(config.ARCHIVE_DIR) if os.path.isdir(config.ARCHIVE_DIR) else None
+    with DataManager(config.HISTORY_DB) as data_manager:
+        engine.sync(data_manager, config.FEATURE_LOOKBACK, archive, config.FEATURE_DB_LOOKBACK)
+    return engine.attach(snapshot)
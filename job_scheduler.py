@@ -0,0 +1,118 @@
+# job_scheduler.py
+
+import threading
+from collections import deque
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, key, target, args, on_done, on_progress, on_error, dispatch):
+        self.key = key
+        self.target = target
+        self.args = args
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.dispatch = dispatch
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, *values):
+        # Called from the job's target; doubles as its cancellation point
+        if self.cancelled():
+            raise JobCancelled(self.key)
+        if self.on_progress is not None:
+            self.dispatch(self.on_progress, *values)
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+class JobScheduler:
+    # Runs jobs one at a time on a single worker thread, in submission order, so jobs never race on
+    # shared files. Submitting a key that is already queued or running returns that job instead of
+    # queueing another. Targets are called as target(job, *args); their callbacks go through
+    # dispatch(callback, *args), which the GUI points at its main thread. Cancellation is reported
+    # to on_error as JobCancelled.
+    def __init__(self, dispatch=None):
+        self.dispatch = dispatch or (lambda callback, *args: callback(*args))
+        self.pending = deque()
+        self.jobs = {}
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self, key, target, *args, on_done=None, on_progress=None, on_error=None):
+        with self.condition:
+            job = self.jobs.get(key)
+            if job is not None and not job.cancelled():
+                return job
+            job = Job(key, target, args, on_done, on_progress, on_error, self.dispatch)
+            if self.stopped:
+                job.cancel()
+                self.finish(job, None, JobCancelled(key))
+                return job
+            self.jobs[key] = job
+            self.pending.append(job)
+            self.condition.notify()
+            return job
+
+    def cancel(self, key=None):
+        with self.condition:
+            jobs = list(self.jobs.values()) if key is None else [self.jobs[key]] if key in self.jobs else []
+            for job in jobs:
+                job.cancel()
+            return len(jobs)
+
+    def busy(self, key=None):
+        with self.condition:
+            return bool(self.jobs) if key is None else key in self.jobs
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                job = self.pending.popleft()
+            result, error = None, None
+            try:
+                if job.cancelled():
+                    raise JobCancelled(job.key)
+                result = job.target(job, *job.args)
+            except Exception as e:
+                error = e
+            with self.condition:
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+            self.finish(job, result, error)
+
+    def finish(self, job, result, error):
+        job.result, job.error = result, error
+        job.done_event.set()
+        if error is None:
+            if job.on_done is not None:
+                self.dispatch(job.on_done, result)
+        elif job.on_error is not None:
+            self.dispatch(job.on_error, error)
+        elif not isinstance(error, JobCancelled):
+            print(f"Background job {job.key} failed: {error}")
+
+    def shutdown(self, timeout=None):
+        # Queued jobs still run to report their cancellation; the running one stops at its next progress call
+        with self.condition:
+            self.stopped = True
+            for job in self.jobs.values():
+                job.cancel()
+            self.condition.notify()
+        self.worker.join(timeout)
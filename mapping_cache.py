@@ -0,0 +1,107 @@
+# mapping_cache.py
+
+import gzip
+import json
+import os
+import time
+import requests
+
+class MappingCache:
+    _shared = {}
+
+    def __init__(self, config):
+        self.path = config.MAPPING_CACHE_FILE
+        self.ttl = config.MAPPING_CACHE_TTL
+        self.item_names = None
+        self.buy_limits = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.load()
+
+    @classmethod
+    def shared(cls, config):
+        # One cache per file per process, so every scraper instance reuses the parsed mapping
+        if config.MAPPING_CACHE_FILE not in cls._shared:
+            cls._shared[config.MAPPING_CACHE_FILE] = cls(config)
+        return cls._shared[config.MAPPING_CACHE_FILE]
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as file:
+                cached = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable mapping cache {self.path}: {e}")
+            return
+        self.etag = cached.get("etag")
+        self.last_modified = cached.get("last_modified")
+        self.fetched_at = cached.get("fetched_at", 0)
+        self.item_names = {item_id: name for item_id, name, _ in cached["items"]}
+        self.buy_limits = {item_id: limit for item_id, _, limit in cached["items"]}
+
+    def save(self):
+        cached = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "items": [[item_id, name, self.buy_limits.get(item_id, 0)] for item_id, name in self.item_names.items()],
+        }
+        temp_path = f"{self.path}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+            json.dump(cached, file, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def is_fresh(self):
+        return self.item_names is not None and time.time() - self.fetched_at < self.ttl
+
+    def conditional_headers(self):
+        headers = {}
+        if self.item_names is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def store(self, mapping_data, headers):
+        self.item_names = {str(item['id']): item['name'] for item in mapping_data}
+        self.buy_limits = {str(item['id']): item.get('limit', 0) for item in mapping_data}
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+        self.fetched_at = time.time()
+        self.misses += 1
+        self.save()
+
+    def mark_not_modified(self):
+        self.fetched_at = time.time()
+        self.hits += 1
+        self.save()
+
+    def get(self, session, mapping_url, timeout):
+        if self.is_fresh():
+            self.hits += 1
+            return self.item_names, self.buy_limits
+
+        headers = self.conditional_headers()
+        if headers:
+            self.revalidations += 1
+        try:
+            response = session.get(mapping_url, headers=headers, timeout=timeout)
+            if response.status_code == 304:
+                self.mark_not_modified()
+            else:
+                response.raise_for_status()
+                self.store(response.json(), response.headers)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching item mapping: {e}")
+            if self.item_names is None:
+                return {}, {}
+        return self.item_names, self.buy_limits
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
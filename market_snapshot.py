@@ -0,0 +1,180 @@
+# market_snapshot.py
+
+import numpy as np
+
+# Column name -> (dtype, legacy record key)
+COLUMNS = {
+    "high": (np.float64, "High (Sell)"),
+    "high_volume": (np.int64, "High Volume"),
+    "low": (np.int64, "Low (Buy)"),
+    "low_volume": (np.int64, "Low Volume"),
+    "avg_high_5m": (np.int64, "5-Minute Average High Price"),
+    "roi": (np.float64, "ROI"),
+    "potential_profit": (np.float64, "Potential Profit"),
+    "fluctuation": (np.float64, "Price Fluctuation"),
+    "buy_limit": (np.int64, "Buy Limit"),
+    "historical_price": (np.int64, "Historical Price"),
+    "historical_volume": (np.int64, "Historical Volume"),
+}
+
+FEATURE_COLUMNS = [
+    "high",
+    "low",
+    "high_volume",
+    "low_volume",
+    "avg_high_5m",
+    "fluctuation",
+    "buy_limit",
+    "roi",
+    "historical_price",
+    "historical_volume",
+]
+
+class MarketSnapshot:
+    def __init__(self, item_ids, columns, item_names, timestamp=None, extra_features=None):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.columns = {name: np.asarray(columns[name], dtype=dtype) for name, (dtype, _) in COLUMNS.items()}
+        self.item_names = item_names
+        self.timestamp = timestamp
+        # Optional name -> float64 column appended after FEATURE_COLUMNS, e.g. rolling history features
+        self.extra_features = extra_features or {}
+
+    @classmethod
+    def empty(cls, item_names=None, timestamp=None):
+        return cls([], {name: [] for name in COLUMNS}, item_names or {}, timestamp)
+
+    @classmethod
+    def from_records(cls, items_data):
+        item_ids = [int(item["Item ID"]) for item in items_data]
+        columns = {name: [item[key] for item in items_data] for name, (_, key) in COLUMNS.items()}
+        item_names = {str(item["Item ID"]): item["Item Name"] for item in items_data}
+        return cls(item_ids, columns, item_names)
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def take(self, indices):
+        return MarketSnapshot(
+            self.item_ids[indices],
+            {name: values[indices] for name, values in self.columns.items()},
+            self.item_names,
+            self.timestamp,
+            {name: values[indices] for name, values in self.extra_features.items()},
+        )
+
+    def with_features(self, extra_features):
+        return MarketSnapshot(self.item_ids, self.columns, self.item_names, self.timestamp, dict(self.extra_features, **extra_features))
+
+    def name(self, index):
+        return self.item_names.get(str(self.item_ids[index]), "Unknown Item")
+
+    def feature_names(self):
+        return FEATURE_COLUMNS + list(self.extra_features)
+
+    def features(self):
+        columns = [self.columns[name] for name in FEATURE_COLUMNS] + list(self.extra_features.values())
+        return np.column_stack(columns).astype(np.float64, copy=False)
+
+    def targets(self):
+        return self.columns["potential_profit"]
+
+    def to_records(self, indices=None):
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.int64)
+        item_ids = self.item_ids[indices].tolist()
+        values = {key: self.columns[name][indices].tolist() for name, (_, key) in COLUMNS.items()}
+        records = []
+        for row, item_id in enumerate(item_ids):
+            record = {"Item ID": str(item_id), "Item Name": self.item_names.get(str(item_id), "Unknown Item")}
+            for key, column in values.items():
+                record[key] = column[row]
+            records.append(record)
+        return records
+
+def parse_payloads(data_latest, data_5m, data_historical):
+    item_ids = [item_id for item_id in data_latest if item_id in data_5m and data_historical.get(item_id)]
+    entries_5m = [data_5m[item_id] for item_id in item_ids]
+    entries_historical = [data_historical[item_id] for item_id in item_ids]
+    count = len(item_ids)
+
+    def column(entries, key, dtype=np.int64):
+        return np.fromiter((entry.get(key) or 0 for entry in entries), dtype=dtype, count=count)
+
+    raw = {
+        "avg_high": column(entries_5m, "avgHighPrice", np.float64),
+        "avg_low": column(entries_5m, "avgLowPrice", np.float64),
+        "high_volume": column(entries_5m, "highPriceVolume"),
+        "low_volume": column(entries_5m, "lowPriceVolume"),
+        "historical_price": column(entries_historical, "avgHighPrice"),
+        "historical_volume": column(entries_historical, "highPriceVolume") + column(entries_historical, "lowPriceVolume"),
+    }
+    return item_ids, raw
+
+def ge_tax(price, config):
+    # 1% of the sale price per item, rounded down and capped
+    return np.minimum(np.floor(price * config.GE_TAX_RATE), config.GE_TAX_CAP)
+
+def derive_metrics(raw):
+    # Same arithmetic, in the same order, as the original per-item loop so results match bit for bit
+    avg_high = raw["avg_high"]
+    high = avg_high - avg_high * 0.01
+    low = np.floor(raw["avg_low"] * 0.99).astype(np.int64)
+    avg_high_5m = np.trunc(avg_high).astype(np.int64)
+    potential_profit = high - low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_margin = (potential_profit / low) * 100
+        fluctuation = np.abs(high - avg_high_5m) / avg_high_5m
+        roi = potential_profit / avg_high_5m
+    return {
+        "high": high,
+        "low": low,
+        "avg_high_5m": avg_high_5m,
+        "potential_profit": potential_profit,
+        "profit_margin": profit_margin,
+        "fluctuation": fluctuation,
+        "roi": roi,
+    }
+
+def screen_mask(raw, metrics, config):
+    return (
+        (metrics["high"] > 0)
+        & (metrics["low"] > 0)
+        & (metrics["avg_high_5m"] > 0)
+        & (metrics["profit_margin"] >= config.MIN_PROFIT)
+        & (metrics["fluctuation"] >= config.MIN_FLUCTUATION)
+        & (metrics["roi"] >= config.MIN_ROI)
+        & (raw["high_volume"] >= config.MIN_SELL_VOLUME)
+        & (raw["low_volume"] >= config.MIN_BUY_VOLUME)
+    )
+
+def snapshot_columns(raw, metrics, buy_limit):
+    return {
+        "high": metrics["high"],
+        "high_volume": raw["high_volume"],
+        "low": metrics["low"],
+        "low_volume": raw["low_volume"],
+        "avg_high_5m": metrics["avg_high_5m"],
+        "roi": metrics["roi"],
+        "potential_profit": metrics["potential_profit"],
+        "fluctuation": metrics["fluctuation"] * 100,
+        "buy_limit": buy_limit,
+        "historical_price": raw["historical_price"],
+        "historical_volume": raw["historical_volume"],
+    }
+
+def build_snapshot(data_latest, data_5m, data_historical, item_names, buy_limits, config, timestamp=None):
+    item_ids, raw = parse_payloads(data_latest, data_5m, data_historical)
+    metrics = derive_metrics(raw)
+    selected = np.flatnonzero(screen_mask(raw, metrics, config))
+    buy_limit = np.fromiter((buy_limits.get(item_id, 0) for item_id in item_ids), dtype=np.int64, count=len(item_ids))
+    columns = {name: values[selected] for name, values in snapshot_columns(raw, metrics, buy_limit).items()}
+    return MarketSnapshot([int(item_ids[index]) for index in selected.tolist()], columns, item_names, timestamp)
+
+def as_snapshot(items_data):
+    if isinstance(items_data, MarketSnapshot):
+        return items_data
+    return MarketSnapshot.from_records(items_data)
@@ -0,0 +1,153 @@
+# model_store.py
+
+import gzip
+import os
+import pickle
+import tempfile
+import threading
+import time
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from market_snapshot import FEATURE_COLUMNS
+from tree_engine import compile_pipeline
+
+MODEL_VERSION = 2
+
+def build_pipeline(config, **regressor_params):
+    params = {"n_estimators": config.N_ESTIMATORS, "n_jobs": config.N_JOBS, "random_state": 42}
+    params.update(regressor_params)
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("regressor", RandomForestRegressor(**params)),
+    ])
+
+def make_bundle(pipeline, features=None):
+    # Scaler and regressor are versioned together so inference never refits the scaler
+    return {"version": MODEL_VERSION, "features": list(features or FEATURE_COLUMNS), "pipeline": pipeline, "updates": 0}
+
+def history_file(model_file):
+    # Training windows live beside the model so loading it for predictions never reads them
+    root, _ = os.path.splitext(model_file)
+    return root + "_history.pkl"
+
+def read_pickle(path):
+    with open(path, "rb") as file:
+        compressed = file.read(2) == b"\x1f\x8b"
+    with (gzip.open if compressed else open)(path, "rb") as file:
+        return pickle.load(file)
+
+def write_pickle(obj, path, compress=0):
+    # Write next to the target and rename over it, so readers only ever see a complete file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with gzip.open(temp_path, "wb", compresslevel=compress) if compress else open(temp_path, "wb") as file:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def load_bundle(model_file):
+    # Read fully into memory: the cached bundle must not keep model_file open, or saving over it
+    # with os.replace fails on Windows
+    try:
+        bundle = read_pickle(model_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+        print(f"Ignoring {model_file}: {e}, please retrain.")
+        return None
+    if not isinstance(bundle, dict) or bundle.get("version") != MODEL_VERSION or bundle.get("features", [])[:len(FEATURE_COLUMNS)] != FEATURE_COLUMNS:
+        print(f"Ignoring {model_file}: not a version {MODEL_VERSION} model pipeline, please retrain.")
+        return None
+    saved_with = bundle.get("metadata", {}).get("sklearn_version")
+    if saved_with and saved_with != sklearn.__version__:
+        print(f"Warning: {model_file} was saved with scikit-learn {saved_with}, running {sklearn.__version__}.")
+    return bundle
+
+def save_bundle(bundle, model_file, compress=0):
+    bundle["metadata"] = {
+        "saved_at": time.time(),
+        "sklearn_version": sklearn.__version__,
+        "compress": compress,
+    }
+    write_pickle(bundle, model_file, compress)
+
+def load_history(model_file):
+    try:
+        return read_pickle(history_file(model_file))
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return []
+
+def save_history(history, model_file):
+    write_pickle(history, history_file(model_file))
+
+class ModelCache:
+    def __init__(self):
+        self.entries = {}
+        self.predictors = {}
+        self.lock = threading.Lock()
+        self.loads = 0
+
+    def signature(self, model_file):
+        try:
+            stat = os.stat(model_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, model_file):
+        with self.lock:
+            signature = self.signature(model_file)
+            if signature is None:
+                self.entries.pop(model_file, None)
+                return None
+            entry = self.entries.get(model_file)
+            if entry is None or entry[0] != signature:
+                bundle = load_bundle(model_file)
+                self.loads += 1
+                entry = (signature, bundle)
+                self.entries[model_file] = entry
+            return entry[1]
+
+    def put(self, model_file, bundle, compress=0):
+        with self.lock:
+            save_bundle(bundle, model_file, compress)
+            self.entries[model_file] = (self.signature(model_file), bundle)
+
+    def get_predictor(self, model_file, compiled=True):
+        bundle = self.get(model_file)
+        if bundle is None:
+            return None
+        if not compiled:
+            return bundle["pipeline"]
+        with self.lock:
+            cached = self.predictors.get(model_file)
+            if cached is None or cached[0] is not bundle:
+                cached = (bundle, compile_pipeline(bundle["pipeline"]))
+                self.predictors[model_file] = cached
+            return cached[1]
+
+    def invalidate(self, model_file=None):
+        with self.lock:
+            if model_file is None:
+                self.entries.clear()
+                self.predictors.clear()
+            else:
+                self.entries.pop(model_file, None)
+                self.predictors.pop(model_file, None)
+
+model_cache = ModelCache()
+
+def load_pipeline(model_file):
+    bundle = model_cache.get(model_file)
+    return bundle["pipeline"] if bundle else None
+
+def load_predictor(config, features=None):
+    bundle = model_cache.get(config.MODEL_FILE)
+    if bundle is not None and features is not None and bundle["features"] != list(features):
+        print(f"Ignoring {config.MODEL_FILE}: trained on different features, please retrain.")
+        return None
+    return model_cache.get_predictor(config.MODEL_FILE, config.COMPILED_INFERENCE)
@@ -0,0 +1,73 @@
+# model_tuning.py
+
+import multiprocessing
+import os
+import queue
+import time
+import numpy as np
+from sklearn.model_selection import GroupKFold, KFold, cross_val_score
+from config import Config
+from model_store import build_pipeline
+from utils import expand_grid, prepare_training_data
+
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 10, 20],
+    "max_features": [1.0, 0.5, "sqrt"],
+}
+
+def stack_snapshots(snapshots):
+    batches = [prepare_training_data(snapshot) for snapshot in snapshots]
+    X = np.concatenate([X_batch for X_batch, _ in batches])
+    y = np.concatenate([y_batch for _, y_batch in batches])
+    groups = np.concatenate([np.full(len(y_batch), index) for index, (_, y_batch) in enumerate(batches)])
+    return X, y, groups
+
+def evaluate_params(pipeline, params, X, y, groups, folds):
+    # Runs in a worker process; each worker fits single-threaded so the pool owns the cores
+    start = time.perf_counter()
+    if len(np.unique(groups)) >= folds:
+        splits = GroupKFold(n_splits=folds).split(X, y, groups)
+    else:
+        splits = KFold(n_splits=folds, shuffle=True, random_state=42).split(X, y)
+    scores = cross_val_score(pipeline, X, y, cv=list(splits), scoring="neg_mean_absolute_error")
+    return {"params": params, "mae": float(-scores.mean()), "seconds": time.perf_counter() - start}
+
+def tune_model(snapshots, config=Config, param_grid=None, time_budget=None, max_workers=None):
+    X, y, groups = stack_snapshots(snapshots)
+    candidates = expand_grid(param_grid or PARAM_GRID)
+    time_budget = config.TUNING_TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + time_budget
+    results = []
+    finished = queue.Queue()
+
+    # The pool is terminated when the budget runs out, so fits still in progress stop with the sweep
+    pool = multiprocessing.Pool(processes=max_workers or os.cpu_count())
+    try:
+        for params in candidates:
+            pipeline = build_pipeline(config, n_jobs=1, **params)
+            pool.apply_async(evaluate_params, (pipeline, params, X, y, groups, config.CV_FOLDS),
+                             callback=finished.put, error_callback=finished.put)
+        for _ in candidates:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result = finished.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if isinstance(result, BaseException):
+                raise result
+            results.append(result)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if not results:
+        print(f"No parameter set finished within the {time_budget}s tuning budget.")
+        return None, results
+
+    results.sort(key=lambda result: result["mae"])
+    best = build_pipeline(config, **results[0]["params"])
+    best.fit(X, y)
+    return best, results
@@ -1,6 +1,25 @@
 # data_manager.py
 
+import os
 import sqlite3
+import struct
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+
+Q_TABLE_MAGIC = b"OSRQ"
+Q_TABLE_VERSION = 1
+PRICE_COLUMNS = ("timestamp", "high_price", "low_price", "high_volume", "low_volume")
+PRICES_SCHEMA_VERSION = 1
+
+def to_epoch(timestamp):
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return int(timestamp.timestamp())
+    if isinstance(timestamp, str):
+        return to_epoch(datetime.fromisoformat(timestamp.replace("Z", "+00:00")))
+    return int(timestamp)
 
 class DataManager:
     def __init__(self, db_name):
@@ -9,67 +28,223 @@ class DataManager:
         self.cursor = None
 
     def connect(self):
-        self.conn = sqlite3.connect(self.db_name)
-        self.cursor = self.conn.cursor()
+        # One long-lived connection; WAL lets readers run while a snapshot is being written
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+            self.conn.execute("PRAGMA cache_size=-65536")
+            self.conn.execute("PRAGMA mmap_size=268435456")
+            self.cursor = self.conn.cursor()
+        return self.conn
 
     def disconnect(self):
         if self.conn:
             self.conn.close()
+            self.conn = None
+            self.cursor = None
 
-    def create_tables(self):
+    def __enter__(self):
         self.connect()
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS items (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                description TEXT
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS prices (
-                id INTEGER PRIMARY KEY,
-                item_id INTEGER,
-                timestamp TEXT,
-                price REAL,
-                volume INTEGER,
-                FOREIGN KEY (item_id) REFERENCES items (id)
-            )
-        """)
-        self.conn.commit()
+        return self
+
+    def __exit__(self, *exc_info):
         self.disconnect()
 
+    def create_tables(self):
+        conn = self.connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    description TEXT
+                )
+            """)
+            self.check_prices_schema(conn)
+            # Clustered on (item_id, timestamp): per-item range scans read contiguous pages
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prices (
+                    item_id INTEGER NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    high_price INTEGER NOT NULL DEFAULT 0,
+                    low_price INTEGER NOT NULL DEFAULT 0,
+                    high_volume INTEGER NOT NULL DEFAULT 0,
+                    low_volume INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (item_id, timestamp)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS prices_timestamp ON prices (timestamp)")
+            conn.execute(f"PRAGMA user_version = {PRICES_SCHEMA_VERSION}")
+
+    def check_prices_schema(self, conn):
+        # CREATE TABLE IF NOT EXISTS would keep a prices table from an older layout and fail on the first insert
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > PRICES_SCHEMA_VERSION:
+            raise ValueError(f"{self.db_name} uses prices schema version {version}; this version reads up to {PRICES_SCHEMA_VERSION}.")
+        if version == PRICES_SCHEMA_VERSION:
+            return
+        columns = tuple(row[1] for row in conn.execute("PRAGMA table_info(prices)"))
+        if not columns or columns == ("item_id",) + PRICE_COLUMNS:
+            return
+        if conn.execute("SELECT 1 FROM prices LIMIT 1").fetchone() is None:
+            print(f"Replacing the empty old-layout prices table in {self.db_name}.")
+            conn.execute("DROP TABLE prices")
+            return
+        raise ValueError(f"{self.db_name} has a prices table in an old layout ({', '.join(columns)}); "
+                         f"move it aside and record a new history with recorder.py.")
+
     def insert_item(self, item_id, item_name, item_description):
-        self.connect()
-        self.cursor.execute("""
-            INSERT OR REPLACE INTO items (id, name, description)
-            VALUES (?, ?, ?)
-        """, (item_id, item_name, item_description))
-        self.conn.commit()
-        self.disconnect()
+        self.insert_items([(item_id, item_name, item_description)])
 
-    def insert_price(self, item_id, timestamp, price, volume):
-        self.connect()
-        self.cursor.execute("""
-            INSERT INTO prices (item_id, timestamp, price, volume)
-            VALUES (?, ?, ?, ?)
-        """, (item_id, timestamp, price, volume))
-        self.conn.commit()
-        self.disconnect()
+    def insert_items(self, items):
+        conn = self.connect()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO items (id, name, description)
+                VALUES (?, ?, ?)
+            """, items)
+
+    def insert_price(self, item_id, timestamp, high_price, low_price, high_volume, low_volume):
+        self.insert_prices([(item_id, timestamp, high_price, low_price, high_volume, low_volume)])
+
+    def insert_prices(self, rows):
+        # rows: (item_id, timestamp, high_price, low_price, high_volume, low_volume); one transaction per batch
+        conn = self.connect()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO prices (item_id, timestamp, high_price, low_price, high_volume, low_volume)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ((int(item_id), to_epoch(timestamp), high_price or 0, low_price or 0, high_volume or 0, low_volume or 0)
+                  for item_id, timestamp, high_price, low_price, high_volume, low_volume in rows))
 
     def get_item(self, item_id):
         self.connect()
         self.cursor.execute("""
             SELECT * FROM items WHERE id = ?
         """, (item_id,))
-        item = self.cursor.fetchone()
-        self.disconnect()
-        return item
+        return self.cursor.fetchone()
 
-    def get_prices(self, item_id):
+    def get_prices(self, item_id, start=None, end=None):
         self.connect()
         self.cursor.execute("""
-            SELECT * FROM prices WHERE item_id = ?
-        """, (item_id,))
-        prices = self.cursor.fetchall()
-        self.disconnect()
-        return prices
+            SELECT timestamp, high_price, low_price, high_volume, low_volume FROM prices
+            WHERE item_id = ? AND timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp
+        """, (item_id, to_epoch(start) if start is not None else 0, to_epoch(end) if end is not None else 2 ** 62))
+        return self.rows_to_arrays(self.cursor.fetchall(), PRICE_COLUMNS)
+
+    def price_range_cursor(self, start=None, end=None):
+        cursor = self.connect().cursor()
+        cursor.execute("""
+            SELECT item_id, timestamp, high_price, low_price, high_volume, low_volume FROM prices
+            WHERE timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp, item_id
+        """, (to_epoch(start) if start is not None else 0, to_epoch(end) if end is not None else 2 ** 62))
+        return cursor
+
+    def get_price_range(self, start=None, end=None):
+        return self.rows_to_arrays(self.price_range_cursor(start, end).fetchall(), ("item_id",) + PRICE_COLUMNS)
+
+    def iter_price_range(self, start=None, end=None, batch_size=100000):
+        # get_price_range in batches of rows, so a long range is never held in memory as tuples
+        cursor = self.price_range_cursor(start, end)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield self.rows_to_arrays(rows, ("item_id",) + PRICE_COLUMNS)
+
+    def latest_timestamp(self):
+        self.connect()
+        self.cursor.execute("SELECT MAX(timestamp) FROM prices")
+        return self.cursor.fetchone()[0]
+
+    def rows_to_arrays(self, rows, columns):
+        values = np.array(rows, dtype=np.int64).reshape(-1, len(columns))
+        return {column: values[:, index] for index, column in enumerate(columns)}
+
+class OSRSAgent:
+    # Tabular Q-learning over the discrete market states of osrs_rl.environment. Every method takes a
+    # single state or an array of states, so one call serves a whole batch of environments.
+    def __init__(self, config, seed=None):
+        self.config = config
+        self.epsilon = config.EPSILON
+        self.alpha = config.ALPHA
+        self.gamma = config.GAMMA
+        self.q_table = np.zeros((config.NUM_STATES, config.NUM_ACTIONS))
+        self.rng = np.random.default_rng(seed)
+        if os.path.exists(config.Q_TABLE_FILE):
+            self.load(config.Q_TABLE_FILE)
+
+    def choose_action(self, state):
+        states = np.asarray(state, dtype=np.intp)
+        actions = self.q_table[states].argmax(axis=-1)
+        explore = self.rng.random(states.shape) < self.epsilon
+        actions = np.where(explore, self.rng.integers(0, self.q_table.shape[1], states.shape), actions)
+        return int(actions) if actions.ndim == 0 else actions
+
+    def predict(self, state):
+        actions = self.q_table[np.asarray(state, dtype=np.intp)].argmax(axis=-1)
+        return int(actions) if actions.ndim == 0 else actions
+
+    def update_q_table(self, state, action, reward, next_state, done=False, weights=None):
+        states = np.atleast_1d(np.asarray(state, dtype=np.intp))
+        actions = np.atleast_1d(np.asarray(action, dtype=np.intp))
+        rewards = np.atleast_1d(np.asarray(reward, dtype=np.float64))
+        next_states = np.atleast_1d(np.asarray(next_state, dtype=np.intp))
+        done = np.atleast_1d(np.asarray(done, dtype=bool))
+
+        targets = rewards + self.gamma * self.q_table[next_states].max(axis=1) * ~done
+        td_errors = targets - self.q_table[states, actions]
+        # Transitions sharing a (state, action) cell move it once, by the mean TD error, so a batch of
+        # 1000 envs takes the same size step as one env instead of 1000 stacked ones
+        # Importance weights from prioritized replay scale each transition's share of the step
+        weights = np.ones_like(td_errors) if weights is None else np.atleast_1d(np.asarray(weights, dtype=np.float64))
+        cells = states * self.q_table.shape[1] + actions
+        counts = np.bincount(cells, minlength=self.q_table.size)
+        totals = np.bincount(cells, weights=td_errors * weights, minlength=self.q_table.size)
+        visited = counts > 0
+        self.q_table.ravel()[visited] += self.alpha * totals[visited] / counts[visited]
+        return td_errors
+
+    def save(self, path):
+        # Magic, version and shape header followed by the raw little-endian float64 table
+        header = Q_TABLE_MAGIC + struct.pack("<HII", Q_TABLE_VERSION, *self.q_table.shape)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(header)
+                file.write(np.ascontiguousarray(self.q_table, dtype="<f8").tobytes())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def load(self, path):
+        # Anything but a complete table of the expected shape is reported and the fresh table kept
+        header_size = len(Q_TABLE_MAGIC) + struct.calcsize("<HII")
+        with open(path, "rb") as file:
+            header = file.read(header_size)
+            if len(header) < header_size or header[:len(Q_TABLE_MAGIC)] != Q_TABLE_MAGIC:
+                print(f"Ignoring {path}: not a Q-table file.")
+                return False
+            version, num_states, num_actions = struct.unpack("<HII", header[len(Q_TABLE_MAGIC):])
+            if version != Q_TABLE_VERSION:
+                print(f"Ignoring {path}: Q-table version {version}, expected {Q_TABLE_VERSION}.")
+                return False
+            if (num_states, num_actions) != self.q_table.shape:
+                print(f"Ignoring {path}: table is {num_states}x{num_actions}, expected {self.q_table.shape[0]}x{self.q_table.shape[1]}.")
+                return False
+            data = file.read()
+        if len(data) != self.q_table.size * 8:
+            print(f"Ignoring {path}: {len(data)} bytes of Q-values, expected {self.q_table.size * 8}; the file is truncated or corrupt.")
+            return False
+        q_table = np.frombuffer(data, dtype="<f8").reshape(num_states, num_actions).astype(np.float64)
+        if not np.isfinite(q_table).all():
+            print(f"Ignoring {path}: the table holds non-finite Q-values.")
+            return False
+        self.q_table = q_table
+        return True
@@ -1,75 +1,208 @@
-# osrs_rl/environment.py
-
-class OSRSEnvironment:
-    def __init__(self, config):
-        self.config = config
-        self.current_state = None
-        self.current_item = None
-        self.current_price = None
-        self.current_volume = None
-        self.current_profit = None
-        self.total_profit = 0
-        self.total_transactions = 0
-
-    def reset(self):
-        self.current_state = None
-        self.current_item = None
-        self.current_price = None
-        self.current_volume = None
-        self.current_profit = None
-        self.total_profit = 0
-        self.total_transactions = 0
-
-    def step(self, action):
-        # Perform the action and update the state
-        if action == "buy":
-            if self.current_item is not None and self.current_price is not None and self.current_volume is not None:
-                transaction_cost = self.current_price * self.current_volume
-                self.total_profit -= transaction_cost
-                self.total_transactions += 1
-                self.current_state = "holding"
-            else:
-                # Invalid action, no item or price available for buying
-                self.current_state = "idle"
-        elif action == "sell":
-            if self.current_item is not None and self.current_price is not None and self.current_volume is not None:
-                transaction_profit = self.current_price * self.current_volume
-                self.total_profit += transaction_profit
-                self.total_transactions += 1
-                self.current_state = "idle"
-            else:
-                # Invalid action, no item or price available for selling
-                self.current_state = "holding"
-        else:
-            # Invalid action
-            self.current_state = self.current_state
-
-        # Calculate the reward based on the action and state transition
-        reward = 0
-        if action == "buy" and self.current_state == "holding":
-            reward = -1  # Negative reward for buying
-        elif action == "sell" and self.current_state == "idle":
-            reward = 1  # Positive reward for selling
-
-        # Determine if the episode is done
-        done = self.total_transactions >= self.config.MAX_TRANSACTIONS
-
-        # Create an info dictionary for additional information
-        info = {
-            "total_profit": self.total_profit,
-            "total_transactions": self.total_transactions
-        }
-
-        # Return the next_state, reward, done, and info
-        return self.current_state, reward, done, info
-
-    def render(self):
-        # Provide a visualization of the environment
-        print(f"Current State: {self.current_state}")
-        print(f"Current Item: {self.current_item}")
-        print(f"Current Price: {self.current_price}")
-        print(f"Current Volume: {self.current_volume}")
-        print(f"Current Profit: {self.current_profit}")
-        print(f"Total Profit: {self.total_profit}")
-        print(f"Total Transactions: {self.total_transactions}")
-        print("---")
\ No newline at end of file
+# osrs_rl/environment.py
+
+import os
+import numpy as np
+from mapping_cache import MappingCache
+from market_snapshot import ge_tax
+from osrs_rl.agent import DataManager
+
+BUCKET_SECONDS = 300
+ACTION_SELL = 0
+ACTION_BUY = 1
+ACTIONS = {"sell": ACTION_SELL, "buy": ACTION_BUY}
+
+def forward_fill(grid):
+    # Zero means no trade in that bucket; carry the last traded price forward along time
+    grid = np.asarray(grid, dtype=np.float64)
+    last = np.where(grid > 0, np.arange(grid.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return grid[np.arange(grid.shape[0])[:, None], last]
+
+def history_grids(rows):
+    # DataManager.get_price_range rows -> item ids, bucket timestamps and dense (items x buckets) grids
+    item_ids, item_rows = np.unique(rows["item_id"], return_inverse=True)
+    start = int(rows["timestamp"].min())
+    buckets = (rows["timestamp"] - start) // BUCKET_SECONDS
+    timestamps = start + BUCKET_SECONDS * np.arange(int(buckets.max()) + 1)
+    grids = {}
+    for column in ("high_price", "low_price", "high_volume", "low_volume"):
+        grid = np.zeros((len(item_ids), len(timestamps)), dtype=np.int64)
+        grid[item_rows, buckets] = rows[column]
+        grids[column] = grid
+    return item_ids, timestamps, grids
+
+def margin_state(holding, margin, config):
+    # Discrete state: whether gold is tied up in the item x which bin its after-tax margin falls in
+    bins = np.searchsorted(config.MARGIN_BIN_EDGES, margin, side="right")
+    return np.asarray(holding, dtype=np.int64) * (len(config.MARGIN_BIN_EDGES) + 1) + bins
+
+class MarketEnvironment:
+    # N independent flipping episodes stepped together. Each episode trades one item from a random
+    # start bucket of recorded history with its own cash, holdings and GE buy-limit window.
+    # Action 1 buys as much as cash, the buy limit and a share of the bucket's volume allow at the
+    # 5m low; action 0 sells holdings at the 5m high. Rewards are realized gold PnL after tax, and
+    # finished episodes are liquidated at the low price and restarted automatically.
+    def __init__(self, item_ids, timestamps, grids, buy_limits, config, num_envs=1, seed=None):
+        self.config = config
+        self.num_envs = num_envs
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.high = forward_fill(grids["high_price"])
+        self.low = forward_fill(grids["low_price"])
+        self.high_volume = np.asarray(grids["high_volume"], dtype=np.float64)
+        self.low_volume = np.asarray(grids["low_volume"], dtype=np.float64)
+        self.buy_limit = np.fromiter((buy_limits.get(str(item_id), 0) for item_id in self.item_ids.tolist()), dtype=np.float64, count=len(self.item_ids))
+        self.episode_length = min(config.EPISODE_LENGTH, len(self.timestamps) - 1)
+        traded = (self.high > 0).any(axis=1) & (self.low > 0).any(axis=1) & (self.buy_limit > 0)
+        self.tradable = np.flatnonzero(traded)
+        if self.episode_length < 1 or not len(self.tradable):
+            raise ValueError("not enough price history to run episodes")
+        self.rng = np.random.default_rng(seed)
+
+        self.item = np.zeros(num_envs, dtype=np.intp)
+        self.start = np.zeros(num_envs, dtype=np.intp)
+        self.time = np.zeros(num_envs, dtype=np.intp)
+        self.cash = np.zeros(num_envs)
+        self.holdings = np.zeros(num_envs)
+        self.cost_basis = np.zeros(num_envs)
+        self.bought = np.zeros(num_envs)
+        self.limit_reset = np.zeros(num_envs, dtype=np.int64)
+        self.total_profit = np.zeros(num_envs)
+        self.total_transactions = np.zeros(num_envs, dtype=np.int64)
+
+    @classmethod
+    def from_db(cls, config, num_envs=1, seed=None, buy_limits=None):
+        if not os.path.exists(config.HISTORY_DB):
+            return None
+        with DataManager(config.HISTORY_DB) as data_manager:
+            latest = data_manager.latest_timestamp()
+            if latest is None:
+                return None
+            rows = data_manager.get_price_range(latest - config.FEATURE_LOOKBACK)
+        if buy_limits is None:
+            mapping_cache = MappingCache.shared(config)
+            mapping_cache.load()
+            buy_limits = mapping_cache.buy_limits or {}
+        return cls(*history_grids(rows), buy_limits, config, num_envs, seed)
+
+    def states(self, envs=slice(None)):
+        high = self.high[self.item[envs], self.time[envs]]
+        low = self.low[self.item[envs], self.time[envs]]
+        margin = np.divide(high - ge_tax(high, self.config) - low, low, out=np.full(len(low), -np.inf), where=low > 0)
+        return margin_state(self.holdings[envs] > 0, margin, self.config)
+
+    def reset(self, envs=None):
+        envs = np.arange(self.num_envs) if envs is None else envs
+        self.item[envs] = self.rng.choice(self.tradable, len(envs))
+        self.start[envs] = self.rng.integers(0, len(self.timestamps) - self.episode_length, len(envs))
+        self.time[envs] = self.start[envs]
+        self.cash[envs] = self.config.STARTING_GOLD
+        self.holdings[envs] = 0
+        self.cost_basis[envs] = 0
+        self.bought[envs] = 0
+        self.limit_reset[envs] = 0
+        self.total_profit[envs] = 0
+        self.total_transactions[envs] = 0
+        return self.states(envs)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        item, time = self.item, self.time
+        high = self.high[item, time]
+        low = self.low[item, time]
+        timestamp = self.timestamps[time]
+        share = self.config.ENV_VOLUME_SHARE
+
+        # Buy limits reset a fixed window after the first purchase
+        expired = timestamp >= self.limit_reset
+        self.bought[expired] = 0
+        buy = (actions == ACTION_BUY) & (low > 0)
+        cash_quantity = np.floor(np.divide(self.cash, low, out=np.zeros_like(low), where=buy))
+        quantity = np.minimum(np.minimum(self.buy_limit[item] - self.bought, cash_quantity), np.floor(share * self.low_volume[item, time]))
+        quantity = np.where(buy, np.maximum(quantity, 0), 0)
+        starts_window = (quantity > 0) & (self.bought == 0)
+        self.limit_reset[starts_window] = timestamp[starts_window] + self.config.BUY_LIMIT_WINDOW
+        cost = quantity * low
+        self.cost_basis += cost
+        self.cash -= cost
+        self.holdings += quantity
+        self.bought += quantity
+
+        sell = (actions == ACTION_SELL) & (self.holdings > 0) & (high > 0)
+        sold = np.where(sell, np.minimum(self.holdings, np.floor(share * self.high_volume[item, time])), 0)
+        rewards = self.realize(sold, high)
+        self.total_transactions += (quantity > 0) + (sold > 0)
+
+        self.time += 1
+        dones = (self.time - self.start >= self.episode_length) | (self.total_transactions >= self.config.MAX_TRANSACTIONS)
+        if dones.any():
+            # Whatever is still held at the end is dumped at the instant-sell price, volume permitting or not
+            finished = np.flatnonzero(dones)
+            rewards[finished] += self.realize(np.where(dones, self.holdings, 0), self.low[item, np.minimum(self.time, len(self.timestamps) - 1)])[finished]
+
+        info = {"total_profit": self.total_profit.copy(), "total_transactions": self.total_transactions.copy()}
+        states = self.states()
+        if dones.any():
+            states[finished] = self.reset(finished)
+        return states, rewards, dones, info
+
+    def realize(self, quantity, price):
+        held = np.maximum(self.holdings, 1)
+        cost = self.cost_basis * quantity / held
+        pnl = quantity * (price - ge_tax(price, self.config)) - cost
+        self.cash += quantity * (price - ge_tax(price, self.config))
+        self.cost_basis -= cost
+        self.holdings -= quantity
+        self.total_profit += pnl
+        return pnl
+
+class OSRSEnvironment:
+    # Single-episode view of MarketEnvironment with the original reset/step/render interface
+    def __init__(self, config, market=None):
+        self.config = config
+        self.market = market
+        self.current_state = None
+        self.total_profit = 0
+        self.total_transactions = 0
+
+    def get_states(self, high, low):
+        # States of fresh positions in suggested items, from their suggested sell and buy prices
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        margin = np.divide(high - ge_tax(high, self.config) - low, low, out=np.full(len(low), -np.inf), where=low > 0)
+        return margin_state(np.zeros(len(low), dtype=bool), margin, self.config)
+
+    def get_state(self, suggestion):
+        return int(self.get_states([suggestion["High (Sell)"]], [suggestion["Low (Buy)"]])[0])
+
+    def reset(self):
+        if self.market is None:
+            self.market = MarketEnvironment.from_db(self.config)
+            if self.market is None:
+                print(f"No recorded price history in {self.config.HISTORY_DB}; run recorder.py first.")
+                return None
+        self.current_state = int(self.market.reset()[0])
+        self.total_profit = 0
+        self.total_transactions = 0
+        return self.current_state
+
+    def step(self, action):
+        action = ACTIONS.get(action, action)
+        states, rewards, dones, info = self.market.step(np.array([action]))
+        self.current_state = int(states[0])
+        self.total_profit = float(info["total_profit"][0])
+        self.total_transactions = int(info["total_transactions"][0])
+        info = {"total_profit": self.total_profit, "total_transactions": self.total_transactions}
+        return self.current_state, float(rewards[0]), bool(dones[0]), info
+
+    def render(self):
+        market = self.market
+        print(f"Current State: {self.current_state}")
+        if market is not None:
+            item, time = market.item[0], market.time[0]
+            print(f"Current Item: {market.item_ids[item]}")
+            print(f"Current Price: {market.low[item, time]:.0f} / {market.high[item, time]:.0f}")
+            print(f"Current Holdings: {market.holdings[0]:.0f}")
+        print(f"Total Profit: {self.total_profit}")
+        print(f"Total Transactions: {self.total_transactions}")
+        print("---")
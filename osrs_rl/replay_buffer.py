@@ -0,0 +1,119 @@
+# osrs_rl/replay_buffer.py
+
+import os
+import numpy as np
+
+FIELDS = {
+    "state": np.int32,
+    "action": np.int16,
+    "reward": np.float64,
+    "next_state": np.int32,
+    "done": np.bool_,
+}
+
+class SumTree:
+    # Complete binary tree in one array: leaves hold priorities, each parent the sum of its children.
+    # Updates and prefix-sum lookups touch one node per level, O(log n), for a whole batch at once.
+    def __init__(self, capacity):
+        self.leaves = 1 << max(int(capacity) - 1, 1).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.nodes = np.zeros(2 * self.leaves)
+
+    def total(self):
+        return self.nodes[1]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.intp) + self.leaves
+        self.nodes[nodes] = priorities
+        for _ in range(self.depth):
+            # Duplicate parents all write the same sum of already-updated children, so no dedup is needed
+            nodes >>= 1
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+
+    def find(self, values):
+        # Leaf whose cumulative priority range contains each value
+        nodes = np.ones(len(values), dtype=np.intp)
+        values = np.array(values, dtype=np.float64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.nodes[left]
+            go_right = values > left_sum
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+class ReplayBuffer:
+    # Fixed-capacity ring of (state, action, reward, next_state, done) columns with proportional
+    # prioritized sampling. Columns live in RAM, or in memory-mapped .npy files under `path` once the
+    # buffer would outgrow `memory_limit` bytes, so only the pages a minibatch touches are read.
+    def __init__(self, capacity, alpha=0.6, beta=0.4, epsilon=1e-6, path=None, memory_limit=1 << 30, seed=None):
+        self.capacity = int(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.cursor = 0
+        self.size = 0
+        self.max_priority = 1.0
+        # Transitions the trainer may still replay; grows as transitions are added, spent per minibatch
+        self.replay_credit = 0.0
+        self.tree = SumTree(self.capacity)
+        self.rng = np.random.default_rng(seed)
+
+        row_bytes = sum(np.dtype(dtype).itemsize for dtype in FIELDS.values())
+        self.path = path if path is not None and self.capacity * row_bytes > memory_limit else None
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self.columns = {
+                name: np.lib.format.open_memmap(os.path.join(self.path, f"{name}.npy"), mode="w+", dtype=dtype, shape=(self.capacity,))
+                for name, dtype in FIELDS.items()
+            }
+        else:
+            self.columns = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in FIELDS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        values = {
+            "state": np.atleast_1d(state),
+            "action": np.atleast_1d(action),
+            "reward": np.atleast_1d(reward),
+            "next_state": np.atleast_1d(next_state),
+            "done": np.atleast_1d(done),
+        }
+        count = len(values["state"])
+        if count > self.capacity:
+            values = {name: column[-self.capacity:] for name, column in values.items()}
+            count = self.capacity
+        positions = (self.cursor + np.arange(count)) % self.capacity
+        for name, column in values.items():
+            self.columns[name][positions] = column
+        # New transitions get the highest priority seen so far, so each is sampled at least once soon
+        self.tree.update(positions, self.max_priority ** self.alpha)
+        self.cursor = (self.cursor + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return positions
+
+    def sample(self, batch_size, beta=None):
+        # Stratified: one draw from each of batch_size equal slices of the total priority mass
+        beta = self.beta if beta is None else beta
+        total = self.tree.total()
+        bounds = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        indices = np.minimum(self.tree.find(np.minimum(bounds, np.nextafter(total, 0))), self.size - 1)
+        order = np.argsort(indices, kind="stable")
+        indices = indices[order]
+        batch = {name: column[indices] for name, column in self.columns.items()}
+        probabilities = self.tree.nodes[indices + self.tree.leaves] / total
+        weights = (self.size * probabilities) ** -beta
+        weights /= weights.max()
+        return indices, batch, weights
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+    def flush(self):
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
@@ -1,35 +1,212 @@
-# osrs_rl/trainer.py
-
-class OSRSTrainer:
-    def __init__(self, agent, environment):
-        self.agent = agent
-        self.environment = environment
-
-    def train(self, num_episodes):
-        for episode in range(num_episodes):
-            state = self.environment.reset()
-            done = False
-            while not done:
-                action = self.agent.choose_action(state)
-                next_state, reward, done, info = self.environment.step(action)
-                self.agent.update_q_table(state, action, reward, next_state)
-                state = next_state
-            print(f"Episode {episode + 1}: Total Profit = {info['total_profit']}, Total Transactions = {info['total_transactions']}")
-
-    def evaluate(self, num_episodes):
-        total_profit = 0
-        total_transactions = 0
-        for episode in range(num_episodes):
-            state = self.environment.reset()
-            done = False
-            while not done:
-                action = self.agent.predict(state)
-                next_state, reward, done, info = self.environment.step(action)
-                state = next_state
-            total_profit += info['total_profit']
-            total_transactions += info['total_transactions']
-        average_profit = total_profit / num_episodes
-        average_transactions = total_transactions / num_episodes
-        print(f"Evaluation Results:")
-        print(f"Average Profit per Episode: {average_profit}")
-        print(f"Average Transactions per Episode: {average_transactions}")
\ No newline at end of file
+# osrs_rl/trainer.py
+
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from osrs_rl.agent import OSRSAgent
+from osrs_rl.environment import MarketEnvironment
+from osrs_rl.replay_buffer import ReplayBuffer
+
+def make_replay_buffer(config, path=None, seed=None):
+    if not config.REPLAY_CAPACITY:
+        return None
+    return ReplayBuffer(config.REPLAY_CAPACITY, config.REPLAY_ALPHA, config.REPLAY_BETA, path=path,
+                        memory_limit=config.REPLAY_MEMORY_LIMIT, seed=seed)
+
+def learn(agent, replay_buffer, states, actions, rewards, next_states, dones, batch_size, replay_ratio=1.0):
+    # Without a buffer each transition is used once. With one, new transitions go in and prioritized
+    # minibatches of old and new ones come out, about replay_ratio replayed per transition added: a
+    # single environment replays one batch every batch_size / replay_ratio steps, not every step.
+    if replay_buffer is None:
+        return agent.update_q_table(states, actions, rewards, next_states, dones)
+    replay_buffer.add(states, actions, rewards, next_states, dones)
+    replay_buffer.replay_credit += np.size(states) * replay_ratio
+    td_errors = None
+    while replay_buffer.replay_credit >= batch_size:
+        replay_buffer.replay_credit -= batch_size
+        indices, batch, weights = replay_buffer.sample(batch_size)
+        td_errors = agent.update_q_table(batch["state"], batch["action"], batch["reward"], batch["next_state"], batch["done"], weights)
+        replay_buffer.update_priorities(indices, td_errors)
+    return td_errors
+
+def rollout_worker(conn, item_ids, timestamps, grids, buy_limits, config, num_envs, seed, replay_path=None):
+    # Owns one slice of the item histories; each round it learns from a copy of the shared Q-table and
+    # sends back the change it made, so the learner never waits on more than one message per worker
+    agent_seed, market_seed, replay_seed = seed.spawn(3)
+    market = MarketEnvironment(item_ids, timestamps, grids, buy_limits, config, num_envs, market_seed)
+    agent = OSRSAgent(config, agent_seed)
+    replay_buffer = make_replay_buffer(config, replay_path, replay_seed)
+    states = market.reset()
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        q_table, episodes = message
+        agent.q_table = q_table.copy()
+        start = time.perf_counter()
+        steps = 0
+        profits = []
+        transactions = []
+        while len(profits) < episodes:
+            actions = agent.choose_action(states)
+            next_states, rewards, dones, info = market.step(actions)
+            learn(agent, replay_buffer, states, actions, rewards, next_states, dones, config.REPLAY_BATCH_SIZE, config.REPLAY_RATIO)
+            profits.extend(info["total_profit"][dones].tolist())
+            transactions.extend(info["total_transactions"][dones].tolist())
+            states = next_states
+            steps += num_envs
+        conn.send((agent.q_table - q_table, {
+            "episodes": len(profits),
+            "steps": steps,
+            "profit_sum": float(np.sum(profits)),
+            "transactions_sum": int(np.sum(transactions)),
+            "seconds": time.perf_counter() - start,
+        }))
+    conn.close()
+
+class OSRSTrainer:
+    def __init__(self, agent, environment, on_metrics=None, replay_buffer=None):
+        self.agent = agent
+        self.environment = environment
+        self.config = agent.config
+        self.on_metrics = on_metrics
+        self.replay_buffer = replay_buffer
+        self.metrics = []
+
+    def record(self, metrics):
+        self.metrics.append(metrics)
+        if self.on_metrics is not None:
+            self.on_metrics(metrics)
+
+    def train(self, num_episodes):
+        if self.replay_buffer is None:
+            self.replay_buffer = make_replay_buffer(self.config)
+        for episode in range(num_episodes):
+            state = self.environment.reset()
+            if state is None:
+                break
+            done = False
+            while not done:
+                action = self.agent.choose_action(state)
+                next_state, reward, done, info = self.environment.step(action)
+                learn(self.agent, self.replay_buffer, state, action, reward, next_state, done, self.config.REPLAY_BATCH_SIZE, self.config.REPLAY_RATIO)
+                state = next_state
+            self.record({"episode": episode + 1, "total_profit": info["total_profit"], "total_transactions": info["total_transactions"]})
+        return self.metrics
+
+    def market(self):
+        market = getattr(self.environment, "market", self.environment)
+        if market is None:
+            self.environment.reset()
+            market = self.environment.market
+        return market
+
+    def train_parallel(self, num_episodes, num_workers=None, seed=None, checkpoint_dir=None):
+        config = self.config
+        market = self.market()
+        if market is None:
+            return self.metrics
+        num_workers = num_workers or config.RL_WORKERS or os.cpu_count()
+        seed = config.RL_SEED if seed is None else seed
+        checkpoint_dir = checkpoint_dir or config.RL_CHECKPOINT_DIR
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        # Items are dealt round-robin so every worker gets a similar mix of cheap and expensive ones
+        slices = [market.tradable[worker::num_workers] for worker in range(num_workers)]
+        slices = [rows for rows in slices if len(rows)]
+        worker_seeds = np.random.SeedSequence(seed).spawn(len(slices))
+        buy_limits = {str(item_id): limit for item_id, limit in zip(market.item_ids.tolist(), market.buy_limit.tolist())}
+        context = multiprocessing.get_context()
+        connections = []
+        processes = []
+        for worker, (rows, worker_seed) in enumerate(zip(slices, worker_seeds)):
+            grids = {
+                "high_price": market.high[rows],
+                "low_price": market.low[rows],
+                "high_volume": market.high_volume[rows],
+                "low_volume": market.low_volume[rows],
+            }
+            parent, child = context.Pipe()
+            process = context.Process(target=rollout_worker, daemon=True, args=(
+                child, market.item_ids[rows], market.timestamps, grids, buy_limits, config, config.RL_ENVS_PER_WORKER, worker_seed,
+                os.path.join(checkpoint_dir, f"replay_{worker}")))
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+
+        episodes_per_worker = config.RL_EPISODES_PER_ROUND
+        completed = 0
+        round_number = 0
+        try:
+            while completed < num_episodes:
+                round_number += 1
+                start = time.perf_counter()
+                quota = max(1, min(episodes_per_worker, -(-(num_episodes - completed) // len(connections))))
+                for connection in connections:
+                    connection.send((self.agent.q_table, quota))
+                # Merge in worker order, not arrival order, so a given seed always yields the same table
+                results = [connection.recv() for connection in connections]
+                self.agent.q_table += np.mean([delta for delta, _ in results], axis=0)
+                worker_metrics = [metrics for _, metrics in results]
+
+                episodes = sum(metrics["episodes"] for metrics in worker_metrics)
+                completed += episodes
+                elapsed = time.perf_counter() - start
+                metrics = {
+                    "round": round_number,
+                    "episodes": episodes,
+                    "completed_episodes": completed,
+                    "steps": sum(metrics["steps"] for metrics in worker_metrics),
+                    "mean_profit": sum(metrics["profit_sum"] for metrics in worker_metrics) / episodes,
+                    "mean_transactions": sum(metrics["transactions_sum"] for metrics in worker_metrics) / episodes,
+                    "episodes_per_second": episodes / elapsed,
+                    "seconds": elapsed,
+                    "workers": len(connections),
+                }
+                self.record(metrics)
+                if round_number % config.RL_CHECKPOINT_EVERY == 0:
+                    self.checkpoint(checkpoint_dir, round_number)
+        finally:
+            for connection in connections:
+                try:
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        self.checkpoint(checkpoint_dir, round_number)
+        self.agent.save(config.Q_TABLE_FILE)
+        return self.metrics
+
+    def checkpoint(self, checkpoint_dir, round_number):
+        self.agent.save(os.path.join(checkpoint_dir, f"q_table_{round_number:05d}.bin"))
+        with open(os.path.join(checkpoint_dir, "metrics.jsonl"), "w") as file:
+            for metrics in self.metrics:
+                file.write(json.dumps(metrics) + "\n")
+
+    def evaluate(self, num_episodes):
+        total_profit = 0
+        total_transactions = 0
+        for episode in range(num_episodes):
+            state = self.environment.reset()
+            if state is None:
+                return None
+            done = False
+            while not done:
+                action = self.agent.predict(state)
+                next_state, reward, done, info = self.environment.step(action)
+                state = next_state
+            total_profit += info['total_profit']
+            total_transactions += info['total_transactions']
+        average_profit = total_profit / num_episodes
+        average_transactions = total_transactions / num_episodes
+        print(f"Evaluation Results:")
+        print(f"Average Profit per Episode: {average_profit}")
+        print(f"Average Transactions per Episode: {average_transactions}")
+        return {"average_profit": average_profit, "average_transactions": average_transactions}
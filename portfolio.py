@@ -0,0 +1,80 @@
+# portfolio.py
+
+import numpy as np
+from config import Config
+from ranking import top_k, volume_caps
+
+def fill_in_order(price, capacity, order, gold):
+    # Greedy knapsack over gold: fill items in the given order, each up to its capacity, the boundary
+    # item partially; then spend what is left on cheaper items further down
+    quantities = np.zeros(len(price), dtype=np.int64)
+    costs = capacity[order] * price[order]
+    spent_before = np.cumsum(costs) - costs
+    affordable = np.floor(np.maximum(gold - spent_before, 0) / price[order]).astype(np.int64)
+    filled = np.minimum(capacity[order], affordable)
+    # Everything after the first partially filled item is funded from the leftover pass below
+    partial = np.flatnonzero(filled < capacity[order])
+    if len(partial):
+        filled[partial[0] + 1:] = 0
+    quantities[order] = filled
+
+    remaining = gold - float((filled * price[order]).sum())
+    if len(partial):
+        rest = order[partial[0] + 1:]
+        cheapest_after = np.minimum.accumulate(price[rest][::-1])[::-1]
+        for position, index in enumerate(rest.tolist()):
+            if remaining < cheapest_after[position]:
+                break
+            amount = min(int(capacity[index]), int(remaining // price[index]))
+            if amount > 0:
+                quantities[index] = amount
+                remaining -= amount * price[index]
+    return quantities
+
+def fill_by_gain(unit_profit, price, capacity, eligible, gold, max_items):
+    # With few slots the best items are the ones that add the most profit outright, not per gp
+    quantities = np.zeros(len(price), dtype=np.int64)
+    remaining = float(gold)
+    for _ in range(max_items):
+        amounts = np.minimum(capacity[eligible], np.floor(remaining / price[eligible])).astype(np.int64)
+        gains = amounts * unit_profit[eligible]
+        best = int(np.argmax(gains))
+        if gains[best] <= 0:
+            break
+        index = eligible[best]
+        quantities[index] = amounts[best]
+        remaining -= amounts[best] * price[index]
+        eligible = np.delete(eligible, best)
+    return quantities
+
+def allocate(unit_profit, price, buy_limit, volume_cap, gold, max_items=None, priority=None):
+    # Splits one gold budget across candidates, each up to min(buy limit, volume cap) and at most
+    # max_items of them. Items are funded highest priority first; without a priority, by profit per gp
+    # or, with few slots, by largest outright gain, whichever earns more. Returns integer quantities
+    # aligned with the inputs.
+    unit_profit = np.asarray(unit_profit, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    capacity = np.minimum(np.asarray(buy_limit, dtype=np.int64), np.asarray(volume_cap, dtype=np.int64))
+    # Items the budget cannot buy even one of would only take up slots
+    eligible = np.flatnonzero((unit_profit > 0) & (price > 0) & (price <= gold) & (capacity > 0))
+    if not len(eligible) or gold <= 0:
+        return np.zeros(len(price), dtype=np.int64)
+
+    # With a slot limit only the best max_items are ever filled, so those are selected in O(n)
+    # instead of sorting every candidate
+    if priority is not None:
+        order = eligible[top_k(np.asarray(priority, dtype=np.float64)[eligible], max_items)]
+        return fill_in_order(price, capacity, order, gold)
+    order = eligible[top_k(unit_profit[eligible] / price[eligible], max_items)]
+    by_ratio = fill_in_order(price, capacity, order, gold)
+    if max_items is None or len(eligible) <= max_items:
+        return by_ratio
+    by_gain = fill_by_gain(unit_profit, price, capacity, eligible, gold, max_items)
+    return by_gain if (by_gain * unit_profit).sum() > (by_ratio * unit_profit).sum() else by_ratio
+
+def allocate_snapshot(snapshot, predictions, gold, config=Config, max_items=None, priority=None):
+    # Model predictions are log1p(profit per item); allocate on the profit itself
+    unit_profit = np.expm1(np.asarray(predictions, dtype=np.float64))
+    caps = volume_caps(snapshot["high_volume"], snapshot["low_volume"], config)
+    return allocate(unit_profit, snapshot["low"], snapshot["buy_limit"], caps, gold,
+                    config.MAX_SUGGESTIONS if max_items is None else max_items, priority)
@@ -0,0 +1,58 @@
+# ranking.py
+
+import numpy as np
+from config import Config
+
+# Ranking keys: (snapshot, predictions, config) -> one score per row, higher is better.
+# Predictions are log1p(profit per item), as the model is trained.
+RANKING_KEYS = {
+    "predicted_profit": lambda snapshot, predictions, config: np.expm1(predictions),
+    "total_profit": lambda snapshot, predictions, config: np.expm1(predictions) * tradeable_quantity(snapshot, config),
+    "roi": lambda snapshot, predictions, config: np.expm1(predictions) / np.maximum(snapshot["low"], 1),
+}
+
+def volume_caps(high_volume, low_volume, config=Config):
+    # No more than a share of what the slower side trades over one buy-limit window
+    buckets = config.BUY_LIMIT_WINDOW // 300
+    return np.floor(config.ALLOCATION_VOLUME_SHARE * buckets * np.minimum(high_volume, low_volume)).astype(np.int64)
+
+def tradeable_quantity(snapshot, config=Config):
+    return np.minimum(snapshot["buy_limit"], volume_caps(snapshot["high_volume"], snapshot["low_volume"], config))
+
+def scores(snapshot, predictions, key=None, config=Config):
+    key = key or config.RANKING_KEY
+    if key not in RANKING_KEYS:
+        raise ValueError(f"unknown ranking key {key!r}, expected one of {', '.join(RANKING_KEYS)}")
+    return RANKING_KEYS[key](snapshot, np.asarray(predictions, dtype=np.float64), config)
+
+def top_k(values, k=None):
+    # Indices of the k highest values, best first, ties in index order. argpartition finds them in
+    # O(n); only the k winners (plus any tied with the last one) get sorted.
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isnan(values), -np.inf, values)
+    if k is None or k >= len(values):
+        selected = np.arange(len(values))
+    elif k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    else:
+        threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+        selected = np.flatnonzero(values >= threshold)
+    return selected[np.lexsort((selected, -values[selected]))][:k]
+
+# Filters: (snapshot, predictions) -> boolean mask of rows to keep
+def positive_profit(snapshot, predictions):
+    return np.asarray(predictions) > 0
+
+def rl_approved(rl_agent, rl_environment):
+    # The RL agent's buy decision for a fresh position in each item
+    return lambda snapshot, predictions: rl_agent.predict(rl_environment.get_states(snapshot["high"], snapshot["low"])) == 1
+
+def apply_filters(snapshot, predictions, filters=()):
+    # Each filter only sees the rows that survived the ones before it, so expensive filters go last
+    rows = np.arange(len(snapshot))
+    for keep in filters:
+        if not len(rows):
+            break
+        subset = snapshot if len(rows) == len(snapshot) else snapshot.take(rows)
+        rows = rows[np.asarray(keep(subset, predictions[rows]), dtype=bool)]
+    return rows
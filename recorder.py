@@ -0,0 +1,138 @@
+# recorder.py
+
+import argparse
+import time
+from config import Config
+from OSRSScraper import OSRSScraper
+from osrs_rl.agent import DataManager
+
+class SnapshotRecorder:
+    def __init__(self, scraper, data_manager, config=Config, clock=time.time, sleep=time.sleep):
+        self.scraper = scraper
+        self.data_manager = data_manager
+        self.config = config
+        self.clock = clock
+        self.sleep = sleep
+        self.last_timestamp = data_manager.latest_timestamp()
+        self.last_rows = {}
+        self.stats = {
+            "ticks": 0,
+            "buckets_written": 0,
+            "buckets_backfilled": 0,
+            "buckets_missed": 0,
+            "rows_written": 0,
+            "rows_skipped": 0,
+            "errors": 0,
+            "write_seconds": 0.0,
+            "last_lag_seconds": None,
+        }
+
+    def next_tick_time(self):
+        now = self.clock()
+        return (now // 300 + 1) * 300 + self.config.RECORDER_OFFSET
+
+    def bucket_rows(self, timestamp, data_5m, data_latest):
+        rows = {}
+        for item_id, entry in data_5m.items():
+            high_price = entry.get("avgHighPrice") or 0
+            low_price = entry.get("avgLowPrice") or 0
+            latest = data_latest.get(item_id) if data_latest else None
+            # A side with no average still has an instant price if its last trade fell inside this bucket
+            if latest:
+                if not high_price and timestamp <= (latest.get("highTime") or 0) < timestamp + 300:
+                    high_price = latest.get("high") or 0
+                if not low_price and timestamp <= (latest.get("lowTime") or 0) < timestamp + 300:
+                    low_price = latest.get("low") or 0
+            rows[int(item_id)] = (high_price, low_price, entry.get("highPriceVolume") or 0, entry.get("lowPriceVolume") or 0)
+        return rows
+
+    def write_bucket(self, timestamp, data_5m, data_latest=None):
+        rows = self.bucket_rows(timestamp, data_5m, data_latest)
+        if timestamp == self.last_timestamp:
+            # Same bucket polled again: only rows that changed since the last write go to disk
+            changed = {item_id: values for item_id, values in rows.items() if self.last_rows.get(item_id) != values}
+            self.stats["rows_skipped"] += len(rows) - len(changed)
+            self.last_rows.update(changed)
+            rows_to_write = changed
+        else:
+            self.last_rows = rows
+            rows_to_write = rows
+            self.stats["buckets_written"] += 1
+
+        start = time.perf_counter()
+        self.data_manager.insert_prices((item_id, timestamp) + values for item_id, values in rows_to_write.items())
+        self.stats["write_seconds"] += time.perf_counter() - start
+        self.stats["rows_written"] += len(rows_to_write)
+        self.last_timestamp = max(self.last_timestamp or 0, timestamp)
+
+    def backfill(self, until_timestamp):
+        if self.last_timestamp is None:
+            return
+        missing = list(range(self.last_timestamp + 300, until_timestamp, 300))
+        if len(missing) > self.config.RECORDER_MAX_BACKFILL:
+            self.stats["buckets_missed"] += len(missing) - self.config.RECORDER_MAX_BACKFILL
+            missing = missing[-self.config.RECORDER_MAX_BACKFILL:]
+        for timestamp in missing:
+            data = self.scraper.fetch_historical_snapshot(timestamp)
+            if data is None:
+                self.stats["errors"] += 1
+                continue
+            self.write_bucket(timestamp, data)
+            self.stats["buckets_backfilled"] += 1
+
+    def tick(self):
+        self.stats["ticks"] += 1
+        data_latest = self.scraper.fetch_data(self.scraper.api_url_latest)
+        payload_5m = self.scraper.fetch_payload(self.scraper.api_url_5m)
+        if not payload_5m or "timestamp" not in payload_5m:
+            self.stats["errors"] += 1
+            return self.stats
+        timestamp = payload_5m["timestamp"]
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return self.stats
+
+        self.backfill(timestamp)
+        self.write_bucket(timestamp, payload_5m["data"], data_latest)
+        self.stats["last_lag_seconds"] = self.clock() - (timestamp + 300)
+        return self.stats
+
+    def run(self, max_ticks=None):
+        ticks = 0
+        while max_ticks is None or ticks < max_ticks:
+            self.sleep(max(0, self.next_tick_time() - self.clock()))
+            self.tick()
+            ticks += 1
+            self.report()
+
+    def throughput(self):
+        return self.stats["rows_written"] / self.stats["write_seconds"] if self.stats["write_seconds"] else 0.0
+
+    def report(self):
+        stats = self.stats
+        lag = stats["last_lag_seconds"]
+        print(
+            f"tick {stats['ticks']}: {stats['buckets_written']} buckets ({stats['buckets_backfilled']} backfilled, "
+            f"{stats['buckets_missed']} missed), {stats['rows_written']} rows written, {stats['rows_skipped']} unchanged, "
+            f"{self.throughput():,.0f} rows/s, lag {lag if lag is None else round(lag, 1)}s, {stats['errors']} errors"
+        )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=Config.HISTORY_DB, help="SQLite history database")
+    parser.add_argument("--ticks", type=int, default=None, help="Stop after this many polls")
+    args = parser.parse_args()
+
+    data_manager = DataManager(args.db)
+    data_manager.create_tables()
+    scraper = OSRSScraper(Config)
+    data_manager.insert_items((int(item_id), name, None) for item_id, name in scraper.item_names.items())
+    recorder = SnapshotRecorder(scraper, data_manager)
+    try:
+        recorder.run(args.ticks)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        data_manager.disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# service.py
+
+import argparse
+import csv
+import io
+import json
+import sys
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from config import Config
+from OSRSScraper import OSRSScraper
+from feature_engine import enrich_snapshot, feature_names
+from model_store import load_predictor
+from osrs_rl.agent import OSRSAgent
+from osrs_rl.environment import OSRSEnvironment
+from ranking import RANKING_KEYS
+from utils import rank_suggestions, size_suggestions
+
+FORMATS = {"json": "application/json", "csv": "text/csv"}
+
+def parse_gold(value):
+    try:
+        gold = int(value)
+    except (TypeError, ValueError):
+        return None
+    return gold if gold > 0 else None
+
+def render(suggestions, timestamp, gold, output_format="json"):
+    if output_format == "csv":
+        output = io.StringIO()
+        if suggestions:
+            writer = csv.DictWriter(output, fieldnames=list(suggestions[0]), lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(suggestions)
+        return output.getvalue().encode()
+    return json.dumps({"timestamp": timestamp, "gold": gold, "suggestions": suggestions}).encode()
+
+class SuggestionService:
+    # Headless counterpart of the GUI: the scraper with its item mapping, the model and the RL agent
+    # are loaded once, and each refresh ranks the candidates of a new snapshot. Requests only size
+    # those cached candidates against their budget, and rendered responses are reused per budget
+    # until the next refresh.
+    def __init__(self, config=Config, use_rl=False, scraper=None):
+        self.config = config
+        self.use_rl = use_rl
+        self.scraper = scraper
+        self.rl_agent = None
+        self.rl_environment = None
+        self.ranked = None
+        self.scored = None
+        self.responses = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.stats = {"refreshes": 0, "errors": 0, "requests": 0, "cache_hits": 0, "last_refresh_seconds": None, "last_predicted_items": None}
+
+    def load(self):
+        # Everything a refresh needs except the market data itself
+        if self.scraper is None:
+            self.scraper = OSRSScraper(self.config)
+        if self.use_rl and self.rl_agent is None:
+            self.rl_agent = OSRSAgent(self.config)
+            self.rl_environment = OSRSEnvironment(self.config)
+        return self.predictor() is not None
+
+    def warm(self):
+        self.load()
+        return self.refresh()
+
+    def predictor(self):
+        # Cheap when the model file is unchanged; picks up a retrained model otherwise
+        return load_predictor(self.config, feature_names(self.config))
+
+    def refresh(self, progress=None):
+        start = time.perf_counter()
+        model = self.predictor()
+        if model is None:
+            print(f"No usable model in {self.config.MODEL_FILE}; train one first.")
+            self.stats["errors"] += 1
+            return False
+        snapshot = enrich_snapshot(self.scraper.scrape_snapshot(progress), self.config)
+        if len(snapshot) == 0:
+            print("Error fetching item prices or item mapping; still serving the previous snapshot.")
+            self.stats["errors"] += 1
+            return False
+        if progress is not None:
+            progress(f"Scoring {len(snapshot)} items")
+        predictions = self.predict(snapshot, model)
+        if self.use_rl:
+            candidates, predictions = rank_suggestions(snapshot, model, self.rl_agent, self.rl_environment, predictions)
+        else:
+            candidates, predictions = rank_suggestions(snapshot, model, predictions=predictions)
+        with self.lock:
+            self.ranked = (snapshot.timestamp, candidates, predictions)
+            self.responses = {}
+        self.stats["refreshes"] += 1
+        self.stats["last_refresh_seconds"] = time.perf_counter() - start
+        return True
+
+    def predict(self, snapshot, model):
+        # Only items that are new or whose feature row changed since the last refresh go through the
+        # model; everything else keeps its previous prediction. A retrained model rescores everything.
+        X = snapshot.features()
+        changed = np.ones(len(X), dtype=bool)
+        predictions = np.empty(len(X))
+        if self.scored is not None and self.scored[0] is model and self.scored[3].shape[1] == X.shape[1]:
+            _, sorted_ids, order, previous_X, previous_predictions = self.scored
+            positions = np.minimum(np.searchsorted(sorted_ids, snapshot.item_ids), max(len(sorted_ids) - 1, 0))
+            known = sorted_ids[positions] == snapshot.item_ids if len(sorted_ids) else np.zeros(len(X), dtype=bool)
+            rows = order[positions[known]]
+            changed[known] = (X[known] != previous_X[rows]).any(axis=1)
+            predictions[known] = previous_predictions[rows]
+        if changed.any():
+            predictions[changed] = model.predict(X[changed])
+        order = np.argsort(snapshot.item_ids, kind="stable")
+        self.scored = (model, snapshot.item_ids[order], order, X, predictions)
+        self.stats["last_predicted_items"] = int(changed.sum())
+        return predictions
+
+    def suggestions(self, gold, key=None):
+        ranked = self.ranked
+        if ranked is None:
+            return None
+        return size_suggestions(ranked[1], ranked[2], gold, self.config, key)
+
+    def response(self, gold, output_format="json", key=None):
+        # A refresh swaps in a new dict, so a response rendered from the old snapshot is never served after it
+        with self.lock:
+            ranked, responses = self.ranked, self.responses
+            self.stats["requests"] += 1
+            body = responses.get((gold, output_format, key))
+            if body is not None:
+                self.stats["cache_hits"] += 1
+        if ranked is None or body is not None:
+            return body
+        timestamp, candidates, predictions = ranked
+        body = render(size_suggestions(candidates, predictions, gold, self.config, key), timestamp, gold, output_format)
+        if len(responses) < self.config.SERVICE_CACHE_SIZE:
+            responses[(gold, output_format, key)] = body
+        return body
+
+    def next_refresh_time(self):
+        # Just after the next 5m bucket is published, like the recorder
+        interval = self.config.SERVICE_REFRESH_INTERVAL
+        return (time.time() // interval + 1) * interval + self.config.RECORDER_OFFSET
+
+    def run_refresher(self):
+        while not self.stopped.wait(max(0, self.next_refresh_time() - time.time())):
+            self.refresh()
+
+    def serve(self, host=None, port=None):
+        server = ThreadingHTTPServer((host or self.config.SERVICE_HOST, self.config.SERVICE_PORT if port is None else port), SuggestionHandler)
+        server.daemon_threads = True
+        server.service = self
+        refresher = threading.Thread(target=self.run_refresher, daemon=True)
+        refresher.start()
+        return server, refresher
+
+    def stop(self, server=None):
+        self.stopped.set()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+class SuggestionHandler(BaseHTTPRequestHandler):
+    # Keep-alive, and no Nagle delay between the header and body writes of small responses
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path == "/health":
+            ranked = service.ranked
+            self.send(200, json.dumps(dict(service.stats, timestamp=ranked[0] if ranked else None)).encode(), FORMATS["json"])
+            return
+        if url.path != "/suggestions":
+            self.send(404, b'{"error": "not found"}', FORMATS["json"])
+            return
+        query = parse_qs(url.query)
+        gold = parse_gold(query.get("gold", [None])[0])
+        output_format = query.get("format", ["json"])[0]
+        key = query.get("sort", [service.config.RANKING_KEY])[0]
+        if gold is None or output_format not in FORMATS or key not in RANKING_KEYS:
+            self.send(400, b'{"error": "gold must be a positive integer, format json or csv and sort a ranking key"}', FORMATS["json"])
+            return
+        body = service.response(gold, output_format, key)
+        if body is None:
+            self.send(503, b'{"error": "no market snapshot yet"}', FORMATS["json"])
+            return
+        self.send(200, body, FORMATS[output_format])
+
+    def send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Item suggestions without the GUI: one-shot output or a local HTTP service")
+    parser.add_argument("--gold", type=int, default=Config.STARTING_GOLD, help="Budget for one-shot output")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="json")
+    parser.add_argument("--sort", choices=sorted(RANKING_KEYS), default=Config.RANKING_KEY, help="Order of the listed suggestions")
+    parser.add_argument("--rl", action="store_true", help="Let the RL agent veto suggestions")
+    parser.add_argument("--serve", action="store_true", help="Serve GET /suggestions?gold=N[&format=csv][&sort=roi] until interrupted")
+    parser.add_argument("--host", default=Config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVICE_PORT)
+    args = parser.parse_args()
+
+    service = SuggestionService(Config, use_rl=args.rl)
+    if not args.serve:
+        if not service.warm():
+            sys.exit(1)
+        sys.stdout.write(service.response(args.gold, args.format, args.sort).decode())
+        return
+
+    if not service.warm():
+        print("Starting without a snapshot; requests get 503 until the next refresh succeeds.")
+    server, _ = service.serve(args.host, args.port)
+    print(f"Serving suggestions on http://{server.server_address[0]}:{server.server_address[1]}/suggestions?gold=N")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop(server)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# snapshot_archive.py
+
+import json
+import os
+import shutil
+import struct
+import zlib
+from datetime import datetime, timezone
+import numpy as np
+from config import Config
+
+MAGIC = b"OSRA"
+ARCHIVE_VERSION = 1
+DAY_SECONDS = 24 * 60 * 60
+BUCKET_SECONDS = 300
+BUCKETS_PER_DAY = DAY_SECONDS // BUCKET_SECONDS
+COLUMNS = ("high_price", "low_price", "high_volume", "low_volume")
+
+def zigzag_encode(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+def zigzag_decode(values):
+    values = values.astype(np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+def varint_encode(values):
+    # LEB128, vectorized: one pass per byte position rather than per value
+    values = values.astype(np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= (np.uint64(1) << np.uint64(shift))
+    starts = np.cumsum(lengths) - lengths
+    encoded = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for position in range(int(lengths.max()) if len(values) else 0):
+        present = lengths > position
+        chunk = (values[present] >> np.uint64(7 * position)) & np.uint64(0x7F)
+        more = (lengths[present] > position + 1).astype(np.uint64) << np.uint64(7)
+        encoded[starts[present] + position] = (chunk | more).astype(np.uint8)
+    return encoded
+
+def varint_decode(encoded, count):
+    encoded = np.frombuffer(encoded, dtype=np.uint8)
+    ends = np.flatnonzero(encoded < 0x80)[:count]
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    lengths = ends - starts + 1
+    values = np.zeros(count, dtype=np.uint64)
+    for position in range(int(lengths.max()) if count else 0):
+        present = lengths > position
+        chunk = encoded[starts[present] + position].astype(np.uint64) & np.uint64(0x7F)
+        values[present] |= chunk << np.uint64(7 * position)
+    return values
+
+def encode_column(values):
+    return zlib.compress(varint_encode(zigzag_encode(values)).tobytes(), 6)
+
+def decode_column(payload, count):
+    return zigzag_decode(varint_decode(zlib.decompress(payload), count))
+
+def day_start(timestamp):
+    return int(timestamp) // DAY_SECONDS * DAY_SECONDS
+
+def day_name(timestamp):
+    return datetime.fromtimestamp(day_start(timestamp), tz=timezone.utc).strftime("%Y-%m-%d")
+
+class SnapshotArchive:
+    # One file per UTC day. Each column is an (items x 288) grid of 5m buckets, delta encoded along
+    # time per item, zigzag/varint packed and zlib compressed. Zero means no data for that bucket.
+    # With cached_days > 0 the most recently used days are also kept decoded as .npy under .decoded/
+    # and memory-mapped on later reads, skipping decoding at the cost of uncompressed int64 files on disk.
+    def __init__(self, directory, cached_days=Config.ARCHIVE_CACHED_DAYS):
+        self.directory = directory
+        self.decoded_directory = os.path.join(directory, ".decoded")
+        self.cached_days = cached_days
+        os.makedirs(self.directory, exist_ok=True)
+
+    def day_path(self, timestamp):
+        return os.path.join(self.directory, f"{day_name(timestamp)}.osra")
+
+    def days(self):
+        names = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".osra"))
+        return [int(datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()) for name in names]
+
+    def write_day(self, start, item_ids, grids):
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        payloads = [encode_column(np.diff(item_ids, prepend=0))]
+        for column in COLUMNS:
+            grid = np.asarray(grids[column], dtype=np.int64).reshape(len(item_ids), BUCKETS_PER_DAY)
+            payloads.append(encode_column(np.diff(grid, axis=1, prepend=0).ravel()))
+        header = json.dumps({
+            "day_start": day_start(start),
+            "num_items": len(item_ids),
+            "columns": ["item_id"] + list(COLUMNS),
+            "sizes": [len(payload) for payload in payloads],
+        }).encode()
+
+        path = self.day_path(start)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(MAGIC + struct.pack("<HI", ARCHIVE_VERSION, len(header)) + header)
+            for payload in payloads:
+                file.write(payload)
+        os.replace(temp_path, path)
+        return path
+
+    def read_day(self, start):
+        with open(self.day_path(start), "rb") as file:
+            if file.read(4) != MAGIC:
+                raise ValueError(f"{self.day_path(start)} is not a snapshot archive")
+            version, header_size = struct.unpack("<HI", file.read(6))
+            if version != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported archive version {version}")
+            header = json.loads(file.read(header_size))
+            payloads = [file.read(size) for size in header["sizes"]]
+        num_items = header["num_items"]
+        item_ids = np.cumsum(decode_column(payloads[0], num_items))
+        grids = {}
+        for column, payload in zip(COLUMNS, payloads[1:]):
+            deltas = decode_column(payload, num_items * BUCKETS_PER_DAY).reshape(num_items, BUCKETS_PER_DAY)
+            grids[column] = np.cumsum(deltas, axis=1)
+        return item_ids, grids
+
+    def load_day(self, start):
+        if self.cached_days <= 0:
+            return self.read_day(start)
+        cache_directory = os.path.join(self.decoded_directory, day_name(start))
+        marker = os.path.join(cache_directory, "item_id.npy")
+        try:
+            if os.path.getmtime(marker) >= os.path.getmtime(self.day_path(start)):
+                os.utime(marker)
+                return np.load(marker, mmap_mode="r"), {column: np.load(os.path.join(cache_directory, f"{column}.npy"), mmap_mode="r") for column in COLUMNS}
+        except FileNotFoundError:
+            # Not cached yet, or evicted meanwhile by another process sharing the archive
+            pass
+        item_ids, grids = self.read_day(start)
+        self.evict_decoded(keep=self.cached_days - 1)
+        try:
+            self.save_decoded(cache_directory, item_ids, grids)
+        except OSError:
+            # On Windows a file that is still mapped can be neither replaced nor removed; serve
+            # this read from the decoded arrays and try caching again next time
+            pass
+        return item_ids, grids
+
+    def save_decoded(self, cache_directory, item_ids, grids):
+        # Each file is written aside and renamed into place: truncating a file that an earlier read
+        # still has mapped would crash that reader on its next access. The marker goes last.
+        os.makedirs(cache_directory, exist_ok=True)
+        for name, values in [(column, grids[column]) for column in COLUMNS] + [("item_id", item_ids)]:
+            path = os.path.join(cache_directory, f"{name}.npy")
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                np.save(file, values)
+            os.replace(temp_path, path)
+
+    def decoded_days(self):
+        # Cached days, least recently used first
+        if not os.path.isdir(self.decoded_directory):
+            return []
+        markers = []
+        for name in os.listdir(self.decoded_directory):
+            try:
+                markers.append((os.path.getmtime(os.path.join(self.decoded_directory, name, "item_id.npy")), name))
+            except FileNotFoundError:
+                continue
+        return [name for _, name in sorted(markers)]
+
+    def evict_decoded(self, keep=None):
+        # Unlinking a mapped file is safe on POSIX; on Windows it fails and the day is evicted on a later pass
+        names = self.decoded_days()
+        keep = self.cached_days if keep is None else keep
+        for name in names[:max(0, len(names) - keep)]:
+            shutil.rmtree(os.path.join(self.decoded_directory, name), ignore_errors=True)
+
+    def decoded_size(self):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(self.decoded_directory) for name in names)
+
+    def load_range(self, start, end):
+        # Dense (items x buckets) grids for [start, end), aligned on the union of item ids. Days missing
+        # from the archive stay zero (no data), so bucket i is always at days[0] + i * BUCKET_SECONDS.
+        days = [day for day in self.days() if day + DAY_SECONDS > start and day < end]
+        if not days:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {column: np.empty((0, 0), dtype=np.int64) for column in COLUMNS}
+        loaded = [self.load_day(day) for day in days]
+        item_ids = np.unique(np.concatenate([day_item_ids for day_item_ids, _ in loaded]))
+        first_bucket = (max(start, days[0]) - days[0]) // BUCKET_SECONDS
+        num_buckets = (days[-1] - days[0] + DAY_SECONDS) // BUCKET_SECONDS
+        last_bucket = min(num_buckets, -(-(end - days[0]) // BUCKET_SECONDS))
+        grids = {column: np.zeros((len(item_ids), num_buckets), dtype=np.int64) for column in COLUMNS}
+        for day, (day_item_ids, day_grids) in zip(days, loaded):
+            rows = np.searchsorted(item_ids, day_item_ids)
+            offset = (day - days[0]) // BUCKET_SECONDS
+            for column in COLUMNS:
+                grids[column][rows, offset:offset + BUCKETS_PER_DAY] = day_grids[column]
+        timestamps = days[0] + BUCKET_SECONDS * np.arange(first_bucket, last_bucket, dtype=np.int64)
+        return item_ids, timestamps, {column: grid[:, first_bucket:last_bucket] for column, grid in grids.items()}
+
+    def export_from_db(self, data_manager, start, end):
+        written = []
+        for day in range(day_start(start), end, DAY_SECONDS):
+            rows = data_manager.get_price_range(day, day + DAY_SECONDS)
+            if len(rows["item_id"]) == 0:
+                continue
+            item_ids, item_rows = np.unique(rows["item_id"], return_inverse=True)
+            buckets = (rows["timestamp"] - day) // BUCKET_SECONDS
+            grids = {}
+            for column in COLUMNS:
+                grid = np.zeros((len(item_ids), BUCKETS_PER_DAY), dtype=np.int64)
+                grid[item_rows, buckets] = rows[column]
+                grids[column] = grid
+            written.append(self.write_day(day, item_ids, grids))
+        return written
+
+    def import_into_db(self, data_manager, start=None, end=None):
+        imported = 0
+        for day in self.days():
+            if (start is not None and day + DAY_SECONDS <= start) or (end is not None and day >= end):
+                continue
+            item_ids, grids = self.read_day(day)
+            present = np.zeros((len(item_ids), BUCKETS_PER_DAY), dtype=bool)
+            for column in COLUMNS:
+                present |= grids[column] != 0
+            item_rows, buckets = np.nonzero(present)
+            timestamps = day + buckets * BUCKET_SECONDS
+            values = [grids[column][item_rows, buckets] for column in COLUMNS]
+            data_manager.insert_prices(zip(item_ids[item_rows].tolist(), timestamps.tolist(), *(column.tolist() for column in values)))
+            imported += len(item_rows)
+        return imported
@@ -0,0 +1,103 @@
+# tree_engine.py
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+class CompiledForest:
+    # All trees of a fitted forest flattened into shared node arrays. Leaves point to themselves,
+    # so a traversal step is the same gather for every lane and finished lanes are dropped as they land.
+    def __init__(self, feature, threshold, children, value, roots):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("only single-output forests can be compiled")
+        node_counts = np.array([tree.node_count for tree in trees], dtype=np.intp)
+        offsets = np.concatenate([[0], np.cumsum(node_counts)]).astype(np.intp)
+
+        feature = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        left = np.concatenate([tree.children_left for tree in trees]).astype(np.intp)
+        right = np.concatenate([tree.children_right for tree in trees]).astype(np.intp)
+        value = np.concatenate([tree.value[:, 0, 0] for tree in trees]).astype(np.float64)
+
+        node_ids = np.arange(offsets[-1], dtype=np.intp)
+        node_offsets = np.repeat(offsets[:-1], node_counts)
+        is_leaf = left < 0
+        left = np.where(is_leaf, node_ids, left + node_offsets)
+        right = np.where(is_leaf, node_ids, right + node_offsets)
+        feature[is_leaf] = 0
+
+        # sklearn compares float32 inputs against float64 thresholds; rounding each threshold down to
+        # the nearest float32 keeps `x <= threshold` exact while halving the bytes gathered per step
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        threshold32[is_leaf] = 0
+
+        children = np.empty(2 * len(node_ids), dtype=np.intp)
+        children[0::2] = left
+        children[1::2] = right
+        return cls(feature, threshold32, children, value, offsets[:-1])
+
+    def predict(self, X, trees_per_chunk=10):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        num_rows, num_features = X.shape
+        num_trees = len(self.roots)
+        flat_X = X.ravel()
+        row_offsets = np.arange(num_rows, dtype=np.intp) * num_features
+        leaves = np.empty(num_trees * num_rows, dtype=np.intp)
+
+        # A few trees at a time keeps the per-lane working arrays cache sized
+        for first_tree in range(0, num_trees, trees_per_chunk):
+            roots = self.roots[first_tree:first_tree + trees_per_chunk]
+            nodes = np.repeat(roots, num_rows)
+            row_base = np.tile(row_offsets, len(roots))
+            lanes = np.arange(first_tree * num_rows, (first_tree + len(roots)) * num_rows, dtype=np.intp)
+            while lanes.size:
+                go_right = ~(flat_X[row_base + self.feature[nodes]] <= self.threshold[nodes])
+                next_nodes = self.children[2 * nodes + go_right]
+                landed = next_nodes == nodes
+                if landed.any():
+                    leaves[lanes[landed]] = nodes[landed]
+                    moving = ~landed
+                    lanes = lanes[moving]
+                    next_nodes = next_nodes[moving]
+                    row_base = row_base[moving]
+                nodes = next_nodes
+
+        # Accumulate tree by tree in estimator order, as sklearn does, so the mean is bit-identical
+        leaf_values = self.value[leaves].reshape(num_trees, num_rows)
+        predictions = np.zeros(num_rows)
+        for tree_values in leaf_values:
+            predictions += tree_values
+        predictions /= num_trees
+        return predictions
+
+class CompiledPipeline:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.preprocess = pipeline[:-1]
+        self.forest = CompiledForest.from_sklearn(pipeline[-1])
+
+    def predict(self, X):
+        X = self.preprocess.transform(X)
+        if np.isnan(X).any():
+            # Missing-value routing is learned per node; leave those rows to sklearn
+            return self.pipeline[-1].predict(X)
+        return self.forest.predict(X)
+
+def compile_pipeline(pipeline):
+    if not isinstance(pipeline[-1], RandomForestRegressor):
+        return pipeline
+    try:
+        return CompiledPipeline(pipeline)
+    except (AttributeError, ValueError) as e:
+        print(f"Falling back to sklearn inference: {e}")
+        return pipeline
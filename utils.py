@@ -1,84 +1,101 @@
-# utils.py
-
-import pickle
-import os
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from osrs_rl.agent import OSRSAgent
-from osrs_rl.environment import OSRSEnvironment
-from osrs_rl.trainer import OSRSTrainer
-
-def generate_item_suggestions(items_data, starting_gold, model, rl_agent, rl_environment):
-    X, _ = prepare_training_data(items_data)
-    X_normalized = StandardScaler().fit_transform(X)
-    predictions = model.predict(X_normalized)
-
-    suggestions = []
-    for i, item in enumerate(items_data):
-        prediction = predictions[i]
-        if prediction > 0:
-            item["Predicted Profit"] = prediction
-            buy_limit = item["Buy Limit"]
-            buy_price = item["Low (Buy)"]
-            max_quantity = min(buy_limit, starting_gold // buy_price)
-            item["Max Quantity"] = max_quantity
-            suggestions.append(item)
-
-    # Sort suggestions based on predicted profit
-    suggestions.sort(key=lambda x: x["Predicted Profit"], reverse=True)
-
-    # Use RL agent to further optimize suggestions
-    optimized_suggestions = []
-    for suggestion in suggestions[:10]:  # Consider top 10 suggestions
-        state = rl_environment.get_state(suggestion)
-        action = rl_agent.predict(state)
-        if action == 1:  # Buy action
-            optimized_suggestions.append(suggestion)
-
-    return optimized_suggestions[:5]
-
-def prepare_training_data(items_data):
-    X = []
-    y = []
-    for item in items_data:
-        X.append([
-            item["High (Sell)"],
-            item["Low (Buy)"],
-            item["High Volume"],
-            item["Low Volume"],
-            item["5-Minute Average High Price"],
-            item["Price Fluctuation"],
-            item["Buy Limit"],
-            item["ROI"],
-            item["Historical Price"],
-            item["Historical Volume"]
-        ])
-        y.append(item["Potential Profit"])
-
-    X_normalized = StandardScaler().fit_transform(X)
-    y_log_transformed = np.log1p(y)
-    return X_normalized, y_log_transformed
-
-def train_model(items_data):
-    model_file = "model.pkl"
-    if os.path.exists(model_file):
-        with open(model_file, "rb") as file:
-            model = pickle.load(file)
-    else:
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-
-    X, y = prepare_training_data(items_data)
-    model.fit(X, y)
-
-    with open(model_file, "wb") as file:
-        pickle.dump(model, file)
-
-    return model
-
-def format_suggestions(suggestions):
-    formatted_suggestions = []
-    for suggestion in suggestions:
-        formatted_suggestion = f"- {suggestion['Item Name']}\n  Buy Price: {suggestion['Low (Buy)']}\n  Sell Price: {suggestion['High (Sell)']}\n  Potential Profit: {suggestion['Potential Profit']} per item\n  Buy Limit: {suggestion['Buy Limit']}\n  Max Quantity: {suggestion['Max Quantity']}\n"
-        formatted_suggestions.append(formatted_suggestion)
-    return "\n".join(formatted_suggestions)
\ No newline at end of file
+# utils.py
+
+import copy
+import itertools
+import numpy as np
+from config import Config
+from market_snapshot import as_snapshot
+from model_store import build_pipeline, load_history, make_bundle, model_cache, save_history
+from portfolio import allocate_snapshot
+from ranking import apply_filters, positive_profit, rl_approved, scores, top_k
+
+def generate_item_suggestions(items_data, starting_gold, model, rl_agent, rl_environment, config=Config, key=None, filters=()):
+    snapshot = as_snapshot(items_data)
+    if len(snapshot) == 0:
+        return []
+    candidates, predictions = rank_suggestions(snapshot, model, rl_agent, rl_environment, filters=filters)
+    return size_suggestions(candidates, predictions, starting_gold, config, key)
+
+def rank_suggestions(snapshot, model, rl_agent=None, rl_environment=None, predictions=None, filters=()):
+    # Everything that depends only on the market, not the budget: candidates and their predictions
+    if predictions is None:
+        X, _ = prepare_training_data(snapshot)
+        predictions = model.predict(X)
+    filters = (positive_profit,) + tuple(filters)
+
+    # Use RL agent to veto candidates before any gold is allocated to them
+    if rl_agent is not None and rl_environment is not None:
+        filters += (rl_approved(rl_agent, rl_environment),)
+    candidates = apply_filters(snapshot, predictions, filters)
+    return snapshot.take(candidates), predictions[candidates]
+
+def size_suggestions(candidates, predictions, starting_gold, config=Config, key=None):
+    # Size all candidates jointly against the one budget. The ranking key decides which of them are
+    # funded, best first, and the order they are listed in.
+    priority = scores(candidates, predictions, key, config)
+    quantities = allocate_snapshot(candidates, predictions, starting_gold, config, priority=priority)
+    chosen = np.flatnonzero(quantities > 0)
+    chosen = chosen[top_k(priority[chosen])]
+    suggestions = candidates.to_records(chosen)
+    for suggestion, prediction, quantity in zip(suggestions, predictions[chosen].tolist(), quantities[chosen].tolist()):
+        suggestion["Predicted Profit"] = prediction
+        suggestion["Max Quantity"] = quantity
+    return suggestions
+
+def prepare_training_data(items_data):
+    snapshot = as_snapshot(items_data)
+    y_log_transformed = np.log1p(snapshot.targets())
+    return snapshot.features(), y_log_transformed
+
+def train_model(items_data, config=Config):
+    snapshot = as_snapshot(items_data)
+    X, y = prepare_training_data(snapshot)
+    bundle = model_cache.get(config.MODEL_FILE) if config.INCREMENTAL_TRAINING else None
+    if bundle is None or bundle["features"] != snapshot.feature_names():
+        model = build_pipeline(config)
+        model.fit(X, y)
+        bundle, history = make_bundle(model, features=snapshot.feature_names()), [(X, y)]
+    else:
+        bundle, history = update_model(bundle, load_history(config.MODEL_FILE), X, y, config)
+    model_cache.put(config.MODEL_FILE, bundle, config.MODEL_COMPRESS)
+    if config.INCREMENTAL_TRAINING:
+        save_history(history, config.MODEL_FILE)
+    return bundle["pipeline"]
+
+def update_model(bundle, history, X, y, config=Config):
+    # Work on a copy so predictions served from the cached bundle never see a half-updated forest.
+    # Only the regressor and its tree list change; the fitted trees themselves are shared
+    bundle = dict(bundle)
+    pipeline = bundle["pipeline"] = copy.copy(bundle["pipeline"])
+    pipeline.steps = [(name, copy.copy(step) if name == "regressor" else step) for name, step in pipeline.steps]
+    history = (list(history) + [(X, y)])[-config.TRAINING_HISTORY_SNAPSHOTS:]
+    X_window = np.concatenate([X_batch for X_batch, _ in history])
+    y_window = np.concatenate([y_batch for _, y_batch in history])
+
+    # The scaler stays frozen after the first fit; rescaling would shift the inputs of the existing trees
+    scaler = pipeline.named_steps["scaler"]
+    regressor = pipeline.named_steps["regressor"]
+    regressor.estimators_ = list(regressor.estimators_)
+    # Reseed every update: once the forest is trimmed to MAX_ESTIMATORS a fixed seed would redraw the same tree seeds
+    regressor.set_params(warm_start=True, n_estimators=len(regressor.estimators_) + config.TREES_PER_UPDATE,
+                         random_state=bundle.get("updates", 0) + 1)
+    regressor.fit(scaler.transform(X_window), y_window)
+
+    if len(regressor.estimators_) > config.MAX_ESTIMATORS:
+        regressor.estimators_ = regressor.estimators_[-config.MAX_ESTIMATORS:]
+        regressor.n_estimators = len(regressor.estimators_)
+
+    bundle["updates"] = bundle.get("updates", 0) + 1
+    return bundle, history
+
+def format_suggestions(suggestions):
+    formatted_suggestions = []
+    for suggestion in suggestions:
+        formatted_suggestion = f"- {suggestion['Item Name']}\n  Buy Price: {suggestion['Low (Buy)']}\n  Sell Price: {suggestion['High (Sell)']}\n  Potential Profit: {suggestion['Potential Profit']} per item\n  Buy Limit: {suggestion['Buy Limit']}\n  Max Quantity: {suggestion['Max Quantity']}\n"
+        formatted_suggestions.append(formatted_suggestion)
+    return "\n".join(formatted_suggestions)
+
+def expand_grid(param_grid):
+    # Every combination of a {name: [values]} grid, as a list of {name: value} dicts
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]